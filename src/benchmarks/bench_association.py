@@ -0,0 +1,66 @@
+"""
+ByteTrackLite 매칭 엔진 벤치마크 (트랙/검출 10, 100, 1000개)
+
+사용법 (src 폴더에서):
+    python benchmarks/bench_association.py
+"""
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.bytracker import greedy_match_from_iou, iou_matrix_xyxy
+from lib.association import Associator
+
+
+def make_scene(n, rng, width=1920, height=1080):
+    # 화면에 흩어진 사람 크기 박스 + 약간 움직인 검출 (10%는 새 검출)
+    xy = rng.uniform(0, (width, height), (n, 2))
+    wh = rng.uniform((20, 50), (60, 150), (n, 2))
+    trk = np.concatenate([xy, xy + wh], 1).astype(np.float32)
+    det = trk + rng.normal(0, 3, trk.shape).astype(np.float32)
+    k = max(1, n // 10)
+    det[:k] = np.roll(det[:k], 1, axis=0) + 300
+    return trk, det
+
+
+def bench(fn, repeat):
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1000.0
+
+
+def main():
+    rng = np.random.default_rng(0)
+    thresh = 0.6
+    engines = {
+        'legacy greedy': None,
+        'greedy': Associator('greedy', gate=False),
+        'greedy+gate': Associator('greedy', gate=True),
+        'hungarian': Associator('hungarian', gate=False),
+        'hungarian+gate': Associator('hungarian', gate=True),
+    }
+
+    print(f"{'N':>6} | " + ' | '.join(f"{name:>15}" for name in engines) + "   (ms / frame)")
+    for n in (10, 100, 1000):
+        trk, det = make_scene(n, rng)
+        repeat = 200 if n <= 100 else 10
+        row = []
+        for name, eng in engines.items():
+            if eng is None:
+                fn = lambda: greedy_match_from_iou(iou_matrix_xyxy(trk, det), thresh)
+            else:
+                fn = lambda eng=eng: eng.match(trk, det, thresh)
+            ms = bench(fn, repeat)
+            matched = len(fn()[0])
+            row.append(f"{ms:9.3f} ({matched:>4})")
+        print(f"{n:>6} | " + ' | '.join(f"{r:>15}" for r in row))
+    print("괄호: 매칭 수")
+
+
+if __name__ == '__main__':
+    main()
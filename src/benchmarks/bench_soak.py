@@ -0,0 +1,128 @@
+"""
+장시간 운용 메모리 soak 벤치마크
+- 사람이 계속 들어오고 나가는 합성 장면을 ByteTrackLite + HelmetCache + HelmetScore에 흘려보냄
+- DetectParser/HelmetParser/DispEvent와 같은 방식으로 removed_ids를 받아 UID별 상태 정리
+- report 간격마다 RSS와 상태 크기를 출력 → 처음 몇 구간 이후 값이 평탄해야 정상
+
+사용법 (src 폴더에서):
+    python benchmarks/bench_soak.py --frames 2000000
+"""
+import os
+import sys
+import time
+import argparse
+import resource
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.bytracker import ByteTrackLite, iter_tracks
+from lib.helmet_cache import HelmetCache
+from lib.helmet_score import HelmetScore
+from lib.init import HELMET_CACHE_CFG, TRACK_HISTORY_LEN
+
+
+def rss_mb():
+    # 현재 RSS (리눅스), 없으면 최대 RSS
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+class Crowd:
+    """화면 안을 걸어다니다 수명이 끝나면 사라지는 사람들 (평균 max_people명 유지)"""
+    def __init__(self, rng, max_people=12, life=(60, 900), width=1920, height=1080):
+        self.rng = rng
+        self.max_people = max_people
+        self.life = life
+        self.size = np.array([width, height], dtype=np.float32)
+        self.pos = np.zeros((0, 2), np.float32)
+        self.vel = np.zeros((0, 2), np.float32)
+        self.wh = np.zeros((0, 2), np.float32)
+        self.ttl = np.zeros(0, np.int64)
+
+    def step(self):
+        self.ttl -= 1
+        alive = self.ttl > 0
+        self.pos, self.vel, self.wh, self.ttl = self.pos[alive], self.vel[alive], self.wh[alive], self.ttl[alive]
+        if len(self.ttl) < self.max_people and self.rng.random() < 0.05:
+            self.pos = np.vstack([self.pos, self.rng.uniform(0, self.size - 200, (1, 2))])
+            self.vel = np.vstack([self.vel, self.rng.normal(0, 2, (1, 2))])
+            self.wh = np.vstack([self.wh, self.rng.uniform((40, 100), (90, 220), (1, 2))])
+            self.ttl = np.append(self.ttl, self.rng.integers(*self.life))
+        self.pos = np.clip(self.pos + self.vel, 0, self.size - self.wh)
+
+    def detections(self):
+        # yolo 결과 형식 [label, score, [cx, cy, w, h]], 10% 확률로 미검출
+        out = []
+        c = self.pos + self.wh / 2 + self.rng.normal(0, 1.5, self.pos.shape)
+        for (cx, cy), (w, h) in zip(c, self.wh):
+            if self.rng.random() < 0.1:
+                continue
+            out.append(['person', float(self.rng.uniform(0.3, 0.95)), [int(cx), int(cy), int(w), int(h)]])
+        return out
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument('--frames', type=int, default=2000000)
+    ap.add_argument('--report', type=int, default=100000)
+    ap.add_argument('--stride', type=int, default=3, help='검출 주기 (나머지 프레임은 predict만)')
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(0)
+    crowd = Crowd(rng)
+    tracker = ByteTrackLite(fps=30, track_thresh=0.45, low_thresh=0.1, match_thresh=0.6,
+                            max_age=30, min_hits=3, history_len=TRACK_HISTORY_LEN)
+    cache = HelmetCache(**HELMET_CACHE_CFG)
+    helmet_score = HelmetScore()
+    last_falldown = {}
+    helmet = [('helmet', 0.9, None)]
+
+    print(f"{'frame':>9} | {'rss MB':>7} | {'tracks':>6} | {'next id':>7} | {'history':>7} | "
+          f"{'cache':>5} | {'scores':>6} | {'falldown':>8} | {'fps':>7}")
+    t0 = time.perf_counter()
+    for frame in range(1, args.frames + 1):
+        crowd.step()
+        if frame % args.stride == 0:
+            tracks, removed = tracker.update(crowd.detections(), as_array=True)
+        else:
+            tracks, removed = tracker.predict(as_array=True)
+
+        # DetectParser: 쓰러짐 상태 보관/정리
+        for track in iter_tracks(tracks):
+            last_falldown[track['id']] = {'label': 'standing', 'score': 0.0}
+        for tid in removed:
+            last_falldown.pop(tid, None)
+
+        # HelmetParser: 캐시 정리 후 분류
+        cache.evict(removed)
+        cache.tick()
+        for track in iter_tracks(tracks):
+            if not track.get('matched', True):
+                continue
+            if cache.needs_check(track['id'], track):
+                cache.update(track['id'], track, helmet)
+            else:
+                cache.get(track['id'])
+
+        # DispEvent: UID별 점수 정리 후 갱신
+        helmet_score.evict(removed)
+        for track in iter_tracks(tracks):
+            if track.get('matched', True):
+                helmet_score.update(track['id'], helmet)
+
+        if frame % args.report == 0:
+            history = sum(len(t.history) for t in tracker.tracks)
+            fps = frame / (time.perf_counter() - t0)
+            print(f"{frame:>9} | {rss_mb():>7.1f} | {len(tracker.tracks):>6} | {tracker._next_id:>7} | {history:>7} | "
+                  f"{len(cache.entries):>5} | {len(helmet_score):>6} | {len(last_falldown):>8} | {fps:>7.0f}")
+
+
+if __name__ == '__main__':
+    main()
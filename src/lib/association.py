@@ -0,0 +1,248 @@
+import numpy as np
+
+from lib.bytracker import iou_matrix_xyxy
+
+
+# -------------------------
+# Cost (IoU 후보쌍)
+# 후보는 희소 triplet (ti, di, iou) + 크기 (T, M) 로 통일
+# -------------------------
+def dense_pairs(trk_boxes, det_boxes):
+    """전체 IoU 행렬을 계산하고 IoU > 0 인 쌍만 남김"""
+    T, M = len(trk_boxes), len(det_boxes)
+    iou = iou_matrix_xyxy(trk_boxes, det_boxes)
+    ti, di = np.nonzero(iou > 0)
+    return ti, di, iou[ti, di], T, M
+
+def gated_pairs(trk_boxes, det_boxes):
+    """
+    공간적으로 겹치는 트랙/검출 쌍만 IoU 계산 (sweep)
+    - 검출을 x1로 정렬 → 트랙마다 x1이 (trk.x1 - 최대폭, trk.x2) 구간인 검출만 후보
+    - 후보 중 실제로 겹치는 쌍만 IoU 계산 → 밀집 장면에서 T*M 전체 계산 회피
+    """
+    A = np.asarray(trk_boxes, dtype=np.float32).reshape(-1, 4)
+    B = np.asarray(det_boxes, dtype=np.float32).reshape(-1, 4)
+    T, M = len(A), len(B)
+    empty = (np.zeros(0, np.int64), np.zeros(0, np.int64), np.zeros(0, np.float32), T, M)
+    if T == 0 or M == 0:
+        return empty
+
+    order = np.argsort(B[:, 0], kind='stable')
+    bx1 = B[order, 0]
+    max_w = float(np.max(B[:, 2] - B[:, 0]))
+    start = np.searchsorted(bx1, A[:, 0] - max_w, side='left')
+    end = np.searchsorted(bx1, A[:, 2], side='left')
+    lengths = np.maximum(end - start, 0)
+    total = int(lengths.sum())
+    if total == 0:
+        return empty
+
+    # 트랙별 [start, end) 구간을 한 번에 펼침
+    ti = np.repeat(np.arange(T), lengths)
+    offsets = np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    di = order[np.repeat(start, lengths) + offsets]
+
+    a = A[ti]
+    b = B[di]
+    iw = np.minimum(a[:, 2], b[:, 2]) - np.maximum(a[:, 0], b[:, 0])
+    ih = np.minimum(a[:, 3], b[:, 3]) - np.maximum(a[:, 1], b[:, 1])
+    hit = (iw > 0) & (ih > 0)
+    ti, di, a, b = ti[hit], di[hit], a[hit], b[hit]
+    inter = iw[hit] * ih[hit]
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    iou = inter / np.maximum(area_a + area_b - inter + 1e-6, 1e-6)
+    return ti, di, iou.astype(np.float32), T, M
+
+def select_rows(pairs, rows):
+    """후보쌍에서 일부 트랙(rows)만 남기고 트랙 인덱스를 0..len(rows)-1 로 재매핑"""
+    ti, di, vals, T, M = pairs
+    remap = np.full(T, -1, dtype=np.int64)
+    remap[np.asarray(rows, dtype=np.int64)] = np.arange(len(rows))
+    sub = remap[ti] if len(ti) else np.zeros(0, np.int64)
+    keep = sub >= 0
+    return sub[keep], di[keep], vals[keep], len(rows), M
+
+
+# -------------------------
+# Assignment
+# -------------------------
+def _unmatched(matched_t, matched_d):
+    return np.nonzero(~matched_t)[0].tolist(), np.nonzero(~matched_d)[0].tolist()
+
+def greedy_assign(pairs, thresh):
+    """
+    IoU 내림차순 그리디 매칭 (greedy_match_from_iou와 같은 결과)
+    - 행/열 모두에서 최고인 쌍(상호 최선)을 라운드마다 한꺼번에 확정 → 쌍 단위 파이썬 루프 없음
+    """
+    ti, di, vals, T, M = pairs
+    matched_t = np.zeros(T, dtype=bool)
+    matched_d = np.zeros(M, dtype=bool)
+    keep = vals >= float(thresh)
+    ti, di, vals = ti[keep], di[keep], vals[keep]
+    if ti.size == 0:
+        return [], list(range(T)), list(range(M))
+
+    # IoU 내림차순(동점은 트랙, 검출 순)으로 정렬 → 배열 순서 자체가 우선순위
+    order = np.lexsort((di, ti, -vals))
+    ti, di = ti[order], di[order]
+    mt, md = [], []
+    while ti.size:
+        row_best = np.zeros(ti.size, dtype=bool)
+        row_best[np.unique(ti, return_index=True)[1]] = True
+        col_best = np.zeros(ti.size, dtype=bool)
+        col_best[np.unique(di, return_index=True)[1]] = True
+        sel = row_best & col_best
+        mt.append(ti[sel]); md.append(di[sel])
+        matched_t[ti[sel]] = True
+        matched_d[di[sel]] = True
+        alive = ~(matched_t[ti] | matched_d[di])
+        ti, di = ti[alive], di[alive]
+
+    mt = np.concatenate(mt); md = np.concatenate(md)
+    matches = list(zip(mt.tolist(), md.tolist()))
+    u_tracks, u_dets = _unmatched(matched_t, matched_d)
+    return matches, u_tracks, u_dets
+
+def hungarian_assign(pairs, thresh):
+    """IoU 합 최대 최적 매칭 (scipy linear_sum_assignment, LAPJV 계열)"""
+    from scipy.optimize import linear_sum_assignment
+
+    ti, di, vals, T, M = pairs
+    matched_t = np.zeros(T, dtype=bool)
+    matched_d = np.zeros(M, dtype=bool)
+    keep = vals >= float(thresh)
+    if not keep.any():
+        return [], list(range(T)), list(range(M))
+
+    # 임계값 미만 쌍은 0 → 할당되더라도 아래에서 걸러짐
+    iou = np.zeros((T, M), dtype=np.float32)
+    iou[ti[keep], di[keep]] = vals[keep]
+    rows, cols = linear_sum_assignment(iou, maximize=True)
+    ok = iou[rows, cols] >= float(thresh)
+    rows, cols = rows[ok], cols[ok]
+    matched_t[rows] = True
+    matched_d[cols] = True
+    matches = list(zip(rows.tolist(), cols.tolist()))
+    u_tracks, u_dets = _unmatched(matched_t, matched_d)
+    return matches, u_tracks, u_dets
+
+
+class Associator:
+    """
+    ByteTrackLite 매칭 엔진
+    - method: 'greedy' (기본, 외부 의존성 없음) | 'hungarian' (scipy 최적 매칭)
+    - gate: True면 겹치는 쌍만 IoU 계산 (gated_pairs), False면 전체 IoU 행렬
+    cost()와 assign()을 나눠 cost는 스레드 풀에서 미리 계산할 수 있게 함
+    """
+    METHODS = {'greedy': greedy_assign, 'hungarian': hungarian_assign}
+
+    def __init__(self, method='greedy', gate=False):
+        if method not in self.METHODS:
+            raise ValueError("method must be one of: greedy | hungarian")
+        self.method = method
+        self.gate = bool(gate)
+        self._assign = self.METHODS[method]
+
+    def cost(self, trk_boxes, det_boxes):
+        return gated_pairs(trk_boxes, det_boxes) if self.gate else dense_pairs(trk_boxes, det_boxes)
+
+    def assign(self, pairs, thresh, rows=None):
+        # rows: 일부 트랙만 매칭할 때(2차 매칭) 전체 트랙 인덱스 목록 → 결과도 부분 인덱스 기준
+        if rows is not None:
+            pairs = select_rows(pairs, rows)
+        return self._assign(pairs, thresh)
+
+    def match(self, trk_boxes, det_boxes, thresh):
+        return self.assign(self.cost(trk_boxes, det_boxes), thresh)
+
+
+# -------------------------
+# 2차 검출(쓰러짐, PPE 등) → 사람 트랙 연결
+# -------------------------
+def best_per_track(iou, thresh):
+    """트랙마다 IoU 최대 검출 (여러 트랙이 같은 검출을 공유할 수 있음, 기존 match_falldown_to_tracks 동작)"""
+    T, M = iou.shape
+    if T == 0 or M == 0:
+        return np.full(T, -1, dtype=np.int64)
+    best = np.argmax(iou, axis=1)
+    ok = iou[np.arange(T), best] > float(thresh)
+    return np.where(ok, best, -1).astype(np.int64)
+
+def attach_secondary(trk_boxes, det_groups, thresh=0.3, method='best'):
+    """
+    사람 트랙과 2차 검출기 결과를 한 번에 연결
+    - det_groups: {이름: Mx4 xyxy 박스} → 모든 그룹을 이어붙여 IoU 행렬을 1회만 계산
+    - method: 'best' (트랙별 최대 IoU, IoU > thresh) | 'greedy' | 'hungarian' (1:1, IoU >= thresh)
+    반환: {이름: (T,) 검출 인덱스, 매칭 없으면 -1}
+    """
+    A = np.asarray(trk_boxes, dtype=np.float32).reshape(-1, 4)
+    T = len(A)
+    names = list(det_groups)
+    boxes = [np.asarray(det_groups[n], dtype=np.float32).reshape(-1, 4) for n in names]
+    bounds = np.cumsum([0] + [len(b) for b in boxes])
+    # NaN/inf 박스는 면적 0 박스로 → IoU 0
+    B = np.nan_to_num(np.concatenate(boxes), nan=0.0, posinf=0.0, neginf=0.0) if names else np.zeros((0, 4), np.float32)
+    iou = iou_matrix_xyxy(np.nan_to_num(A, nan=0.0, posinf=0.0, neginf=0.0), B)
+
+    out = {}
+    for name, lo, hi in zip(names, bounds[:-1], bounds[1:]):
+        sub = iou[:, lo:hi]
+        if method == 'best':
+            out[name] = best_per_track(sub, thresh)
+            continue
+        assign = Associator.METHODS.get(method)
+        if assign is None:
+            raise ValueError("method must be one of: best | greedy | hungarian")
+        ti, di = np.nonzero(sub > 0)
+        matches, _, _ = assign((ti, di, sub[ti, di], T, hi - lo), thresh)
+        idx = np.full(T, -1, dtype=np.int64)
+        for t, d in matches:
+            idx[t] = d
+        out[name] = idx
+    return out
+
+
+# -------------------------
+# 2차 검출 ROI (top-down)
+# 사람 트랙 주변만 잘라서 2차 모델(쓰러짐 등)을 추론
+# -------------------------
+def plan_crops(boxes, frame_shape, pad=0.25, min_size=64, full_frame_ratio=0.6):
+    """
+    사람 박스 [x1, y1, x2, y2] 목록 → 2차 검출용 crop 영역 목록 (정수 [x1, y1, x2, y2])
+    - 박스마다 가로/세로를 pad 비율만큼 넓힘 (한 변 최소 min_size), 프레임 안으로 자름
+    - 겹치는 crop은 둘을 감싸는 하나로 합침 (합친 뒤 다시 겹치면 반복)
+    - crop 넓이 합이 프레임의 full_frame_ratio 이상이면 프레임 전체 하나 (여러 번 추론하는 것보다 저렴)
+    """
+    h_img, w_img = frame_shape[:2]
+    B = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    if len(B) == 0:
+        return []
+
+    bw, bh = B[:, 2] - B[:, 0], B[:, 3] - B[:, 1]
+    px = np.maximum(bw * pad, (min_size - bw) / 2).clip(0)
+    py = np.maximum(bh * pad, (min_size - bh) / 2).clip(0)
+    R = np.column_stack([B[:, 0] - px, B[:, 1] - py, B[:, 2] + px, B[:, 3] + py])
+    R = np.round(R).astype(np.int64)
+    R[:, [0, 2]] = R[:, [0, 2]].clip(0, w_img)
+    R[:, [1, 3]] = R[:, [1, 3]].clip(0, h_img)
+    crops = [r for r in R.tolist() if r[2] > r[0] and r[3] > r[1]]
+
+    merged = True
+    while merged and len(crops) > 1:
+        merged = False
+        out = []
+        for c in crops:
+            for o in out:
+                if c[0] < o[2] and o[0] < c[2] and c[1] < o[3] and o[1] < c[3]:
+                    o[:] = [min(o[0], c[0]), min(o[1], c[1]), max(o[2], c[2]), max(o[3], c[3])]
+                    merged = True
+                    break
+            else:
+                out.append(c)
+        crops = out
+
+    area = sum((c[2] - c[0]) * (c[3] - c[1]) for c in crops)
+    if area >= full_frame_ratio * w_img * h_img:
+        return [[0, 0, w_img, h_img]]
+    return crops
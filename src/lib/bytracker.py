@@ -1,5 +1,6 @@
 import time
 import copy
+from collections import deque
 import numpy as np
 import cv2
 from concurrent.futures import ThreadPoolExecutor
@@ -34,9 +35,10 @@ def iou_matrix_xyxy(trk_boxes, det_boxes):
     br = np.minimum(A[:, None, 2:], B[None, :, 2:])
     wh = np.clip(br - tl, 0, None)
     inter = wh[:, :, 0] * wh[:, :, 1]
-    area_a = (A[:, 2]-A[:, 0]) * (A[:, 3]-A[:, 1])
-    area_b = (B[:, 2]-B[:, 0]) * (B[:, 3]-B[:, 1])
-    union = area_a[:, None] + area_b[None, :] - inter + 1e-6
+    # 뒤집힌/폭 0 박스는 면적 0으로 취급 → 0 나누기/음수 IoU 방지
+    area_a = np.clip(A[:, 2]-A[:, 0], 0, None) * np.clip(A[:, 3]-A[:, 1], 0, None)
+    area_b = np.clip(B[:, 2]-B[:, 0], 0, None) * np.clip(B[:, 3]-B[:, 1], 0, None)
+    union = np.maximum(area_a[:, None] + area_b[None, :] - inter + 1e-6, 1e-6)
     return inter / union
 
 # 빠른 매칭을 위한 IoU 기반 그리디 매처(사전 계산된 IoU 사용)
@@ -76,6 +78,144 @@ def xywh_c_to_xyxy(det):
     y2 = int(round(y1 + h))
     return [x1, y1, x2, y2]
 
+def clip_roi(bbox, frame_shape):
+    # bbox를 프레임 안으로 자른 ROI 좌표 [x1,y1,x2,y2], 비면 None
+    h_img, w_img = frame_shape[:2]
+    x1, y1, x2, y2 = bbox
+    rx1 = max(0, x1)
+    ry1 = max(0, y1)
+    rx2 = min(w_img, x2)
+    ry2 = min(h_img, y2)
+    if rx2 > rx1 and ry2 > ry1:
+        return [rx1, ry1, rx2, ry2]
+    return None
+
+def crop_roi(frame, track):
+    """
+    트랙의 roi_box로 frame을 잘라 view로 반환 (복사 없음, 없으면 None)
+    - 공유메모리 프레임이면 그대로 공유메모리 위의 view
+    - 원본을 보존해야 하면 호출측에서 .copy()
+    """
+    roi_box = track.get('roi_box')
+    if frame is None or roi_box is None:
+        return None
+    rx1, ry1, rx2, ry2 = roi_box
+    return frame[ry1:ry2, rx1:rx2]
+
+# -------------------------
+# 배열 기반 트랙 출력 (update(..., as_array=True))
+# 프로세스 간 전달 시 dict 리스트 대신 구조화 배열 하나를 피클링 → 직렬화 비용/크기 감소
+# -------------------------
+TRACK_DTYPE = np.dtype([
+    ('id', np.int32),
+    ('label', 'S16'),
+    ('score', np.float32),
+    ('bbox', np.int32, (4,)),
+    ('disp_bbox', np.int32, (4,)),
+    ('roi_box', np.int32, (4,)),        # 비어 있으면 0,0,0,0
+    ('confirmed', np.bool_),
+    ('matched', np.bool_),
+    ('time_since_update', np.int32),
+    ('hits', np.int32),
+    ('falldown_label', 'S16'),          # 비어 있으면 쓰러짐 상태 없음
+    ('falldown_score', np.float32),
+    ('helmet_label', 'S16'),            # 비어 있으면 헬멧 결과 없음
+    ('helmet_score', np.float32),
+])
+
+def check_labels(names, key=''):
+    # 라벨은 TRACK_DTYPE / RECORD_DTYPE의 S16 필드에 들어감 → ASCII 16바이트를 넘으면 잘리거나 저장 시 오류
+    size = TRACK_DTYPE['label'].itemsize
+    bad = [n for n in names if not n.isascii() or len(n) > size]
+    if bad:
+        raise ValueError(f"{key}: 라벨은 ASCII {size}바이트 이하여야 함 {bad}")
+
+class TrackView:
+    """
+    TRACK_DTYPE 배열의 한 행을 dict처럼 읽고 쓰는 view (복사 없음)
+    - 기존 dict 키 그대로 사용: track['bbox'], track.get('matched'), track['falldown_status'] = {...}
+    - helmet_results는 최고 점수 결과 하나만 저장/반환
+    """
+    __slots__ = ('arr', 'i')
+
+    def __init__(self, arr, i):
+        self.arr = arr
+        self.i = i
+
+    def __getitem__(self, key):
+        row = self.arr[self.i]
+        if key in ('bbox', 'disp_bbox'):
+            return row[key].tolist()
+        if key in ('id', 'time_since_update', 'hits'):
+            return int(row[key])
+        if key in ('confirmed', 'matched'):
+            return bool(row[key])
+        if key == 'score':
+            return float(row[key])
+        if key == 'label':
+            return row[key].decode()
+        if key == 'roi_box':
+            box = row['roi_box'].tolist()
+            return box if box[2] > box[0] and box[3] > box[1] else None
+        if key == 'missed':
+            return int(row['time_since_update'])
+        if key == 'bbox_pos':
+            x1, y1, x2, y2 = row['bbox'].tolist()
+            return (int((x1 + x2)/2), int((y1 + y2)/2))
+        if key == 'size':
+            x1, y1, x2, y2 = row['bbox'].tolist()
+            return [x2 - x1, y2 - y1]
+        if key == 'falldown_status':
+            if not row['falldown_label']:
+                raise KeyError(key)
+            return {'label': row['falldown_label'].decode(), 'score': float(row['falldown_score'])}
+        if key == 'helmet_results':
+            if not row['helmet_label']:
+                return []
+            return [(row['helmet_label'].decode(), float(row['helmet_score']), None)]
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        row = self.arr[self.i]
+        if key == 'falldown_status':
+            row['falldown_label'] = value['label']
+            row['falldown_score'] = value['score']
+        elif key == 'helmet_results':
+            label, score = '', 0.0
+            if value:
+                label, score, _ = max(value, key=lambda x: x[1])
+            row['helmet_label'] = label
+            row['helmet_score'] = score
+        elif key in TRACK_DTYPE.names:
+            row[key] = value
+        else:
+            raise KeyError(key)
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+def iter_tracks(tracks):
+    # dict 리스트 / TRACK_DTYPE 배열 모두 dict처럼 순회할 수 있는 목록으로
+    if isinstance(tracks, np.ndarray):
+        return [TrackView(tracks, i) for i in range(len(tracks))]
+    return tracks or []
+
+def track_boxes(tracks):
+    # 트랙 bbox를 (N, 4) float32 배열로
+    if isinstance(tracks, np.ndarray):
+        return tracks['bbox'].astype(np.float32, copy=False)
+    return np.asarray([t['bbox'] for t in tracks or []], dtype=np.float32).reshape(-1, 4)
+
 def xyxy_to_z(bbox):
     # z = [cx, cy, s, r]^T
     x1, y1, x2, y2 = bbox
@@ -87,6 +227,24 @@ def xyxy_to_z(bbox):
     r  = w / h
     return np.array([[cx], [cy], [s], [r]], dtype=np.float32)
 
+def xyxy_to_z_batch(boxes):
+    # boxes: (k,4) xyxy → (k,4) [cx, cy, s, r]
+    b = np.asarray(boxes, dtype=np.float64).reshape(-1, 4)
+    w = np.maximum(1.0, b[:, 2] - b[:, 0])
+    h = np.maximum(1.0, b[:, 3] - b[:, 1])
+    z = np.stack([b[:, 0] + w/2.0, b[:, 1] + h/2.0, w * h, w / h], axis=1)
+    return z.astype(np.float32)
+
+def x_to_bbox_batch(x):
+    # x: (N,7) → (N,4) int xyxy (x_to_bbox와 같은 계산을 행 단위로)
+    cx, cy = x[:, 0], x[:, 1]
+    s = np.maximum(np.float32(1.0), x[:, 2])
+    r = np.maximum(np.float32(1e-3), x[:, 3])
+    w = np.sqrt(s * r)
+    h = s / w
+    boxes = np.stack([cx - w/2.0, cy - h/2.0, cx + w/2.0, cy + h/2.0], axis=1)
+    return np.round(boxes).astype(np.int64)
+
 def x_to_bbox(x):
     # x = [cx, cy, s, r, vx, vy, vs]^T
     cx, cy, s, r = x[0,0], x[1,0], max(1.0, x[2,0]), max(1e-3, x[3,0])
@@ -176,13 +334,98 @@ class KalmanBox:
         I = np.eye(self.dim_x, dtype=np.float32)
         self.P = (I - K @ self.H) @ self.P
 
+class KalmanBatch:
+    """
+    전체 트랙의 칼만 필터를 한 번에 처리 (KalmanBox와 같은 모델)
+    - 상태 x: (N,7), 공분산 P: (N,7,7) 연속 배열 / 트랙은 행 번호(kf_idx)로 참조
+    - predict/update가 모든(또는 지정한) 행을 한 번의 배열 연산으로 처리
+    - 용량이 차면 2배로 늘리고, 삭제된 트랙은 compact()로 앞으로 당김
+    """
+    def __init__(self, capacity=64):
+        model = KalmanBox()
+        self.dim_x = model.dim_x
+        self.dim_z = model.dim_z
+        self.F = model.F
+        self.H = model.H
+        self.Q = model.Q
+        self.R = model.R
+        self.P0 = np.eye(self.dim_x, dtype=np.float32) * 10.0
+
+        capacity = max(1, int(capacity))
+        self.x = np.zeros((capacity, self.dim_x), dtype=np.float32)
+        self.P = np.zeros((capacity, self.dim_x, self.dim_x), dtype=np.float32)
+        self.n = 0
+
+    def __len__(self):
+        return self.n
+
+    def _grow(self, need):
+        cap = self.x.shape[0]
+        if need <= cap:
+            return
+        while cap < need:
+            cap *= 2
+        x = np.zeros((cap, self.dim_x), dtype=np.float32)
+        P = np.zeros((cap, self.dim_x, self.dim_x), dtype=np.float32)
+        x[:self.n] = self.x[:self.n]
+        P[:self.n] = self.P[:self.n]
+        self.x, self.P = x, P
+
+    def add(self, z):
+        # z: (4,) 또는 (4,1) → 새 행 번호
+        self._grow(self.n + 1)
+        i = self.n
+        self.x[i, :self.dim_z] = np.asarray(z, dtype=np.float32).reshape(-1)
+        self.x[i, self.dim_z:] = 0.0
+        self.P[i] = self.P0
+        self.n += 1
+        return i
+
+    def predict(self, idx=None):
+        # idx 없으면 전체 행 예측, 예측된 박스 (k,4) 반환
+        sel = slice(0, self.n) if idx is None else idx
+        x = self.x[sel]
+        P = self.P[sel]
+        x = x @ self.F.T
+        P = self.F @ P @ self.F.T + self.Q
+        self.x[sel] = x
+        self.P[sel] = P
+        return x_to_bbox_batch(x)
+
+    def update(self, idx, Z):
+        # idx: (k,) 행 번호, Z: (k,4) 관측 → 보정된 박스 (k,4) 반환
+        idx = np.asarray(idx, dtype=np.int64)
+        if idx.size == 0:
+            return np.zeros((0, 4), dtype=np.int64)
+        x = self.x[idx]
+        P = self.P[idx]
+        d = self.dim_z
+        # H는 앞 4개 상태만 고르므로 H P H^T = P[:4,:4], P H^T = P[:, :4]
+        S = P[:, :d, :d] + self.R
+        K = P[:, :, :d] @ np.linalg.inv(S)
+        y = np.asarray(Z, dtype=np.float32) - x[:, :d]
+        x = x + (K @ y[:, :, None])[:, :, 0]
+        P = P - K @ P[:, :d, :]
+        self.x[idx] = x
+        self.P[idx] = P
+        return x_to_bbox_batch(x)
+
+    def compact(self, keep):
+        # keep: 남길 행 번호(순서 유지) → 0..len(keep)-1 로 재배치
+        keep = np.asarray(keep, dtype=np.int64)
+        m = keep.size
+        self.x[:m] = self.x[keep]
+        self.P[:m] = self.P[keep]
+        self.n = m
+
 # -------------------------
 # Track class
 # -------------------------
 class Track:
-    def __init__(self, bbox_xyxy, label, score, tid, now_ts):
-        self.kf = KalmanBox()
-        self.kf.initiate(xyxy_to_z(bbox_xyxy))
+    def __init__(self, bbox_xyxy, label, score, tid, now_ts, kf=None, history_len=30):
+        # 칼만 상태는 KalmanBatch의 한 행 (단독 사용 시 자기 전용 배치)
+        self.kf = kf if kf is not None else KalmanBatch(capacity=1)
+        self.kf_idx = self.kf.add(xyxy_to_z(bbox_xyxy))
 
         self.id = tid
         self.label = label
@@ -196,23 +439,33 @@ class Track:
         self.created_at = now_ts
         #self.color = rand_color_by_id(tid)
         self.confirmed = False
-        self.history = []
+        self.history = deque(maxlen=history_len) # 최근 history_len 프레임 박스만 (장시간 운용 시 메모리 고정)
         self._matched_this_frame = False
         self.last_matched_bbox = bbox_xyxy
 
     def predict(self):
+        bbox = self.kf.predict([self.kf_idx])[0].tolist()
+        return self.mark_predicted(bbox)
+
+    def update(self, bbox_xyxy, score):
+        bbox = self.kf.update([self.kf_idx], xyxy_to_z_batch([bbox_xyxy]))[0].tolist()
+        self.mark_updated(bbox, score)
+
+    # ByteTrackLite는 KalmanBatch로 전체를 한 번에 계산하고 트랙 상태만 아래로 반영
+    # aged=False: 검출을 건너뛴 프레임 → 미검출로 세지 않음 (max_age는 검출 프레임 기준)
+    def mark_predicted(self, bbox, aged=True):
         self.age += 1
-        self.time_since_update += 1
-        self.bbox = self.kf.predict()
+        if aged:
+            self.time_since_update += 1
+        self.bbox = bbox
         self.history.append(self.bbox)
         return self.bbox
 
-    def update(self, bbox_xyxy, score):
+    def mark_updated(self, bbox, score):
         self.time_since_update = 0
         self.hits += 1
         self.score = float(score)
-        self.kf.update(xyxy_to_z(bbox_xyxy))
-        self.bbox = x_to_bbox(self.kf.x)
+        self.bbox = bbox
         self._matched_this_frame = True
         self.last_matched_bbox = self.bbox
 
@@ -221,20 +474,29 @@ class Track:
 # -------------------------
 class ByteTrackLite:
     """
-    YOLOv4 친화: 2스테이지 매칭(High/Low score) + SORT 칼만 + IoU 그리디
-    - 외부 ReID/Scipy 의존성 없음
+    YOLOv4 친화: 2스테이지 매칭(High/Low score) + SORT 칼만 + IoU 매칭
+    - 외부 ReID 의존성 없음 (Scipy는 match_method='hungarian'일 때만 사용)
+    - match_method: 'greedy' | 'hungarian' / match_gate: 겹치는 쌍만 IoU 계산 (lib.association)
     """
     def __init__(self, fps=30, track_thresh=0.5, low_thresh=0.1,
-                 match_thresh=0.7, max_age=30, min_hits=3):
+                 match_thresh=0.7, max_age=30, min_hits=3,
+                 match_method='greedy', match_gate=False, history_len=30):
+        # association이 이 모듈의 IoU 함수를 쓰므로 순환 import 방지용 지역 import
+        from lib.association import Associator
+
         self.fps = fps
         self.track_thresh = float(track_thresh)
         self.low_thresh = float(low_thresh)
         self.match_thresh = float(match_thresh)
-        self.max_age = int(max_age)             # 미검출 허용 프레임
+        self.max_age = int(max_age)             # 미검출 허용 프레임 (검출 프레임 기준, 건너뛴 프레임은 세지 않음)
         self.min_hits = int(min_hits)           # 확정 전 최소 업데이트 수
+        self.history_len = int(history_len)     # 트랙별 보관할 박스 이력 길이
 
         self.tracks = []
         self._next_id = 0
+        # 전체 트랙 칼만 상태 (self.tracks[i].kf_idx == i 유지)
+        self.kf = KalmanBatch()
+        self.associator = Associator(match_method, match_gate)
         # IoU 행렬 계산 병렬화를 위한 스레드 풀(넘파이는 GIL을 해제하므로 스레드로도 이점 有)
         self._executor = ThreadPoolExecutor(max_workers=2)
 
@@ -248,9 +510,10 @@ class ByteTrackLite:
                 lo.append(det)
         return hi, lo
 
-    def update(self, yolo_results, frame=None):
+    def update(self, yolo_results, frame=None, as_array=False):
         """
         yolo_results: [ [label, score, [cx,cy,w,h]], ... ]
+        as_array=True면 dict 리스트 대신 TRACK_DTYPE 구조화 배열 반환
         """
         now = time.time()
         # 0) 중복 제거(라벨별 고득점 우선)
@@ -259,11 +522,11 @@ class ByteTrackLite:
         # 1) 하이/로우 분리
         hi, lo = self._split_by_score(yolo_results)
 
-        # 2) 예측 단계
+        # 2) 예측 단계 (전체 트랙 한 번에)
         for t in self.tracks:
             # 새 프레임 시작 시 매칭 여부 초기화
             t._matched_this_frame = False
-            t.predict()
+        self._predict_all()
 
         removed_ids = []
 
@@ -272,45 +535,40 @@ class ByteTrackLite:
         hi_boxes = np.asarray([xywh_c_to_xyxy(det[2]) for det in hi], dtype=np.float32) if hi else np.zeros((0,4), dtype=np.float32)
         lo_boxes = np.asarray([xywh_c_to_xyxy(det[2]) for det in lo], dtype=np.float32) if lo else np.zeros((0,4), dtype=np.float32)
 
-        # 3) IoU 행렬 병렬 계산(하이/로우)
-        fut_hi = self._executor.submit(iou_matrix_xyxy, trk, hi_boxes) if hi_boxes.shape[0] > 0 else None
-        fut_lo = self._executor.submit(iou_matrix_xyxy, trk, lo_boxes) if lo_boxes.shape[0] > 0 else None
+        # 3) IoU 후보쌍 병렬 계산(하이/로우)
+        cost = self.associator.cost
+        fut_hi = self._executor.submit(cost, trk, hi_boxes) if hi_boxes.shape[0] > 0 else None
+        fut_lo = self._executor.submit(cost, trk, lo_boxes) if lo_boxes.shape[0] > 0 else None
 
         # 4) 1차 매칭 (하이 점수만)
         matches1 = []
+        updates = []
         u_t1 = list(range(len(self.tracks)))
         u_d1 = list(range(len(hi)))
         if fut_hi is not None:
-            iou_hi = fut_hi.result()
-            matches1, u_t1, u_d1 = greedy_match_from_iou(iou_hi, self.match_thresh)
-            # 매칭된 트랙 업데이트
+            matches1, u_t1, u_d1 = self.associator.assign(fut_hi.result(), self.match_thresh)
+            # 매칭된 트랙 (칼만 보정은 2차 매칭 후 한 번에)
             for ti, di in matches1:
-                det = hi[di]
-                bbox = xywh_c_to_xyxy(det[2])
-                self.tracks[ti].update(bbox, det[1])
-                self.tracks[ti].label = det[0]
+                updates.append((ti, hi[di]))
 
         # 5) 2차 매칭 (남은 트랙 ↔ 로우 점수)
         if fut_lo is not None and len(u_t1) > 0:
-            iou_lo = fut_lo.result()
             # 남은 트랙 부분행만 사용
-            iou_lo_sub = iou_lo[u_t1, :] if iou_lo.shape[0] > 0 else iou_lo
-            match2, u_t2_sub, u_d2 = greedy_match_from_iou(iou_lo_sub, self.match_thresh)
+            match2, u_t2_sub, u_d2 = self.associator.assign(fut_lo.result(), self.match_thresh, rows=u_t1)
             # 인덱스 보정: 부분행 -> 전체 트랙 인덱스
             for rti, ldi in match2:
-                ti = u_t1[rti]
-                det = lo[ldi]
-                bbox = xywh_c_to_xyxy(det[2])
-                self.tracks[ti].update(bbox, det[1])
-                self.tracks[ti].label = det[0]
+                updates.append((u_t1[rti], lo[ldi]))
             # u_t2_sub은 부분행 기준. 필요 시 참조용으로 남겨둘 수 있으나 이후 로직에 직접 사용하지 않음.
+
+        # 1·2차 매칭 결과를 칼만 보정 한 번으로 반영
+        self._update_matched(updates)
         
         # 6) 신규 트랙 생성 (1차에서 매칭 안 된 하이 점수 검출만으로 생성)
         if len(hi) > 0 and len(u_d1) > 0:
             for di in u_d1:
                 det = hi[di]
                 bbox = xywh_c_to_xyxy(det[2])
-                t = Track(bbox, det[0], det[1], self._next_id, now)
+                t = Track(bbox, det[0], det[1], self._next_id, now, kf=self.kf, history_len=self.history_len)
                 self._next_id += 1
                 # 생성 직후는 관측 기반이므로 매칭된 것으로 간주
                 t._matched_this_frame = True
@@ -326,8 +584,46 @@ class ByteTrackLite:
             if not t.confirmed and t.hits >= self.min_hits:
                 t.confirmed = True
             alive_tracks.append(t)
+        if len(alive_tracks) != len(self.tracks):
+            self.kf.compact([t.kf_idx for t in alive_tracks])
+            for i, t in enumerate(alive_tracks):
+                t.kf_idx = i
         self.tracks = alive_tracks
 
+        return self.export(frame, as_array), removed_ids
+
+    def predict(self, frame=None, as_array=False):
+        """
+        검출을 건너뛴 프레임용: 칼만 예측만 수행하고 update()와 같은 형식으로 반환
+        - 매칭 여부(matched)는 직전 검출 프레임 기준을 유지 → 박스가 프레임마다 예측 위치로 이동
+        - 트랙 생성/삭제는 update()에서만, 미검출 카운트(time_since_update)도 검출 프레임에서만 증가
+        """
+        self._predict_all(aged=False)
+        return self.export(frame, as_array), []
+
+    def _predict_all(self, aged=True):
+        if not self.tracks:
+            return
+        boxes = self.kf.predict().tolist()
+        for t, bbox in zip(self.tracks, boxes):
+            t.mark_predicted(bbox, aged)
+
+    def _update_matched(self, updates):
+        # updates: [(track index, det), ...]
+        if not updates:
+            return
+        idx = [self.tracks[ti].kf_idx for ti, _ in updates]
+        Z = xyxy_to_z_batch([xywh_c_to_xyxy(det[2]) for _, det in updates])
+        boxes = self.kf.update(idx, Z).tolist()
+        for (ti, det), bbox in zip(updates, boxes):
+            t = self.tracks[ti]
+            t.mark_updated(bbox, det[1])
+            t.label = det[0]
+
+    def export(self, frame=None, as_array=False):
+        if as_array:
+            return self.export_array(frame)
+
         # 8) 반환 형태(네 코드와 유사한 dict)
         out_tracks = []
         for track in self.tracks:
@@ -340,16 +636,8 @@ class ByteTrackLite:
             draw_box = track.bbox if matched_now else track.last_matched_bbox
             dx1,dy1,dx2,dy2 = draw_box
             
-            # --- roi_frame 추가 ---
-            roi_frame = None
-            if frame is not None:
-                h_img, w_img = frame.shape[:2]
-                rx1 = max(0, x1)
-                ry1 = max(0, y1)
-                rx2 = min(w_img, x2)
-                ry2 = min(h_img, y2)
-                if rx2 > rx1 and ry2 > ry1:
-                    roi_frame = frame[ry1:ry2, rx1:rx2].copy()
+            # --- ROI는 좌표만 (잘라내기는 필요한 쪽에서 crop_roi로) ---
+            roi_box = clip_roi(track.bbox, frame.shape) if frame is not None else None
 
             out_tracks.append({
                 'id': track.id,
@@ -365,7 +653,34 @@ class ByteTrackLite:
                 'hits': track.hits,
                 'matched': matched_now,
                 'missed': int(track.time_since_update),
-                'roi_frame': roi_frame
+                'roi_box': roi_box
             })
 
-        return out_tracks, removed_ids
+        return out_tracks
+
+    def export_array(self, frame=None):
+        # export()와 같은 내용을 TRACK_DTYPE 배열로
+        out = np.zeros(len(self.tracks), dtype=TRACK_DTYPE)
+        if not self.tracks:
+            return out
+        matched = np.array([bool(getattr(t, '_matched_this_frame', False)) for t in self.tracks])
+        bbox = np.array([t.bbox for t in self.tracks], dtype=np.int32)
+        out['id'] = [t.id for t in self.tracks]
+        out['label'] = [t.label for t in self.tracks]
+        out['score'] = [t.score for t in self.tracks]
+        out['bbox'] = bbox
+        out['disp_bbox'] = np.where(matched[:, None], bbox,
+                                    np.array([t.last_matched_bbox for t in self.tracks], dtype=np.int32))
+        out['confirmed'] = [t.confirmed for t in self.tracks]
+        out['matched'] = matched
+        out['time_since_update'] = [t.time_since_update for t in self.tracks]
+        out['hits'] = [t.hits for t in self.tracks]
+        if frame is not None:
+            h_img, w_img = frame.shape[:2]
+            roi = bbox.copy()
+            np.clip(roi[:, 0::2], 0, w_img, out=roi[:, 0::2])
+            np.clip(roi[:, 1::2], 0, h_img, out=roi[:, 1::2])
+            valid = (roi[:, 2] > roi[:, 0]) & (roi[:, 3] > roi[:, 1])
+            roi[~valid] = 0
+            out['roi_box'] = roi
+        return out
@@ -0,0 +1,242 @@
+import os
+import time
+import numpy as np
+import cv2
+
+from lib.init import DETECTOR_BACKEND, SYNTHETIC_DETECTOR_CFG, WEIGHTS_MMAP, model_cfgs
+from lib.bytracker import check_labels
+from lib.weights import check_weights, map_weights
+
+
+# detect(..., as_array=True) 반환 형식: bbox = (cx, cy, w, h) 원본 프레임 좌표
+DET_DTYPE = np.dtype([('class_id', np.int32), ('score', np.float32), ('bbox', np.float32, (4,))])
+
+BACKENDS = ('auto', 'darknet', 'opencv', 'synthetic')
+
+# 프로세스별 모델 레지스트리: (모델 키, 백엔드) -> 검출기, 모델 키 -> 로드 시간(초)
+_models = {}
+_load_times = {}
+
+
+def read_names(namesPath):
+    with open(namesPath) as f:
+        return [x.strip() for x in f.read().strip().splitlines()]
+
+def read_net_size(configPath, default=(416, 416)):
+    # cfg의 [net] 섹션에서 입력 크기 (w, h)
+    size = dict(zip(('width', 'height'), default))
+    section = None
+    with open(configPath) as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line.startswith('['):
+                if section == 'net':
+                    break
+                section = line.strip('[]').strip()
+            elif section == 'net' and '=' in line:
+                k, v = (x.strip() for x in line.split('=', 1))
+                if k in size:
+                    size[k] = int(v)
+    return size['width'], size['height']
+
+def decode_arrays(bbox, prob, bf_size, af_size, names, as_array=False):
+    """
+    (num, 4) 박스 + (num, classes) 클래스별 점수(0이면 제외) → detect() 반환 형식, 점수 내림차순.
+    bbox는 네트워크 입력 좌표(af_size), 결과는 원본 프레임 좌표(bf_size)
+    as_array=True면 DET_DTYPE 구조화 배열, 아니면 [(label, score, (x, y, w, h)), ...]
+    """
+    det_idx, cls_idx = np.nonzero(prob > 0)
+    scores = prob[det_idx, cls_idx]
+    order = np.argsort(-scores, kind='stable')
+    det_idx, cls_idx, scores = det_idx[order], cls_idx[order], scores[order]
+
+    af = np.array([af_size[1], af_size[0]] * 2, np.float64)
+    bf = np.array([bf_size[1], bf_size[0]] * 2, np.float64)
+    boxes = bf * (bbox[det_idx].astype(np.float64) / af)
+
+    if as_array:
+        out = np.empty(len(scores), DET_DTYPE)
+        out['class_id'] = cls_idx
+        out['score'] = scores
+        out['bbox'] = boxes
+        return out
+
+    return [(names[i], p, tuple(b)) for i, p, b in zip(cls_idx.tolist(), scores.tolist(), boxes.tolist())]
+
+
+class OpenCvYolo:
+    """
+    cv2.dnn CPU 백엔드 (GPU/libdarknet.so 없는 개발 장비, CI용)
+    - darknet과 같은 model.cfg / model.weights를 readNetFromDarknet으로 로드 (WEIGHTS_MMAP이면 mmap 버퍼에서)
+    - detect / detect_batch 인자와 반환 형식은 yolov4.Yolo와 동일
+    - letterbox는 지원하지 않음 (항상 네트워크 입력 크기로 resize)
+    """
+    def __init__(self, configPath, weightPath, namesPath, batch_size=1, gpus=0, letterbox=False):
+        if not hasattr(cv2.dnn, 'readNetFromDarknet'):
+            raise RuntimeError(f"cv2 {cv2.__version__}: darknet 모델 로더 없음 (opencv 4.x 필요)")
+        if WEIGHTS_MMAP:
+            # 파일 페이지 캐시에서 바로 파싱 → 프로세스마다 파일을 따로 읽어 들이지 않음
+            self.net = cv2.dnn.readNetFromDarknet(np.fromfile(configPath, np.uint8), map_weights(weightPath))
+        else:
+            self.net = cv2.dnn.readNetFromDarknet(configPath, weightPath)
+        self.net.setPreferableBackend(cv2.dnn.DNN_BACKEND_OPENCV)
+        self.net.setPreferableTarget(cv2.dnn.DNN_TARGET_CPU)
+        self.out_names = self.net.getUnconnectedOutLayersNames()
+        self.batch_size = max(1, int(batch_size))
+        self.net_width, self.net_height = read_net_size(configPath)
+        self.meta_names = read_names(namesPath)
+        self.meta_classes = len(self.meta_names)
+
+    def detect(self, frame, thresh=.5, hier_thresh=.5, nms=.45, is_dummy=False, as_array=False, key=None):
+        if is_dummy:
+            return np.zeros(0, DET_DTYPE) if as_array else []
+        return self.predict_batch([frame], thresh, nms, as_array)[0]
+
+    def detect_batch(self, frames, thresh=.5, hier_thresh=.5, nms=.45, as_array=False, keys=None):
+        # keys: 프레임 번호 (SyntheticYolo 전용, 실제 모델은 무시)
+        results = []
+        for start in range(0, len(frames), self.batch_size):
+            results.extend(self.predict_batch(frames[start:start + self.batch_size], thresh, nms, as_array))
+        return results
+
+    def predict_batch(self, frames, thresh, nms, as_array=False):
+        blob = cv2.dnn.blobFromImages(frames, 1.0 / 255.0, (self.net_width, self.net_height),
+                                      swapRB=True, crop=False)
+        self.net.setInput(blob)
+        # yolo 출력 한 행 = [cx, cy, w, h (0~1), objectness, 클래스별 objectness * 확률]
+        outs = [o.reshape(len(frames), -1, 5 + self.meta_classes) for o in self.net.forward(self.out_names)]
+        rows = np.concatenate(outs, axis=1)
+        af_size = (1.0, 1.0)
+        results = []
+        for i, frame in enumerate(frames):
+            bbox = rows[i, :, :4]
+            prob = np.where(rows[i, :, 5:] > thresh, rows[i, :, 5:], 0.0).astype(np.float32)
+            if nms:
+                self.nms_per_class(bbox, prob, nms)
+            results.append(decode_arrays(bbox, prob, frame.shape[:2], af_size, self.meta_names, as_array))
+        return results
+
+    @staticmethod
+    def nms_per_class(bbox, prob, nms):
+        # darknet do_nms_sort와 같이 클래스별로 겹치는 박스의 점수를 0으로
+        tl = np.column_stack([bbox[:, 0] - bbox[:, 2] / 2, bbox[:, 1] - bbox[:, 3] / 2, bbox[:, 2], bbox[:, 3]])
+        for c in range(prob.shape[1]):
+            idx = np.flatnonzero(prob[:, c])
+            if len(idx) < 2:
+                continue
+            keep = np.asarray(cv2.dnn.NMSBoxes(tl[idx].tolist(), prob[idx, c].tolist(), 0.0, nms)).reshape(-1)
+            drop = np.ones(len(idx), bool)
+            drop[keep] = False
+            prob[idx[drop], c] = 0.0
+
+
+class SyntheticYolo:
+    """
+    모델 없이 동작하는 결정적 가짜 검출기 (파이프라인 처리량 측정용, weights 파일 불필요)
+    - 물체 objects개가 화면 안을 seed로 정해진 궤적으로 이동, 클래스는 번갈아 가며
+    - 위치는 호출자가 넘긴 key(프레임 번호)로 계산 → 같은 프레임의 원본/업스케일/ROI 호출은 같은 위치(이미지 비율 좌표),
+      key가 같으면 실행/배치 구성과 무관하게 결과도 같음 (key가 없으면 호출 순서대로 번호를 매김)
+    - 주기 3000~9000 프레임(30fps 기준 100~300초)으로 느리게 이동 → 검출 간격이 6프레임이어도 IoU가 트래커 match_thresh 이상
+    - latency_ms: forward 한 번(배치)당 지연을 흉내 (0이면 없음)
+    """
+    def __init__(self, configPath, weightPath, namesPath, batch_size=1, gpus=0, letterbox=False,
+                 objects=3, latency_ms=0.0, seed=0):
+        self.batch_size = max(1, int(batch_size))
+        self.net_width, self.net_height = read_net_size(configPath) if os.path.exists(configPath) else (416, 416)
+        self.meta_names = read_names(namesPath) if os.path.exists(namesPath) else ['person']
+        self.meta_classes = len(self.meta_names)
+        self.objects = int(objects)
+        self.latency = float(latency_ms) / 1000.0
+        rng = np.random.default_rng(seed)
+        # 물체별 궤적 (프레임당 주기 수, 위상, 크기) - 화면 크기 대비 비율
+        self.freq = rng.uniform(1 / 9000, 1 / 3000, (self.objects, 2))
+        self.phase = rng.uniform(0, 2 * np.pi, (self.objects, 2))
+        self.size = rng.uniform((0.08, 0.15), (0.15, 0.4), (self.objects, 2))
+        self.score = rng.uniform(0.55, 0.95, self.objects)
+        self.calls = 0
+
+    def detect(self, frame, thresh=.5, hier_thresh=.5, nms=.45, is_dummy=False, as_array=False, key=None):
+        if is_dummy:
+            return np.zeros(0, DET_DTYPE) if as_array else []
+        return self.predict_batch([frame], thresh, as_array, None if key is None else [key])[0]
+
+    def detect_batch(self, frames, thresh=.5, hier_thresh=.5, nms=.45, as_array=False, keys=None):
+        results = []
+        for start in range(0, len(frames), self.batch_size):
+            chunk = None if keys is None else keys[start:start + self.batch_size]
+            results.extend(self.predict_batch(frames[start:start + self.batch_size], thresh, as_array, chunk))
+        return results
+
+    def predict_batch(self, frames, thresh, as_array=False, keys=None):
+        if self.latency > 0:
+            time.sleep(self.latency)
+        if keys is None:
+            keys = range(self.calls, self.calls + len(frames))
+            self.calls += len(frames)
+        wh = self.size
+        prob = np.zeros((self.objects, self.meta_classes), np.float32)
+        keep = self.score > thresh
+        cls = np.arange(self.objects) % self.meta_classes
+        prob[keep, cls[keep]] = self.score[keep]
+        results = []
+        for frame, key in zip(frames, keys):
+            c = wh / 2 + (1 - wh) * (0.5 + 0.5 * np.sin(key * 2 * np.pi * self.freq + self.phase))
+            bbox = np.column_stack([c, wh]).astype(np.float32)
+            results.append(decode_arrays(bbox, prob, frame.shape[:2], (1.0, 1.0), self.meta_names, as_array))
+        return results
+
+
+def resolve_backend(backend=None):
+    """
+    auto → libdarknet.so가 있으면 darknet, 없으면 cv2.dnn에 darknet 로더가 있을 때만 opencv
+    둘 다 안 되면 모델 로드 전에 RuntimeError (opencv 5.x에는 readNetFromDarknet이 없음)
+    """
+    backend = backend or DETECTOR_BACKEND
+    if backend != 'auto':
+        return backend
+    from lib import yolov4 # import만으로는 라이브러리를 읽지 않음
+    if os.path.exists(yolov4.library_path()):
+        return 'darknet'
+    if hasattr(cv2.dnn, 'readNetFromDarknet'):
+        return 'opencv'
+    raise RuntimeError(f"backend=auto: {yolov4.library_path()} 없음, cv2 {cv2.__version__}에 darknet 로더 없음 "
+                       f"→ libdarknet.so를 두거나 opencv-python<5를 설치하거나 --backend synthetic 사용")
+
+def create_detector(configPath, weightPath, namesPath, batch_size=1, gpus=0, backend=None, **kwargs):
+    """
+    검출기 생성 (detect / detect_batch 계약은 백엔드와 무관하게 동일)
+    backend: darknet | opencv | synthetic | auto (resolve_backend 참고)
+    None이면 DETECTOR_BACKEND, synthetic 인자는 SYNTHETIC_DETECTOR_CFG (kwargs가 우선)
+    """
+    backend = resolve_backend(backend)
+    if backend == 'darknet':
+        from lib.yolov4 import Yolo # libdarknet.so는 이 백엔드를 쓸 때만 로드
+        return Yolo(configPath, weightPath, namesPath, batch_size=batch_size, gpus=gpus, **kwargs)
+    if backend == 'opencv':
+        return OpenCvYolo(configPath, weightPath, namesPath, batch_size=batch_size, gpus=gpus, **kwargs)
+    if backend == 'synthetic':
+        kwargs = {**SYNTHETIC_DETECTOR_CFG, **kwargs}
+        return SyntheticYolo(configPath, weightPath, namesPath, batch_size=batch_size, gpus=gpus, **kwargs)
+    raise ValueError("backend must be one of: darknet | opencv | synthetic | auto")
+
+def get_model(key, batch_size=1, backend=None, **kwargs):
+    """
+    model_cfgs[key] 모델을 프로세스당 한 번만 로드해서 공유 (같은 키/백엔드면 같은 인스턴스)
+    이미 로드된 인스턴스의 배치가 요청보다 작을 때만 다시 로드
+    """
+    backend = backend or DETECTOR_BACKEND
+    model = _models.get((key, backend))
+    if model is None or model.batch_size < batch_size:
+        cfg = model_cfgs[key]
+        t0 = time.perf_counter()
+        if backend != 'synthetic':
+            check_weights(cfg['weights']) # 잘린 weights는 로드 전에 중단
+        model = create_detector(cfg['cfg'], cfg['weights'], cfg['names'], batch_size=batch_size,
+                                backend=backend, **kwargs)
+        check_labels(model.meta_names, key)
+        _load_times[key] = round(time.perf_counter() - t0, 3)
+        _models[(key, backend)] = model
+    return model
+
+def model_load_times():
+    return dict(_load_times)
@@ -0,0 +1,78 @@
+import time
+
+from lib.bytracker import iter_tracks
+from lib.helmet_score import HelmetScore
+
+
+class StateEvents:
+    """
+    스트림 하나의 트랙 상태 변화만 이벤트로 추출 (업스케일 트랙 기준, 확정된 트랙만)
+    - appear  : 트랙이 확정됨
+    - helmet  : HelmetScore 판정 변화 (wearing helmet <-> nohelmet), 'detecting helmet'은 판정 전이라 생략
+    - falldown: 쓰러짐 라벨이 falldown_hold 프레임 연속 유지되면 변경으로 인정 (깜빡임 억제)
+    - lost    : 트래커에서 삭제된 트랙 (상태도 함께 정리)
+    """
+    def __init__(self, sid, falldown_hold=3):
+        self.sid = sid
+        self.falldown_hold = int(falldown_hold)
+        self.helmet_score = HelmetScore()
+        self.seen = set()
+        self.helmet = {}    # uid -> 마지막으로 알린 헬멧 판정
+        self.falldown = {}  # uid -> [알린 라벨, 후보 라벨, 후보 연속 프레임 수]
+
+    def update(self, frame_idx, tracks, removed_ids):
+        events = []
+        for uid in removed_ids:
+            self.helmet_score.evict([uid])
+            self.helmet.pop(uid, None)
+            self.falldown.pop(uid, None)
+            if uid in self.seen:
+                self.seen.discard(uid)
+                events.append(self.event('lost', frame_idx, uid))
+
+        for track in iter_tracks(tracks):
+            if not track.get('matched', True) or not track['confirmed']:
+                continue
+            uid = int(track['id'])
+            if uid not in self.seen:
+                self.seen.add(uid)
+                events.append(self.event('appear', frame_idx, uid, bbox=track['bbox']))
+
+            status, score = self.helmet_score.update(uid, track.get('helmet_results') or [])
+            if status != 'detecting helmet' and status != self.helmet.get(uid):
+                events.append(self.event('helmet', frame_idx, uid, bbox=track['bbox'],
+                                         prev=self.helmet.get(uid), state=status, score=score))
+                self.helmet[uid] = status
+
+            fd = track.get('falldown_status')
+            if fd:
+                changed = self.debounce_falldown(uid, fd['label'])
+                if changed:
+                    events.append(self.event('falldown', frame_idx, uid, bbox=track['bbox'],
+                                             prev=changed[0], state=changed[1], score=round(float(fd['score']), 4)))
+        return events
+
+    def debounce_falldown(self, uid, label):
+        # 라벨이 falldown_hold 프레임 연속이면 (이전, 현재) 반환
+        st = self.falldown.get(uid)
+        if st is None:
+            # 처음 본 트랙: 서 있는 상태에서 시작
+            st = self.falldown[uid] = ['standing', 'standing', 0]
+        if label == st[0]:
+            st[1], st[2] = label, 0
+            return None
+        if label != st[1]:
+            st[1], st[2] = label, 0
+        st[2] += 1
+        if st[2] < self.falldown_hold:
+            return None
+        prev = st[0]
+        st[0], st[2] = label, 0
+        return prev, label
+
+    def event(self, kind, frame_idx, uid, bbox=None, **fields):
+        ev = {'event': kind, 'stream': self.sid, 'frame': frame_idx, 'time': round(time.time(), 3), 'track': uid}
+        if bbox is not None:
+            ev['bbox'] = [int(v) for v in bbox]
+        ev.update(fields)
+        return ev
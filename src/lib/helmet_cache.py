@@ -0,0 +1,81 @@
+from lib.bytracker import iou_xyxy
+
+
+class HelmetCache:
+    """
+    트랙(UID)별 헬멧 분류 결과 캐시
+    - recheck_interval 프레임마다 재분류, 같은 판정이 stable_hits번 이어지면 stable_interval로 늘림
+    - 조기 무효화: bbox 변화(IoU < iou_thresh), 낮은 신뢰도(conf_thresh 미만), 재매칭(미검출 후 다시 매칭)
+    - max_idle 프레임 동안 안 보인 UID는 정리
+    """
+    def __init__(self, recheck_interval=15, stable_interval=60, stable_hits=5,
+                 iou_thresh=0.5, conf_thresh=0.6, max_idle=300):
+        self.recheck_interval = int(recheck_interval)
+        self.stable_interval = int(stable_interval)
+        self.stable_hits = int(stable_hits)
+        self.iou_thresh = float(iou_thresh)
+        self.conf_thresh = float(conf_thresh)
+        self.max_idle = int(max_idle)
+
+        self.entries = {}
+        self.frame_idx = 0
+        self.hits = 0
+        self.checks = 0
+
+    def tick(self):
+        # 프레임마다 1회 호출
+        self.frame_idx += 1
+        if self.frame_idx % self.max_idle == 0:
+            stale = [k for k, e in self.entries.items() if self.frame_idx - e['seen'] > self.max_idle]
+            self.evict(stale)
+
+    def needs_check(self, key, track):
+        entry = self.entries.get(key)
+        if entry is None:
+            return True
+        if self.frame_idx - entry['seen'] > 1:
+            return True # 놓쳤다가 다시 매칭된 트랙
+        if entry['score'] < self.conf_thresh:
+            return True # 판정이 불확실
+        if iou_xyxy(entry['bbox'], track['bbox']) < self.iou_thresh:
+            return True # 박스가 크게 변함 (자세 변화/ID 스위칭 가능성)
+        interval = self.stable_interval if entry['streak'] >= self.stable_hits else self.recheck_interval
+        return self.frame_idx - entry['checked'] >= interval
+
+    def get(self, key):
+        # 캐시된 결과 사용 (재분류 생략)
+        entry = self.entries[key]
+        entry['seen'] = self.frame_idx
+        self.hits += 1
+        return entry['results']
+
+    def update(self, key, track, results):
+        label, score = None, 0.0
+        if results:
+            label, score, _ = max(results, key=lambda x: x[1])
+
+        entry = self.entries.get(key)
+        streak = entry['streak'] + 1 if entry is not None and entry['label'] == label else 1
+        self.entries[key] = {
+            'results': results,
+            'label': label,
+            'score': float(score),
+            'streak': streak,
+            'bbox': list(track['bbox']),
+            'checked': self.frame_idx,
+            'seen': self.frame_idx,
+        }
+        self.checks += 1
+
+    def evict(self, keys):
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def stats(self):
+        total = self.hits + self.checks
+        return {
+            'entries': len(self.entries),
+            'checks': self.checks,
+            'hits': self.hits,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
@@ -0,0 +1,66 @@
+class HelmetScore:
+    """
+    UID별 헬멧 착용 점수 (DispEvent 표시용)
+    - 프레임마다 최고 신뢰도 라벨을 누적 → 지배적인 라벨과 횟수로 점수(-100 ~ 100) 조정
+    - 트래커가 삭제한 UID는 evict()로 정리 (장시간 운용 시 메모리 고정)
+    """
+    def __init__(self):
+        self.scores = {}
+        self.label_hits = {} # UID별 라벨 카운트를 저장할 딕셔너리
+
+    def update(self, uid, results):
+        dominant_label, hit_count = self.update_and_get_dominant_label(uid, results)
+        return self.calc_score(uid, dominant_label, hit_count)
+
+    def update_and_get_dominant_label(self, uid, results):
+        if uid not in self.label_hits:
+            self.label_hits[uid] = {}
+
+        # 1. 현재 프레임의 최고 점수 라벨 찾기
+        current_label = 'nohelmet'
+        highest_score = 0
+        if results:
+            try:
+                # 가장 높은 신뢰도의 검출 결과를 찾음
+                current_label, highest_score, _ = max(results, key=lambda x: x[1])
+            except (TypeError, ValueError):
+                pass
+
+        # 2. 라벨 카운트 업데이트
+        self.label_hits[uid][current_label] = self.label_hits[uid].get(current_label, 0) + 1
+
+        # 3. 지배적인 라벨 찾기
+        if not self.label_hits[uid]:
+            return 'nohelmet', 0
+
+        dominant_label = max(self.label_hits[uid], key=self.label_hits[uid].get)
+        hit_count = self.label_hits[uid][dominant_label]
+
+        return dominant_label, hit_count
+
+    def calc_score(self, uid, dominant_label, hit_count):
+        if uid not in self.scores:
+            self.scores[uid] = 0
+
+        # 점수 산정 로직 수정: 지배적인 라벨과 그 카운트를 기반으로 점수 조정
+        if dominant_label == 'helmet':
+            # 헬멧으로 판단된 횟수가 많을수록 점수를 더 많이 올림
+            self.scores[uid] = min(100, self.scores[uid] + 5 + int(hit_count / 5))
+        else: # nohelmet 또는 다른 라벨
+            self.scores[uid] = max(-100, self.scores[uid] - 10)
+
+        score = self.scores[uid]
+        if score >= 80:
+            return 'wearing helmet', score
+        elif -80 < score < 80:
+            return 'detecting helmet', score
+        else:
+            return 'nohelmet', score
+
+    def evict(self, uids):
+        for uid in uids:
+            self.scores.pop(uid, None)
+            self.label_hits.pop(uid, None)
+
+    def __len__(self):
+        return len(self.scores)
@@ -25,4 +25,114 @@ color_cfgs = {
     'wearing_helmet': (0, 255, 0),
     'detecting_helmet': (255, 100, 255),
     'nohelmet': (0, 0, 255),
-}
\ No newline at end of file
+}
+
+# --- 프레임 전달 (공유메모리 링버퍼) ---
+UPSCALE_FACTOR = 1.25
+FRAME_RING_SLOTS = 16
+FRAME_RING_MAX_SIZE = (1920, 1080)  # 슬롯 용량 기준 해상도 (초과 시 inline 전달)
+
+# --- 디코딩 ('split': 1회 디코딩 + split 필터 / 'resize': 1회 디코딩 + cv2.resize / 'dual': ffmpeg 2개) ---
+VIDEO_DECODE_MODE = 'split'
+
+# --- 추론 배치 (원본 + 업스케일 = 2) ---
+DETECT_BATCH_SIZE = 2
+
+# --- 헬멧 분류 (트랙 ROI 배치 추론) ---
+HELMET_MODEL = 'helmet_resort_v2'
+HELMET_BATCH_SIZE = 8
+
+# 헬멧 결과 캐시 (프레임 단위) - HelmetCache 인자
+HELMET_CACHE_CFG = {
+    'recheck_interval': 15,   # 기본 재분류 주기
+    'stable_interval': 60,    # 같은 판정이 stable_hits번 이어진 트랙의 재분류 주기
+    'stable_hits': 5,
+    'iou_thresh': 0.5,        # 캐시 시점 bbox와 IoU가 이보다 낮으면 재분류
+    'conf_thresh': 0.6,       # 캐시된 판정 신뢰도가 이보다 낮으면 재분류
+    'max_idle': 300,
+}
+
+# 검출 주기 자동 조절 - AdaptiveStride 인자
+FRAME_SCHEDULER_CFG = {
+    'fps': 30,
+    'min_stride': 1,
+    'max_stride': 6,
+    'init_stride': 3,   # 기존 고정값(3프레임마다 1회)에서 시작
+    'queue_high': 6,    # 입력 큐가 이만큼 쌓이면 stride 증가
+    'queue_low': 1,
+}
+
+# 트랙 전달 형식 (True: TRACK_DTYPE 구조화 배열 / False: 기존 dict 리스트)
+TRACK_ARRAY_OUTPUT = True
+
+# 2차 검출(쓰러짐 등) → 사람 트랙 연결
+# method: best (트랙별 최대 IoU, 기존 동작) | greedy | hungarian (1:1 매칭)
+SECONDARY_MATCH_CFG = {
+    'iou_thresh': 0.3,
+    'method': 'best',
+}
+
+# 트랙별 박스 이력 길이 (링버퍼, 장시간 운용 시 메모리 고정)
+TRACK_HISTORY_LEN = 30
+
+# 멀티 스트림 (검출 프로세스 하나가 모델 한 벌로 여러 카메라 처리)
+MULTI_STREAM_CFG = {
+    'max_batch_streams': 4,  # 한 번의 forward에 묶을 최대 스트림 수 (네트워크 배치 = DETECT_BATCH_SIZE * 이 값)
+    'slots_per_stream': 6,   # 스트림당 공유메모리 슬롯 수 (FRAME_RING_SLOTS보다 작으면 FRAME_RING_SLOTS)
+}
+
+# 결과/이벤트 기록 (ResultSink)
+# format: jsonl | binary | none (이벤트만), falldown_hold: 쓰러짐 이벤트로 인정할 연속 프레임 수
+SINK_CFG = {
+    'out_dir': './results',
+    'format': 'jsonl',
+    'falldown_hold': 3,
+}
+
+# 단계 사이 큐 정책: block | drop_oldest | drop_newest | latest (lib/queue_policy.QueuePort)
+# timeout: 가득 찼을 때 드롭 전 기다리는 시간(초)
+QUEUE_POLICY_CFG = {
+    'video':  {'policy': 'drop_newest', 'timeout': 0.01},  # VideoParser → DetectParser
+    'detect': {'policy': 'drop_newest', 'timeout': 0.0},   # DetectParser → HelmetParser
+    'helmet': {'policy': 'drop_newest', 'timeout': 0.0},   # HelmetParser → ResultSink
+    'render': {'policy': 'latest', 'timeout': 0.0},        # ResultSink → DispEvent (표시는 최신 프레임만)
+}
+
+# 단계별 지연/처리량 지표 (프로세스마다 <dir>/<이름>.json, interval초마다 갱신)
+METRICS_CFG = {
+    'enabled': True,
+    'dir': './metrics',
+    'interval': 10.0,
+}
+
+# 검출 백엔드 (lib/detector.create_detector)
+# darknet: libdarknet.so (GPU) | opencv: cv2.dnn CPU, 같은 cfg/weights | synthetic: 모델 없이 결정적 가짜 검출 (처리량 측정용)
+# auto: libdarknet.so가 있으면 darknet, 없으면 opencv
+DETECTOR_BACKEND = 'auto'
+SYNTHETIC_DETECTOR_CFG = {
+    'objects': 3,         # 프레임(ROI)당 검출 수
+    'latency_ms': 0.0,    # forward 한 번당 흉내 낼 지연
+    'seed': 0,
+}
+
+# opencv 백엔드: model.weights를 읽기 전용 mmap 버퍼로 로드 (lib/weights.map_weights)
+# darknet 백엔드는 libdarknet이 경로를 받아 fread로 읽으므로 해당 없음
+WEIGHTS_MMAP = True
+
+# darknet 바인딩 (lib/yolov4.py)
+# lib: libdarknet.so 경로 (None이면 lib/libdarknet.so)
+# abi: detection 구조체 레이아웃 best_class | legacy (best_class_idx 없는 이전 빌드) | auto
+# letterbox: 비율 유지 resize + 회색 여백으로 네트워크 입력 구성 (detect / detect_batch 공통, False면 늘려서 resize)
+DARKNET_CFG = {
+    'lib': None,
+    'abi': 'auto',
+    'letterbox': False,
+}
+
+# 쓰러짐 검출 범위 (top-down): 확정된 사람 트랙 주변 crop만 추론 (False면 기존처럼 프레임 전체)
+FALLDOWN_ROI_CFG = {
+    'enabled': True,
+    'pad': 0.25,              # 트랙 박스 가로/세로 대비 여백 (넘어지는 자세는 박스 밖으로 벗어남)
+    'min_size': 64,           # crop 한 변 최소 크기(px)
+    'full_frame_ratio': 0.6,  # crop 넓이 합이 프레임의 이 비율 이상이면 프레임 전체 1회로 대체
+}
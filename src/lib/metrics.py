@@ -0,0 +1,194 @@
+import os
+import json
+import math
+import time
+
+
+# 메인 프로세스 시작 시각 (now() 기준) - 자식 프로세스는 환경변수로 물려받음
+LAUNCH_ENV = 'PIPELINE_LAUNCH_T'
+
+
+def now():
+    # 프로세스 간 비교 가능한 단조 시계 (리눅스 CLOCK_MONOTONIC은 시스템 전체 공통)
+    return time.monotonic()
+
+def stamp(ref, key, t=None):
+    # 프레임 ref(dict)에 단계별 타임스탬프 기록 → ref와 함께 다음 프로세스로 전달
+    ts = ref.setdefault('ts', {})
+    ts[key] = now() if t is None else t
+    return ts[key]
+
+
+class StartupProfile:
+    """
+    프로세스 기동 구간 기록 (메인 프로세스 시작 시각 LAUNCH_ENV 기준 초)
+    - 생성 시 'started' (spawn + 모듈 import 끝), 이후 mark('models'), mark('first_frame') ...
+    - 같은 키는 처음 한 번만 기록 → 매 프레임 mark('first_frame')를 불러도 됨 (처음이면 True)
+    """
+    def __init__(self, name):
+        self.name = name
+        self.launch = float(os.environ.get(LAUNCH_ENV, now()))
+        self.marks = {}
+        self.mark('started')
+
+    def mark(self, key):
+        if key in self.marks:
+            return False
+        self.marks[key] = round(now() - self.launch, 4)
+        return True
+
+    def report(self):
+        return dict(self.marks)
+
+    def summary(self):
+        return ', '.join(f'{k} {v:.2f}s' for k, v in self.marks.items())
+
+
+class LatencyHistogram:
+    """
+    로그 간격 버킷 히스토그램 (고정 크기 → 장시간 운용에도 메모리 일정)
+    - 버킷 경계: lo * ratio^k (기본 10us ~ 100s, 8% 간격) → 백분위 오차 약 4% 이내
+    """
+    def __init__(self, lo=1e-5, hi=100.0, ratio=1.08):
+        self.lo = float(lo)
+        self.log_ratio = math.log(ratio)
+        self.n_buckets = int(math.ceil(math.log(hi / lo) / self.log_ratio)) + 2
+        self.counts = [0] * self.n_buckets
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, v):
+        v = max(0.0, float(v))
+        if v < self.lo:
+            idx = 0
+        else:
+            idx = min(self.n_buckets - 1, 1 + int(math.log(v / self.lo) / self.log_ratio))
+        self.counts[idx] += 1
+        self.count += 1
+        self.total += v
+        self.max = max(self.max, v)
+
+    def percentile(self, p):
+        if not self.count:
+            return 0.0
+        target = p / 100.0 * self.count
+        acc = 0
+        for idx, c in enumerate(self.counts):
+            acc += c
+            if acc >= target:
+                # 버킷의 기하 중앙값
+                if idx == 0:
+                    return min(self.max, self.lo)
+                return min(self.max, self.lo * math.exp((idx - 0.5) * self.log_ratio))
+        return self.max
+
+    def summary(self):
+        return {
+            'count': self.count,
+            'mean_ms': round(self.total / self.count * 1000.0, 3) if self.count else 0.0,
+            'p50_ms': round(self.percentile(50) * 1000.0, 3),
+            'p95_ms': round(self.percentile(95) * 1000.0, 3),
+            'p99_ms': round(self.percentile(99) * 1000.0, 3),
+            'max_ms': round(self.max * 1000.0, 3),
+        }
+
+
+class StageMetrics:
+    """
+    프로세스별 단계 지연 히스토그램 + 처리량 카운터, interval초마다 <out_dir>/<name>.json으로 저장
+    - observe('model.yolov4', dt) / observe('track', dt, stream=sid) → 전체 키와 스트림별 키('track@0') 둘 다 기록
+    - count('frames', stream=sid): 처리량(fps) 계산용
+    - extra: {이름: 호출 가능} → 저장 시 함께 기록 (큐 정책 통계, 검출 주기 등)
+    - drop_stream(sid): 끝난 스트림의 히스토그램은 요약만 남기고 해제 (최근 finished_limit개 스트림은 계속 저장됨)
+    """
+    def __init__(self, name, out_dir=None, interval=10.0, extra=None, finished_limit=1000):
+        self.name = name
+        self.out_dir = out_dir
+        self.interval = float(interval)
+        self.extra = dict(extra or {})
+        self.hists = {}
+        self.counters = {}
+        self.started = now()
+        self.last_dump = self.started
+        self.last_counters = {}
+        self.finished = {} # 끝난 스트림 → {'stages': 요약, 'counters': 카운터} (오래된 것부터 버림)
+        self.finished_limit = int(finished_limit)
+
+    def observe(self, key, seconds, stream=None):
+        self._hist(key).add(seconds)
+        if stream is not None:
+            self._hist(f'{key}@{stream}').add(seconds)
+
+    def observe_span(self, ts, start, end, key, stream=None):
+        # ref 타임스탬프 두 개 사이 구간 (한쪽이 없으면 무시)
+        if start in ts and end in ts:
+            self.observe(key, ts[end] - ts[start], stream)
+
+    def count(self, key, n=1, stream=None):
+        self.counters[key] = self.counters.get(key, 0) + n
+        if stream is not None:
+            k = f'{key}@{stream}'
+            self.counters[k] = self.counters.get(k, 0) + n
+
+    def drop_stream(self, stream):
+        # 끝난 스트림 키 정리: 최종 요약/카운터는 finished로 옮겨 이후 저장에도 포함
+        suffix = f'@{stream}'
+        done = {
+            'stages': {k: self.hists.pop(k).summary() for k in [k for k in self.hists if k.endswith(suffix)]},
+            'counters': {k: self.counters.pop(k) for k in [k for k in self.counters if k.endswith(suffix)]},
+        }
+        for k in [k for k in self.last_counters if k.endswith(suffix)]:
+            del self.last_counters[k]
+        self.finished.pop(stream, None)
+        self.finished[stream] = done
+        while len(self.finished) > self.finished_limit:
+            del self.finished[next(iter(self.finished))]
+
+    def _hist(self, key):
+        h = self.hists.get(key)
+        if h is None:
+            h = self.hists[key] = LatencyHistogram()
+        return h
+
+    def snapshot(self):
+        t = now()
+        window = max(t - self.last_dump, 1e-6)
+        fps = {k: round((v - self.last_counters.get(k, 0)) / window, 2) for k, v in self.counters.items()}
+        # 끝난 스트림 먼저, 같은 스트림 ID가 다시 시작했으면 진행 중인 값이 우선
+        stages, counters = {}, {}
+        for done in self.finished.values():
+            stages.update(done['stages'])
+            counters.update(done['counters'])
+        stages.update((k, h.summary()) for k, h in self.hists.items())
+        counters.update(self.counters)
+        snap = {
+            'process': self.name,
+            'pid': os.getpid(),
+            'time': time.time(),
+            'uptime_s': round(t - self.started, 1),
+            'stages': dict(sorted(stages.items())),
+            'counters': counters,
+            'fps': fps,
+            'finished_streams': list(self.finished),
+        }
+        for k, fn in self.extra.items():
+            try:
+                snap[k] = fn()
+            except Exception as e:
+                snap[k] = repr(e)
+        self.last_dump = t
+        self.last_counters = dict(self.counters)
+        return snap
+
+    def maybe_dump(self, force=False):
+        if self.out_dir is None or (not force and now() - self.last_dump < self.interval):
+            return None
+        snap = self.snapshot()
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, f'{self.name}.json')
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(snap, f, indent=1)
+        os.replace(tmp, path) # 읽는 쪽이 쓰다 만 파일을 보지 않도록
+        return snap
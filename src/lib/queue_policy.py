@@ -0,0 +1,117 @@
+import time
+import queue as pyqueue
+
+
+class QueuePort:
+    """
+    단계 사이 큐의 보내는 쪽 (정책 + 드롭 카운터 + 큐 점유율)
+    policy
+    - 'block'      : 자리가 날 때까지 대기 (드롭 없음, 오프라인 처리)
+    - 'drop_newest': timeout 동안 기다려도 가득 차 있으면 새 메시지를 버림 (기존 동작)
+    - 'drop_oldest': 가득 차 있으면 큐에서 가장 오래된 메시지를 꺼내 버리고 새 메시지를 넣음
+    - 'latest'     : 넣기 전에 큐에 쌓인 메시지를 모두 버림 (항상 최신 프레임만, 최소 지연)
+    제어 메시지(None, 스트림 끝)는 어떤 정책이든 버리지 않음
+    on_drop(msg): 버린 메시지 처리 (공유메모리 슬롯 반환, 삭제 이벤트 보존 등)
+    """
+    POLICIES = ('block', 'drop_oldest', 'drop_newest', 'latest')
+
+    def __init__(self, queue, policy='drop_newest', timeout=0.0, on_drop=None, is_control=None):
+        if policy not in self.POLICIES:
+            raise ValueError("policy must be one of: block | drop_oldest | drop_newest | latest")
+        self.queue = queue
+        self.policy = policy
+        self.timeout = float(timeout)
+        self.on_drop = on_drop
+        self.is_control = is_control or (lambda msg: msg is None)
+
+        self.puts = 0
+        self.drops = {'newest': 0, 'oldest': 0, 'latest': 0, 'no_slot': 0}
+        self.blocked = 0.0
+        self.occ_sum = 0
+        self.occ_max = 0
+        self.occ_n = 0
+
+    def put(self, msg):
+        """정책에 따라 msg 전달. 전달했으면 True, 버렸으면 False (버린 msg는 on_drop으로 처리됨)"""
+        self.sample()
+        if self.is_control(msg) or self.policy == 'block':
+            t0 = time.perf_counter()
+            self.queue.put(msg)
+            self.blocked += time.perf_counter() - t0
+            self.puts += 1
+            return True
+
+        if self.policy == 'latest':
+            self.discard_queued('latest')
+
+        try:
+            if self.timeout > 0:
+                self.queue.put(msg, timeout=self.timeout)
+            else:
+                self.queue.put_nowait(msg)
+            self.puts += 1
+            return True
+        except pyqueue.Full:
+            pass
+
+        if self.policy == 'drop_newest':
+            self.drop(msg, 'newest')
+            return False
+
+        # drop_oldest / latest: 오래된 것부터 비우고 다시 시도
+        while True:
+            if not self.discard_queued('oldest', limit=1):
+                self.drop(msg, 'newest') # 다른 생산자가 다시 채움
+                return False
+            try:
+                self.queue.put_nowait(msg)
+                self.puts += 1
+                return True
+            except pyqueue.Full:
+                continue
+
+    def discard_queued(self, reason, limit=None):
+        # 큐에 쌓인 메시지를 꺼내 버림 (제어 메시지는 다시 넣음), 버린 개수 반환
+        dropped, controls = 0, []
+        while limit is None or dropped < limit:
+            try:
+                old = self.queue.get_nowait()
+            except pyqueue.Empty:
+                break
+            if self.is_control(old):
+                controls.append(old)
+                continue
+            self.drop(old, reason)
+            dropped += 1
+        for msg in controls:
+            self.queue.put(msg)
+        return dropped
+
+    def drop(self, msg, reason):
+        self.drops[reason] += 1
+        if self.on_drop is not None:
+            self.on_drop(msg)
+
+    def count_drop(self, reason):
+        # 큐 밖에서 버린 프레임 (예: 공유메모리 빈 슬롯 없음)
+        self.drops[reason] = self.drops.get(reason, 0) + 1
+
+    def sample(self):
+        try:
+            n = self.queue.qsize()
+        except NotImplementedError: # macOS
+            return
+        self.occ_sum += n
+        self.occ_n += 1
+        self.occ_max = max(self.occ_max, n)
+
+    def stats(self):
+        return {
+            'policy': self.policy,
+            'puts': self.puts,
+            'drops': dict(self.drops),
+            'dropped': sum(self.drops.values()),
+            'blocked_s': round(self.blocked, 3),
+            'occupancy_mean': round(self.occ_sum / self.occ_n, 2) if self.occ_n else 0.0,
+            'occupancy_max': self.occ_max,
+        }
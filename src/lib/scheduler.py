@@ -0,0 +1,70 @@
+import math
+
+
+class AdaptiveStride:
+    """
+    검출 주기(stride) 자동 조절 (기존 frame_cnt % 3 고정 대체)
+    - 추론 지연(EMA) 동안 들어오는 프레임 수 = 필요한 최소 stride
+    - 입력 큐가 queue_high 이상 쌓이면 stride 증가, queue_low 이하로 비고 여유가 있으면 감소
+    - 건너뛴 프레임은 호출측에서 트래커 예측(ByteTrackLite.predict)만 수행
+    """
+    def __init__(self, fps=30, min_stride=1, max_stride=6, init_stride=3,
+                 ema=0.2, queue_high=6, queue_low=1):
+        self.frame_interval = 1.0 / float(fps)
+        self.min_stride = int(min_stride)
+        self.max_stride = int(max_stride)
+        self.stride = min(self.max_stride, max(self.min_stride, int(init_stride)))
+        self.ema = float(ema)
+        self.queue_high = int(queue_high)
+        self.queue_low = int(queue_low)
+
+        self.latency = None
+        self.queue_depth = 0
+        self.frames_since = 0
+        self.detected = 0
+        self.skipped = 0
+        self.decisions = {'up': 0, 'down': 0, 'hold': 0}
+        self.last_decision = 'hold'
+
+    def should_detect(self):
+        # 이번 프레임에서 검출할지 여부 (stride 프레임마다 1회)
+        self.frames_since += 1
+        if self.frames_since >= self.stride:
+            self.frames_since = 0
+            self.detected += 1
+            return True
+        self.skipped += 1
+        return False
+
+    def report(self, latency, queue_depth=0):
+        """검출 1회의 소요 시간(초)과 입력 큐 깊이로 stride 갱신. 변경 시 (이전, 현재) 반환"""
+        if self.latency is None:
+            self.latency = float(latency)
+        else:
+            self.latency += self.ema * (float(latency) - self.latency)
+        self.queue_depth = int(queue_depth)
+
+        need = max(1, math.ceil(self.latency / self.frame_interval))
+        stride = self.stride
+        if self.queue_depth >= self.queue_high or need > stride:
+            stride += 1
+        elif self.queue_depth <= self.queue_low and need < stride:
+            stride -= 1
+        stride = min(self.max_stride, max(self.min_stride, stride))
+
+        prev = self.stride
+        self.last_decision = 'up' if stride > prev else 'down' if stride < prev else 'hold'
+        self.decisions[self.last_decision] += 1
+        self.stride = stride
+        return (prev, stride) if stride != prev else None
+
+    def metrics(self):
+        return {
+            'stride': self.stride,
+            'latency_ms': (self.latency or 0.0) * 1000.0,
+            'queue_depth': self.queue_depth,
+            'detected': self.detected,
+            'skipped': self.skipped,
+            'decisions': dict(self.decisions),
+            'last_decision': self.last_decision,
+        }
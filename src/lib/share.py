@@ -1,4 +1,6 @@
 import numpy as np
+import multiprocessing
+import queue as pyqueue
 from multiprocessing import shared_memory
 
 
@@ -13,4 +15,137 @@ def read_from_shared(shm_name, shape, dtype):
     arr = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
     out = arr.copy()  # 안전하게 복사
     shm.close()
-    return out
\ No newline at end of file
+    return out
+
+def attach_shared(shm_name):
+    # 다른 프로세스가 만든 공유메모리에 붙기만 함 (unlink 책임은 생성자에게)
+    try:
+        return shared_memory.SharedMemory(name=shm_name, track=False)
+    except TypeError:
+        # Python < 3.13: spawn 자식은 부모의 resource_tracker를 공유하므로 그대로 붙어도 됨
+        return shared_memory.SharedMemory(name=shm_name)
+
+
+def _align(n, a=64):
+    return (int(n) + a - 1) // a * a
+
+
+class FrameRing:
+    """
+    고정 슬롯 공유메모리 링버퍼 (프로세스 간 zero-copy 프레임 전달)
+    - 슬롯 하나에 여러 프레임(원본/업스케일)을 이어서 저장
+    - 큐에는 슬롯 번호/시퀀스/레이아웃(ref)만 전달 → 프레임 피클링 제거
+    - 빈 슬롯 큐로 슬롯 재사용 + 백프레셔 (슬롯이 모두 사용 중이면 생산자가 대기)
+    - 슬롯 헤더의 시퀀스 번호로 재사용된(오래된) ref 검출
+    - 슬롯보다 큰 프레임은 ref에 그대로 실어 보냄(inline, 기존 방식)
+    """
+    def __init__(self, n_slots, slot_bytes):
+        self.n_slots = int(n_slots)
+        self.slot_bytes = _align(slot_bytes)
+        self.header_bytes = _align(self.n_slots * 8)
+
+        total = self.header_bytes + self.n_slots * self.slot_bytes
+        self.shm, buf = create_shared_frame((total,), np.uint8)
+        self.name = self.shm.name
+        self._owner = True
+        self._attach_views(buf)
+        self.seqs[:] = -1
+
+        # 빈 슬롯 목록 (생산자 acquire / 최종 소비자 release)
+        self.free_slots = multiprocessing.Queue(maxsize=self.n_slots)
+        for i in range(self.n_slots):
+            self.free_slots.put(i)
+        # 시퀀스 번호는 모든 생산자(VideoParser 여러 개)가 공유 → 다른 생산자가 재사용한 슬롯의 ref도 오래된 것으로 검출
+        self._next_seq = multiprocessing.Value('q', 0)
+
+    def _attach_views(self, buf):
+        self.buf = buf
+        self.seqs = np.ndarray((self.n_slots,), dtype=np.int64, buffer=buf, offset=0)
+
+    # spawn 방식으로 자식 프로세스에 넘길 때는 이름만 넘기고 다시 붙는다
+    def __getstate__(self):
+        return {
+            'name': self.name,
+            'n_slots': self.n_slots,
+            'slot_bytes': self.slot_bytes,
+            'header_bytes': self.header_bytes,
+            'free_slots': self.free_slots,
+            '_next_seq': self._next_seq,
+        }
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._owner = False
+        self.shm = attach_shared(self.name)
+        buf = np.ndarray((self.shm.size,), dtype=np.uint8, buffer=self.shm.buf)
+        self._attach_views(buf)
+
+    @staticmethod
+    def slot_bytes_for(shapes, dtype=np.uint8):
+        itemsize = np.dtype(dtype).itemsize
+        return sum(_align(int(np.prod(s)) * itemsize) for s in shapes)
+
+    def acquire(self, timeout=None):
+        """빈 슬롯 번호 반환. timeout 내에 빈 슬롯이 없으면 None"""
+        try:
+            return self.free_slots.get(timeout=timeout)
+        except pyqueue.Empty:
+            return None
+
+    def pack(self, arrays, timeout=None):
+        """
+        arrays를 빈 슬롯에 복사하고 ref(dict)를 반환.
+        - 빈 슬롯이 없으면 None (호출측에서 드롭/재시도 결정)
+        - 슬롯 용량 초과 시 프레임을 ref에 직접 실음(inline)
+        """
+        need = sum(_align(a.nbytes) for a in arrays)
+        if need > self.slot_bytes:
+            # 큐 피클링은 나중에(feeder 스레드) 일어나므로 재사용 디코딩 버퍼의 view를 그대로 실으면 안 됨
+            return {'slot': None, 'seq': -1, 'inline': tuple(a.copy() for a in arrays)}
+
+        slot = self.acquire(timeout)
+        if slot is None:
+            return None
+
+        base = self.header_bytes + slot * self.slot_bytes
+        offset = base
+        layout = []
+        for a in arrays:
+            dst = np.ndarray(a.shape, dtype=a.dtype, buffer=self.buf, offset=offset)
+            np.copyto(dst, a)
+            layout.append((offset, a.shape, a.dtype.str))
+            offset += _align(a.nbytes)
+
+        with self._next_seq.get_lock():
+            seq = self._next_seq.value
+            self._next_seq.value += 1
+        self.seqs[slot] = seq
+        return {'slot': slot, 'seq': seq, 'layout': layout}
+
+    def unpack(self, ref):
+        """ref → 공유메모리 위 프레임 view 튜플. 슬롯이 재사용되었으면 None"""
+        if ref.get('slot') is None:
+            return ref.get('inline')
+        slot = ref['slot']
+        if int(self.seqs[slot]) != ref['seq']:
+            return None
+        return tuple(np.ndarray(shape, dtype=np.dtype(dt), buffer=self.buf, offset=off)
+                     for off, shape, dt in ref['layout'])
+
+    def release(self, ref):
+        """최종 소비자가 호출: 슬롯을 빈 슬롯 목록으로 반환"""
+        if ref is None or ref.get('slot') is None:
+            return
+        self.free_slots.put(ref['slot'])
+
+    def close(self):
+        self.buf = None
+        self.seqs = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass  # 아직 살아있는 프레임 view가 있으면 프로세스 종료 시 정리됨
+
+    def unlink(self):
+        if self._owner:
+            self.shm.unlink()
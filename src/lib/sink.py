@@ -0,0 +1,126 @@
+import os
+import json
+import numpy as np
+
+from lib.bytracker import iter_tracks
+
+
+# 바이너리 프레임 기록 한 행 = 트랙 하나 (view: 0 원본 / 1 업스케일)
+RECORD_DTYPE = np.dtype([
+    ('frame', '<i8'),
+    ('view', 'u1'),
+    ('id', '<i4'),
+    ('label', 'S16'),
+    ('score', '<f4'),
+    ('bbox', '<i4', (4,)),
+    ('confirmed', '?'),
+    ('matched', '?'),
+    ('falldown', 'S16'),                # 비어 있으면 상태 없음
+    ('falldown_score', '<f4'),
+    ('helmet', 'S16'),                  # 비어 있으면 분류 결과 없음
+    ('helmet_score', '<f4'),
+])
+VIEWS = ('orig', 'up')
+
+
+def track_record(track):
+    # 결과 파일용 트랙 요약 (JSON으로 쓸 수 있는 기본 타입만)
+    fd = track.get('falldown_status')
+    helmet = track.get('helmet_results') or []
+    best = max(helmet, key=lambda x: x[1]) if helmet else None
+    return {
+        'id': int(track['id']),
+        'label': str(track['label']),
+        'score': round(float(track['score']), 4),
+        'bbox': [int(v) for v in track['bbox']],
+        'confirmed': bool(track['confirmed']),
+        'matched': bool(track.get('matched', True)),
+        'falldown': [fd['label'], round(float(fd['score']), 4)] if fd else None,
+        'helmet': [best[0], round(float(best[1]), 4)] if best else None,
+    }
+
+def records_array(frame_idx, view, tracks):
+    """트랙 목록 → RECORD_DTYPE 배열 (TRACK_DTYPE 배열이면 필드 단위 복사)"""
+    n = len(tracks) if tracks is not None else 0
+    out = np.zeros(n, dtype=RECORD_DTYPE)
+    out['frame'] = frame_idx
+    out['view'] = view
+    if n == 0:
+        return out
+    if isinstance(tracks, np.ndarray):
+        for key in ('id', 'label', 'score', 'bbox', 'confirmed', 'matched'):
+            out[key] = tracks[key]
+        out['falldown'] = tracks['falldown_label']
+        out['falldown_score'] = tracks['falldown_score']
+        out['helmet'] = tracks['helmet_label']
+        out['helmet_score'] = tracks['helmet_score']
+        return out
+    for i, track in enumerate(iter_tracks(tracks)):
+        r = track_record(track)
+        out[i]['id'], out[i]['label'], out[i]['score'] = r['id'], r['label'], r['score']
+        out[i]['bbox'] = r['bbox']
+        out[i]['confirmed'], out[i]['matched'] = r['confirmed'], r['matched']
+        if r['falldown']:
+            out[i]['falldown'], out[i]['falldown_score'] = r['falldown']
+        if r['helmet']:
+            out[i]['helmet'], out[i]['helmet_score'] = r['helmet']
+    return out
+
+def load_records(path_base):
+    """FrameWriter(fmt='binary') 결과 읽기 → RECORD_DTYPE 배열"""
+    with open(path_base + '.dtype.json') as f:
+        descr = json.load(f)['descr']
+    dtype = np.dtype([tuple(tuple(x) if isinstance(x, list) else x for x in field) for field in descr])
+    return np.fromfile(path_base + '.bin', dtype=dtype)
+
+
+class FrameWriter:
+    """
+    스트림 하나의 프레임별 트랙 기록
+    - 'jsonl' : 한 줄 = 한 프레임 {'frame', 'orig': [...], 'up': [...]}
+    - 'binary': RECORD_DTYPE 행을 이어 붙인 <이름>.bin + dtype 설명 <이름>.dtype.json (load_records로 읽음)
+    """
+    FORMATS = ('jsonl', 'binary')
+
+    def __init__(self, path_base, fmt='jsonl'):
+        if fmt not in self.FORMATS:
+            raise ValueError("fmt must be one of: jsonl | binary")
+        self.fmt = fmt
+        if fmt == 'binary':
+            with open(path_base + '.dtype.json', 'w') as f:
+                json.dump({'descr': RECORD_DTYPE.descr, 'views': VIEWS}, f)
+            self.f = open(path_base + '.bin', 'wb')
+        else:
+            self.f = open(path_base + '.jsonl', 'w')
+
+    def write(self, frame_idx, tracks_orig, tracks_up):
+        if self.fmt == 'binary':
+            records_array(frame_idx, 0, tracks_orig).tofile(self.f)
+            records_array(frame_idx, 1, tracks_up).tofile(self.f)
+            return
+        self.f.write(json.dumps({
+            'frame': frame_idx,
+            'orig': [track_record(t) for t in iter_tracks(tracks_orig)],
+            'up': [track_record(t) for t in iter_tracks(tracks_up)],
+        }, separators=(',', ':')) + '\n')
+
+    def close(self):
+        self.f.close()
+
+
+class EventLog:
+    """상태 변화 이벤트 JSONL (이벤트마다 flush → tail로 바로 확인 가능)"""
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.f = open(path, 'w')
+        self.count = 0
+
+    def write(self, events):
+        for ev in events:
+            self.f.write(json.dumps(ev, separators=(',', ':')) + '\n')
+            self.count += 1
+        if events:
+            self.f.flush()
+
+    def close(self):
+        self.f.close()
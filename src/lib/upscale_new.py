@@ -115,3 +115,40 @@ def build_filter_graph(
         core = core.filter('format', 'bgr24')
 
     return core, out_w, out_h
+
+
+def build_dual_output_graph(
+    in_stream,
+    src_w: int,
+    src_h: int,
+    scale_factor: float = 3.0,
+    keep_ar: bool = True,
+    **upscale_opts,
+):
+    """
+    한 번의 디코딩으로 원본 + 업스케일 프레임을 함께 만드는 필터 그래프.
+    - split으로 디코딩 결과를 둘로 나눠 한쪽만 build_filter_graph로 업스케일
+    - 폭을 맞춰(pad) vstack → 파이프 하나로 [원본(위) / 업스케일(아래)] 프레임 출력
+    - 반환: (필터 스트림, layout) / layout = dict(width, height, orig=(y, w, h), up=(y, w, h))
+      읽는 쪽은 layout대로 슬라이싱(view)만 하면 됨
+    """
+    split = in_stream.split()
+    up, out_w, out_h = build_filter_graph(split[1], src_w, src_h, scale_factor=scale_factor,
+                                          keep_ar=keep_ar, out_pix_fmt='bgr24', **upscale_opts)
+
+    # 두 출력의 폭을 맞춤 (bgr24라 홀수 크기도 pad 가능)
+    stack_w = max(src_w, out_w)
+    orig = split[0].filter('format', 'bgr24')
+    if src_w != stack_w:
+        orig = orig.filter('pad', stack_w, src_h, 0, 0)
+    if out_w != stack_w:
+        up = up.filter('pad', stack_w, out_h, 0, 0)
+
+    stacked = ffmpeg.filter([orig, up], 'vstack')
+    layout = {
+        'width': stack_w,
+        'height': src_h + out_h,
+        'orig': (0, src_w, src_h),
+        'up': (src_h, out_w, out_h),
+    }
+    return stacked, layout
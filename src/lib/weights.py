@@ -0,0 +1,35 @@
+import os
+import mmap
+import numpy as np
+
+
+def read_header(path):
+    """darknet .weights 헤더 → (major, minor, revision, seen, 헤더 바이트 수)"""
+    with open(path, 'rb') as f:
+        major, minor, revision = np.fromfile(f, np.int32, 3)
+        # 0.2 이후 버전은 seen이 64비트
+        wide = major * 10 + minor >= 2 and major < 1000 and minor < 1000
+        seen = int(np.fromfile(f, np.int64 if wide else np.int32, 1)[0])
+    return int(major), int(minor), int(revision), seen, 20 if wide else 16
+
+def check_weights(path):
+    # 헤더를 읽을 수 있고 본문이 float32 배열 길이인지 확인 (잘린 파일 조기 검출)
+    size = os.path.getsize(path)
+    header = read_header(path)
+    if size <= header[-1] or (size - header[-1]) % 4:
+        raise ValueError(f"{path}: darknet weights 크기가 맞지 않음 ({size} bytes)")
+    return header
+
+def map_weights(path):
+    """
+    weights 파일 → 읽기 전용 mmap 위의 uint8 배열 (로더에 메모리 버퍼로 넘김)
+    - 파일의 페이지 캐시를 그대로 가리킴: 프로세스별 읽기 버퍼/복사본 없이, 몇 개 프로세스가 로드하든 파일 내용은 RAM에 한 벌
+    - 한 번 앞에서부터 읽으므로 MADV_SEQUENTIAL (미리 읽기 확대)
+    - 배열을 버리면 매핑도 해제 (레이어 텐서는 로더가 따로 보관)
+    """
+    check_weights(path)
+    with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    return np.frombuffer(mm, np.uint8)
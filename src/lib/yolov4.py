@@ -1,7 +1,7 @@
 #!python3
 #-*- coding: utf-8 -*-
 """
-yolo v3 detection model
+yolo detection model - libdarknet.so 바인딩 (lib/darknet.py도 이 모듈을 사용)
 
 @author: RyuManSAng
 @date: 20180920
@@ -13,6 +13,8 @@ import numpy as np
 import time
 import re
 
+from lib.detector import DET_DTYPE, decode_arrays
+from lib.init import DARKNET_CFG
 
 
 class BOX(Structure):
@@ -21,9 +23,11 @@ class BOX(Structure):
                 ("w", c_float),
                 ("h", c_float)]
 
+# libdarknet.so 빌드 시점에 따라 detection 구조체가 다름 (best_class_idx 유무) → load_library에서 선택
 class DETECTION(Structure):
     _fields_ = [("bbox", BOX),
                 ("classes", c_int),
+                ("best_class_idx", c_int),
                 ("prob", POINTER(c_float)),
                 ("mask", POINTER(c_float)),
                 ("objectness", c_float),
@@ -35,6 +39,11 @@ class DETECTION(Structure):
                 ("sim", c_float),
                 ("track_id", c_int)]
 
+class DETECTION_LEGACY(Structure):
+    _fields_ = [(name, ctype) for name, ctype in DETECTION._fields_ if name != "best_class_idx"]
+
+DETECTION_LAYOUTS = {'best_class': DETECTION, 'legacy': DETECTION_LEGACY}
+
 class DETNUMPAIR(Structure):
     _fields_ = [("num", c_int),
                 ("dets", POINTER(DETECTION))]
@@ -49,18 +58,139 @@ class METADATA(Structure):
     _fields_ = [("classes", c_int),
                 ("names", POINTER(c_char_p))]
 
-hasGPU = True
 # 스크립트 위치 기준으로 libdarknet.so 절대 경로 생성
 darknet_lib_path = os.path.join(os.path.dirname(__file__), "libdarknet.so")
-lib = CDLL(darknet_lib_path, RTLD_LOCAL)
+lib = None
+hasGPU = False
+abi = None
+
+
+def library_path():
+    return DARKNET_CFG['lib'] or darknet_lib_path
+
+def layouts_agree():
+    # 디코딩에 읽는 필드(bbox, classes, prob) 위치와 크기가 두 레이아웃에서 같으면 (64비트) 어느 쪽이든 같게 읽힘
+    a, b = DETECTION, DETECTION_LEGACY
+    return (sizeof(a) == sizeof(b) and a.prob.offset == b.prob.offset
+            and a.classes.offset == b.classes.offset and a.bbox.offset == b.bbox.offset)
+
+
+def load_library(path=None):
+    """
+    libdarknet.so 로드 + ctypes 함수 시그니처 설정 (프로세스당 처음 한 번, Yolo 생성 시)
+    import만으로는 라이브러리를 읽지 않음 → darknet을 쓰지 않는 프로세스/백엔드는 비용 없음
+    """
+    global lib, hasGPU, copy_image_from_bytes, predict, set_gpu, init_cpu, make_image, get_network_boxes
+    global make_network_boxes, free_detections, free_batch_detections, free_ptrs, network_predict
+    global reset_rnn, load_net, load_net_custom, do_nms_obj, do_nms_sort, free_image, letterbox_image
+    global load_meta, load_image, rgbgr_image, predict_image, predict_image_letterbox
+    global network_predict_batch, free_network_ptr
+    if lib is not None:
+        return lib
+    lib = CDLL(path or library_path(), RTLD_LOCAL)
+    # CPU 전용 빌드에는 cuda_set_device가 없음
+    hasGPU = hasattr(lib, 'cuda_set_device')
+    # 구조체 레이아웃: 설정값, 아니면 두 레이아웃이 같게 읽히는 플랫폼에서는 기본값, 그 외에는 첫 검출 결과로 판별
+    if DARKNET_CFG['abi'] in DETECTION_LAYOUTS:
+        set_abi(DARKNET_CFG['abi'])
+    elif layouts_agree():
+        set_abi('best_class')
+
+    lib.network_width.argtypes = [c_void_p]
+    lib.network_width.restype = c_int
+    lib.network_height.argtypes = [c_void_p]
+    lib.network_height.restype = c_int
+
+    copy_image_from_bytes = lib.copy_image_from_bytes
+    copy_image_from_bytes.argtypes = [IMAGE,c_char_p]
+
+    predict = lib.network_predict_ptr
+    predict.argtypes = [c_void_p, POINTER(c_float)]
+    predict.restype = POINTER(c_float)
+
+    if hasGPU:
+        set_gpu = lib.cuda_set_device
+        set_gpu.argtypes = [c_int]
+
+    init_cpu = lib.init_cpu
+
+    make_image = lib.make_image
+    make_image.argtypes = [c_int, c_int, c_int]
+    make_image.restype = IMAGE
+
+    get_network_boxes = lib.get_network_boxes
+    get_network_boxes.argtypes = [c_void_p, c_int, c_int, c_float, c_float, POINTER(c_int), c_int, POINTER(c_int), c_int]
+    get_network_boxes.restype = POINTER(DETECTION)
+
+    make_network_boxes = lib.make_network_boxes
+    make_network_boxes.argtypes = [c_void_p]
+    make_network_boxes.restype = POINTER(DETECTION)
+
+    free_detections = lib.free_detections
+    free_detections.argtypes = [POINTER(DETECTION), c_int]
+
+    free_batch_detections = lib.free_batch_detections
+    free_batch_detections.argtypes = [POINTER(DETNUMPAIR), c_int]
+
+    free_ptrs = lib.free_ptrs
+    free_ptrs.argtypes = [POINTER(c_void_p), c_int]
+
+    network_predict = lib.network_predict_ptr
+    network_predict.argtypes = [c_void_p, POINTER(c_float)]
+
+    reset_rnn = lib.reset_rnn
+    reset_rnn.argtypes = [c_void_p]
+
+    load_net = lib.load_network
+    load_net.argtypes = [c_char_p, c_char_p, c_int]
+    load_net.restype = c_void_p
+
+    load_net_custom = lib.load_network_custom
+    load_net_custom.argtypes = [c_char_p, c_char_p, c_int, c_int]
+    load_net_custom.restype = c_void_p
+
+    do_nms_obj = lib.do_nms_obj
+    do_nms_obj.argtypes = [POINTER(DETECTION), c_int, c_int, c_float]
+
+    do_nms_sort = lib.do_nms_sort
+    do_nms_sort.argtypes = [POINTER(DETECTION), c_int, c_int, c_float]
+
+    free_image = lib.free_image
+    free_image.argtypes = [IMAGE]
+
+    letterbox_image = lib.letterbox_image
+    letterbox_image.argtypes = [IMAGE, c_int, c_int]
+    letterbox_image.restype = IMAGE
 
-lib.network_width.argtypes = [c_void_p]
-lib.network_width.restype = c_int
-lib.network_height.argtypes = [c_void_p]
-lib.network_height.restype = c_int
+    load_meta = lib.get_metadata
+    lib.get_metadata.argtypes = [c_char_p]
+    lib.get_metadata.restype = METADATA
+
+    load_image = lib.load_image_color
+    load_image.argtypes = [c_char_p, c_int, c_int]
+    load_image.restype = IMAGE
+
+    rgbgr_image = lib.rgbgr_image
+    rgbgr_image.argtypes = [IMAGE]
+
+    predict_image = lib.network_predict_image
+    predict_image.argtypes = [c_void_p, IMAGE]
+    predict_image.restype = POINTER(c_float)
+
+    predict_image_letterbox = lib.network_predict_image_letterbox
+    predict_image_letterbox.argtypes = [c_void_p, IMAGE]
+    predict_image_letterbox.restype = POINTER(c_float)
+
+    network_predict_batch = lib.network_predict_batch
+    network_predict_batch.argtypes = [c_void_p, IMAGE, c_int, c_int, c_int,
+                                       c_float, c_float, POINTER(c_int), c_int, c_int]
+    network_predict_batch.restype = POINTER(DETNUMPAIR)
 
-copy_image_from_bytes = lib.copy_image_from_bytes
-copy_image_from_bytes.argtypes = [IMAGE,c_char_p]
+    if hasattr(lib, 'free_network_ptr'):
+        free_network_ptr = lib.free_network_ptr
+        free_network_ptr.argtypes = [c_void_p]
+        free_network_ptr.restype = c_void_p
+    return lib
 
 def network_width(net):
     return lib.network_width(net)
@@ -68,104 +198,103 @@ def network_width(net):
 def network_height(net):
     return lib.network_height(net)
 
-predict = lib.network_predict_ptr
-predict.argtypes = [c_void_p, POINTER(c_float)]
-predict.restype = POINTER(c_float)
-
-if hasGPU:
-    set_gpu = lib.cuda_set_device
-    set_gpu.argtypes = [c_int]
-
-init_cpu = lib.init_cpu
-
-make_image = lib.make_image
-make_image.argtypes = [c_int, c_int, c_int]
-make_image.restype = IMAGE
-
-get_network_boxes = lib.get_network_boxes
-get_network_boxes.argtypes = [c_void_p, c_int, c_int, c_float, c_float, POINTER(c_int), c_int, POINTER(c_int), c_int]
-get_network_boxes.restype = POINTER(DETECTION)
-
-make_network_boxes = lib.make_network_boxes
-make_network_boxes.argtypes = [c_void_p]
-make_network_boxes.restype = POINTER(DETECTION)
-
-free_detections = lib.free_detections
-free_detections.argtypes = [POINTER(DETECTION), c_int]
-
-free_batch_detections = lib.free_batch_detections
-free_batch_detections.argtypes = [POINTER(DETNUMPAIR), c_int]
-
-free_ptrs = lib.free_ptrs
-free_ptrs.argtypes = [POINTER(c_void_p), c_int]
-
-network_predict = lib.network_predict_ptr
-network_predict.argtypes = [c_void_p, POINTER(c_float)]
-
-reset_rnn = lib.reset_rnn
-reset_rnn.argtypes = [c_void_p]
-
-load_net = lib.load_network
-load_net.argtypes = [c_char_p, c_char_p, c_int]
-load_net.restype = c_void_p
-
-load_net_custom = lib.load_network_custom
-load_net_custom.argtypes = [c_char_p, c_char_p, c_int, c_int]
-load_net_custom.restype = c_void_p
-
-do_nms_obj = lib.do_nms_obj
-do_nms_obj.argtypes = [POINTER(DETECTION), c_int, c_int, c_float]
-
-do_nms_sort = lib.do_nms_sort
-do_nms_sort.argtypes = [POINTER(DETECTION), c_int, c_int, c_float]
-
-free_image = lib.free_image
-free_image.argtypes = [IMAGE]
-
-letterbox_image = lib.letterbox_image
-letterbox_image.argtypes = [IMAGE, c_int, c_int]
-letterbox_image.restype = IMAGE
-
-load_meta = lib.get_metadata
-lib.get_metadata.argtypes = [c_char_p]
-lib.get_metadata.restype = METADATA
-
-load_image = lib.load_image_color
-load_image.argtypes = [c_char_p, c_int, c_int]
-load_image.restype = IMAGE
-
-rgbgr_image = lib.rgbgr_image
-rgbgr_image.argtypes = [IMAGE]
-
-predict_image = lib.network_predict_image
-predict_image.argtypes = [c_void_p, IMAGE]
-predict_image.restype = POINTER(c_float)
-
-predict_image_letterbox = lib.network_predict_image_letterbox
-predict_image_letterbox.argtypes = [c_void_p, IMAGE]
-predict_image_letterbox.restype = POINTER(c_float)
-
-network_predict_batch = lib.network_predict_batch
-network_predict_batch.argtypes = [c_void_p, IMAGE, c_int, c_int, c_int,
-                                   c_float, c_float, POINTER(c_int), c_int, c_int]
-network_predict_batch.restype = POINTER(DETNUMPAIR)
-
 def c_array(ctype, values):
     arr = (ctype*len(values))()
     arr[:] = values
     return arr
 
+def detection_view(layout):
+    # DETECTION 배열을 numpy로 바로 읽기 위한 view dtype (bbox, classes, prob 포인터만)
+    return np.dtype({
+        'names': ['bbox', 'classes', 'prob'],
+        'formats': [(np.float32, 4), np.int32, np.uintp],
+        'offsets': [layout.bbox.offset, layout.classes.offset, layout.prob.offset],
+        'itemsize': sizeof(layout),
+    })
+
+DETECTION_VIEW = detection_view(DETECTION)
+
+def set_abi(name):
+    global abi, DETECTION_VIEW
+    abi = name
+    DETECTION_VIEW = detection_view(DETECTION_LAYOUTS[name])
+
+def probe_abi(dets):
+    """
+    레이아웃이 갈리는 플랫폼(32비트 등)에서 첫 검출로 판별:
+    legacy의 prob 포인터 자리에 신규 레이아웃은 best_class_idx(-1 ~ classes-1)가 들어 있음
+    """
+    if layouts_agree():
+        set_abi('best_class')
+        return
+    v = c_ssize_t.from_address(addressof(dets.contents) + DETECTION_LEGACY.prob.offset).value
+    set_abi('best_class' if -1 <= v < 65536 else 'legacy')
+
+def detections_as_arrays(dets, num, classes):
+    """DETECTION* → (bbox (num,4) float32, prob (num,classes) float32) 넘파이 배열"""
+    if num <= 0:
+        return np.zeros((0, 4), np.float32), np.zeros((0, classes), np.float32)
+    if abi is None:
+        probe_abi(dets)
+    raw = (c_char * (num * DETECTION_VIEW.itemsize)).from_address(addressof(dets.contents))
+    view = np.frombuffer(raw, dtype=DETECTION_VIEW, count=num)
+    if (view['classes'] != classes).any():
+        # 구조체가 라이브러리와 다르면 포인터를 잘못 읽게 되므로 여기서 중단
+        raise RuntimeError(f"libdarknet.so detection layout mismatch (abi={abi}, classes={classes}); "
+                           "set DARKNET_CFG['abi']")
+    bbox = view['bbox'].copy()
+    ptrs = view['prob'].astype(np.int64)
+    row = classes * sizeof(c_float)
+    steps = np.diff(ptrs)
+    step = int(steps[0]) if num > 1 else row
+    if step >= row and step % sizeof(c_float) == 0 and (steps == step).all():
+        # prob 행이 한 블록 안에 같은 간격으로 놓여 있으면 (배치 버퍼 등) 한 번에 읽음
+        span = step * (num - 1) + row
+        raw = np.frombuffer((c_char * span).from_address(int(ptrs[0])), np.float32)
+        return bbox, np.lib.stride_tricks.as_strided(raw, (num, classes), (step, sizeof(c_float))).copy()
+    # darknet make_network_boxes는 행마다 따로 calloc → 주소 간격이 일정하지 않으면 행 단위로 읽음
+    prob_t = c_float * classes
+    prob = np.empty((num, classes), np.float32)
+    for j, ptr in enumerate(ptrs.tolist()):
+        prob[j] = np.frombuffer(prob_t.from_address(ptr), np.float32)
+    return bbox, prob
+
+
+def letterbox_params(frame_size, net_size):
+    """
+    darknet letterbox_image와 같은 배치: 원본(h, w)을 비율 유지로 줄여 네트워크 입력(w, h) 가운데에 놓음
+    반환: (new_w, new_h, dx, dy) - resize 크기와 왼쪽/위 여백
+    """
+    ih, iw = frame_size
+    w, h = net_size
+    if w / iw < h / ih:
+        new_w, new_h = w, ih * w // iw
+    else:
+        new_w, new_h = iw * h // ih, h
+    return new_w, new_h, (w - new_w) // 2, (h - new_h) // 2
+
+
+def unletterbox(bbox, frame_size, net_size):
+    """letterbox 입력 좌표 (cx, cy, w, h) → 원본 프레임 좌표 (여백 제거 후 배율 복원)"""
+    new_w, new_h, dx, dy = letterbox_params(frame_size, net_size)
+    ih, iw = frame_size
+    scale = np.float32([iw / new_w, ih / new_h, iw / new_w, ih / new_h])
+    return (bbox - np.float32([dx, dy, 0, 0])) * scale
 
 
 class Yolo():
     net = None
     meta = None
 
-    def __init__(self, configPath, weightPath, namesPath, batch_size=1, gpus=0):
+    def __init__(self, configPath, weightPath, namesPath, batch_size=1, gpus=0, letterbox=None):
         p = 0
-        set_gpu(gpus)
+        load_library()
+        if hasGPU:
+            set_gpu(gpus)
 
-        self.net = load_net_custom(configPath.encode("ascii"), weightPath.encode("ascii"), 0, 1)
+        # batch_size > 1 이면 detect_batch에서 한 번의 forward로 여러 프레임 처리
+        self.batch_size = max(1, int(batch_size))
+        self.net = load_net_custom(configPath.encode("ascii"), weightPath.encode("ascii"), 0, self.batch_size)
 
         self.darknet_image = make_image(network_width(self.net), network_height(self.net), 3)
         blank_image = np.zeros((network_width(self.net), network_height(self.net), 3), np.uint8)
@@ -184,43 +313,146 @@ class Yolo():
                 pass
         self.meta_classes = len(self.meta_names)
 
-
-    def detect(self, frame, thresh=.5, hier_thresh=.5, nms=.45, is_dummy=False):
+        # detect_batch 입력 버퍼 (batch, c, h, w) float32 - 매 호출 재사용
+        self.batch_buf = np.zeros((self.batch_size, 3, self.net_height, self.net_width), np.float32)
+
+        # 전처리 버퍼 (입력 크기별 resize/RGB 결과를 dst로 재사용, ROI처럼 크기가 매번 다르면 오래된 것부터 버림)
+        self.prep_bufs = {}
+        self.prep_cache_size = 8
+        # letterbox 모드 (None이면 DARKNET_CFG['letterbox'])
+        # detect는 원본 크기 IMAGE를 넘기고 darknet이 letterbox 처리 (크기별 캐시), detect_batch는 batch_buf에 직접 구성
+        self.letterbox = DARKNET_CFG.get('letterbox', False) if letterbox is None else letterbox
+        self.letterbox_images = {}
+        self.letterbox_cache_size = 4
+
+    def prep_buffer(self, key, shape):
+        # 최근에 쓴 것을 뒤로 (letterbox_image_for와 같은 LRU)
+        buf = self.prep_bufs.pop(key, None)
+        if buf is None or buf.shape != shape:
+            buf = np.empty(shape, np.uint8)
+            if len(self.prep_bufs) >= self.prep_cache_size:
+                del self.prep_bufs[next(iter(self.prep_bufs))]
+        self.prep_bufs[key] = buf
+        return buf
+
+    def prepare(self, frame, size=None):
+        """
+        BGR 프레임 → size(w, h) RGB uint8 (미리 할당한 버퍼에 dst로 기록, 반환값은 재사용 버퍼)
+        size가 None이면 네트워크 입력 크기
+        """
+        w, h = size or (self.net_width, self.net_height)
+        if frame.shape[:2] != (h, w):
+            resized = self.prep_buffer(('resize', w, h), (h, w, 3))
+            cv2.resize(frame, (w, h), dst=resized, interpolation=cv2.INTER_LINEAR)
+            frame = resized
+        rgb = self.prep_buffer(('rgb', w, h), (h, w, 3))
+        cv2.cvtColor(frame, cv2.COLOR_BGR2RGB, dst=rgb)
+        return rgb
+
+    def letterbox_image_for(self, w, h):
+        # 프레임 크기별 darknet IMAGE (오래된 것부터 해제)
+        key = (w, h)
+        image = self.letterbox_images.pop(key, None)
+        if image is None:
+            image = make_image(w, h, 3)
+            if len(self.letterbox_images) >= self.letterbox_cache_size:
+                old_key = next(iter(self.letterbox_images))
+                free_image(self.letterbox_images.pop(old_key))
+        self.letterbox_images[key] = image
+        return image
+
+    def prepare_letterbox(self, frame, out):
+        # BGR 프레임 → out (c, h, w) float32: 비율 유지 resize를 가운데에, 나머지는 0.5 (darknet letterbox_image와 같음)
+        new_w, new_h, dx, dy = letterbox_params(frame.shape[:2], (self.net_width, self.net_height))
+        rgb = self.prepare(frame, (new_w, new_h))
+        out.fill(0.5)
+        np.multiply(rgb.transpose(2, 0, 1), 1.0 / 255.0, out=out[:, dy:dy + new_h, dx:dx + new_w], casting='unsafe')
+
+
+    def detect(self, frame, thresh=.5, hier_thresh=.5, nms=.45, is_dummy=False, as_array=False, key=None):
         if is_dummy == False:
             bf_size = frame.shape[:2]
-            frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            if bf_size != (self.net_width, self.net_height):
-                frame = cv2.resize(frame, (self.net_width, self.net_height), interpolation=cv2.INTER_LINEAR)
-            af_size = frame.shape[:2]
-
-            copy_image_from_bytes(self.darknet_image, frame.tobytes())
-
             num = c_int(0)
             pnum = pointer(num)
-            predict_image(self.net, self.darknet_image)
+            if self.letterbox:
+                # 원본 크기 그대로 넘기고 darknet에서 letterbox → 박스도 원본 좌표로 보정됨
+                image = self.letterbox_image_for(bf_size[1], bf_size[0])
+                rgb = self.prepare(frame, (bf_size[1], bf_size[0]))
+                copy_image_from_bytes(image, rgb.ctypes.data_as(c_char_p))
+                predict_image_letterbox(self.net, image)
+                af_size = bf_size
+                letter_box = 1
+            else:
+                # bytes 변환 없이 재사용 버퍼 포인터를 바로 넘김
+                image = self.darknet_image
+                rgb = self.prepare(frame)
+                copy_image_from_bytes(image, rgb.ctypes.data_as(c_char_p))
+                predict_image(self.net, image)
+                af_size = rgb.shape[:2]
+                letter_box = 0
         else:
             predict_image(self.net, self.dummy_image)
 
         if is_dummy == False:
-            letter_box = 0
-            dets = get_network_boxes(self.net, self.darknet_image.w, self.darknet_image.h, thresh, hier_thresh, None, 0, pnum, letter_box)
+            dets = get_network_boxes(self.net, image.w, image.h, thresh, hier_thresh, None, 0, pnum, letter_box)
             num = pnum[0]
             if nms:
                 do_nms_sort(dets, num, self.meta_classes, nms)
 
-            res = []
-            for j in range(num):
-                for i in range(self.meta_classes):
-                    if dets[j].prob[i] > 0:
-                        b = dets[j].bbox
-                        x = bf_size[1] * (b.x / af_size[1])
-                        y = bf_size[0] * (b.y / af_size[0])
-                        w = bf_size[1] * (b.w / af_size[1])
-                        h = bf_size[0] * (b.h / af_size[0])
-
-                        res.append((self.meta_names[i], dets[j].prob[i], (x, y, w, h)))
-            res = sorted(res, key=lambda x: -x[1])
+            res = self.decode(dets, num, bf_size, af_size, as_array)
             free_detections(dets, num)
             return res
         else:
-            return []
+            return np.zeros(0, DET_DTYPE) if as_array else []
+
+    def detect_batch(self, frames, thresh=.5, hier_thresh=.5, nms=.45, as_array=False, keys=None):
+        """
+        여러 프레임을 batch_size 단위로 묶어 한 번의 forward(network_predict_batch)로 처리.
+        keys: 프레임 번호 (SyntheticYolo와 인터페이스를 맞추기 위한 인자, 여기서는 무시)
+        반환: 프레임별 detect()와 같은 형식의 결과 리스트
+        """
+        results = []
+        for start in range(0, len(frames), self.batch_size):
+            results.extend(self.predict_batch(frames[start:start + self.batch_size], thresh, hier_thresh, nms, as_array))
+        return results
+
+    def predict_batch(self, frames, thresh, hier_thresh, nms, as_array=False):
+        buf = self.batch_buf
+        for i, frame in enumerate(frames):
+            if self.letterbox:
+                self.prepare_letterbox(frame, buf[i])
+                continue
+            # RGB(HWC, uint8) → CHW, 0~1
+            rgb = self.prepare(frame)
+            np.multiply(rgb.transpose(2, 0, 1), 1.0 / 255.0, out=buf[i], casting='unsafe')
+        # 남는 배치 슬롯은 빈 이미지로
+        buf[len(frames):] = 0.0
+
+        image = IMAGE(self.net_width, self.net_height, 3, buf.ctypes.data_as(POINTER(c_float)))
+        batch_dets = network_predict_batch(self.net, image, self.batch_size, self.net_width, self.net_height,
+                                           thresh, hier_thresh, None, 0, 0)
+        af_size = (self.net_height, self.net_width)
+        results = []
+        for i, frame in enumerate(frames):
+            num = batch_dets[i].num
+            dets = batch_dets[i].dets
+            if nms:
+                do_nms_sort(dets, num, self.meta_classes, nms)
+            if self.letterbox:
+                # 여백을 뺀 원본 좌표로 되돌린 뒤 그대로 디코딩
+                bbox, prob = detections_as_arrays(dets, num, self.meta_classes)
+                bbox = unletterbox(bbox, frame.shape[:2], (self.net_width, self.net_height))
+                results.append(decode_arrays(bbox, prob, frame.shape[:2], frame.shape[:2], self.meta_names, as_array))
+            else:
+                results.append(self.decode(dets, num, frame.shape[:2], af_size, as_array))
+        free_batch_detections(batch_dets, self.batch_size)
+        return results
+
+    def decode(self, dets, num, bf_size, af_size, as_array=False):
+        """
+        네트워크 입력 좌표(af_size) → 원본 프레임 좌표(bf_size), 점수 내림차순.
+        DETECTION 배열을 numpy view로 한 번에 읽고 필터/스케일/정렬을 배열 연산으로 처리.
+        as_array=True면 DET_DTYPE 구조화 배열, 아니면 [(label, score, (x, y, w, h)), ...]
+        """
+        bbox, prob = detections_as_arrays(dets, num, self.meta_classes)
+        return decode_arrays(bbox, prob, bf_size, af_size, self.meta_names, as_array)
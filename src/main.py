@@ -1,235 +1,697 @@
+import time
 import cv2
 import multiprocessing
-import time
 import numpy as np
-import ffmpeg
 import os
+import sys
+import signal
+import argparse
 import queue as pyqueue
 
 from lib.init import *
-from lib.yolov4 import Yolo
-from lib.bytracker import ByteTrackLite, xywh_c_to_xyxy
-from lib.upscale_new import build_filter_graph
+from lib.detector import get_model, model_load_times, resolve_backend, BACKENDS
+from lib.bytracker import ByteTrackLite, xywh_c_to_xyxy, crop_roi, iter_tracks, track_boxes
+from lib.association import attach_secondary, plan_crops
+from lib.share import FrameRing
+from lib.helmet_cache import HelmetCache
+from lib.helmet_score import HelmetScore
+from lib.scheduler import AdaptiveStride
+from lib.queue_policy import QueuePort
+from lib.metrics import StageMetrics, StartupProfile, LAUNCH_ENV, stamp, now
+from lib.sink import FrameWriter, EventLog
+from lib.events import StateEvents
+
+# 기동 프로파일 기준 시각 - import 시점에 잡아야 인자 처리/모델 로드가 포함됨 (자식은 LAUNCH_ENV로 메인 값을 받음)
+T_LAUNCH = time.monotonic()
 
 # --- 옵션: OpenCV/BLAS 스레드 과도 경쟁 방지 ---
 os.environ.setdefault("OMP_NUM_THREADS", "1")
 os.environ.setdefault("OPENBLAS_NUM_THREADS", "1")
 cv2.setNumThreads(0)
 
+
+def new_metrics(name, **extra):
+    # 프로세스별 지연/처리량 집계 (METRICS_CFG['dir']/<name>.json으로 주기 저장)
+    out_dir = METRICS_CFG['dir'] if METRICS_CFG['enabled'] else None
+    return StageMetrics(name, out_dir, METRICS_CFG['interval'], extra)
+
+def first_frame(profile):
+    # 첫 프레임을 내보낼 때 기동 구간 출력 (이후 호출은 무시)
+    if profile.mark('first_frame'):
+        print(f"[startup] {profile.name}: {profile.summary()}")
+
+def is_control(msg):
+    # 큐 정책과 무관하게 버리면 안 되는 메시지 (입력 끝 None, 스트림 끝 ref=None)
+    return msg is None or msg[2] is None
+
+def merge_removed(pending, removed):
+    # 프레임이 드롭돼도 트랙 삭제 이벤트는 다음 메시지에 이어서 전달 ({'orig': [...], 'up': [...]})
+    for view, ids in removed.items():
+        pending.setdefault(view, []).extend(ids)
+    return pending
+
 class VideoParser(multiprocessing.Process):
-    def __init__(self, video_files, queue_out):
+    """
+    decode_mode
+    - 'split' : ffmpeg 1개, 한 번 디코딩 → split 필터로 원본/업스케일 동시 출력 (기본)
+    - 'resize': ffmpeg 1개, 원본만 디코딩 → 프로세스 내 cv2.resize로 업스케일
+    - 'dual'  : 기존 방식 (원본/업스케일용 ffmpeg 2개, 디코딩 2번)
+    출력: (stream_id, frame_idx, ref), 스트림 끝은 (stream_id, 프레임 수, None), 마지막에 None
+    - jobs 없음: video_files를 순서대로 재생 (모두 stream_id 하나)
+    - jobs 있음: 디코딩 풀 워커. jobs 큐에서 (stream_id, 파일)을 받아 파일마다 별도 스트림으로 디코딩
+    - offline: 실시간 재생 속도 제한(-re) 없이 최대 속도로 디코딩
+    - queue_policy: 출력 큐 정책 (QueuePort, 기본 QUEUE_POLICY_CFG['video'])
+    """
+    def __init__(self, video_files, queue_out, ring, decode_mode='split', stream_id=0, jobs=None, offline=False,
+                 queue_policy=None):
         multiprocessing.Process.__init__(self)
         self.video_files = video_files
         self.queue_out = queue_out
+        self.ring = ring
+        self.decode_mode = decode_mode
+        self.stream_id = stream_id
+        self.jobs = jobs
+        self.offline = offline
+        self.queue_policy = queue_policy or QUEUE_POLICY_CFG['video']
 
     def run(self):
-        for video_file in self.video_files:
-            try:
-                probe = ffmpeg.probe(video_file)
-                video_stream = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
-                if video_stream is None:
-                    print(f"No video stream found in {video_file}, skipping.")
-                    continue
+        self.profile = StartupProfile(f'video_{self.stream_id}')
+        self.port = QueuePort(self.queue_out, on_drop=lambda msg: self.ring.release(msg[2]),
+                              is_control=is_control, **self.queue_policy)
+        self.metrics = new_metrics(f'video_{self.stream_id}', queue=self.port.stats, startup=self.profile.report)
+        if self.jobs is not None:
+            while True:
+                job = self.jobs.get()
+                if job is None:
+                    break
+                sid, video_file = job
+                frame_idx = self.play(video_file, sid, 0)
+                self.port.put((sid, frame_idx, None)) # 스트림 끝 (제어 메시지는 항상 전달)
+                self.metrics.drop_stream(sid)
+        else:
+            frame_idx = 0
+            for video_file in self.video_files:
+                frame_idx = self.play(video_file, self.stream_id, frame_idx)
+            self.port.put((self.stream_id, frame_idx, None))
                 
-                width = int(video_stream['width'])
-                height = int(video_stream['height'])
+        self.port.put(None)
+        self.metrics.maybe_dump(force=True)
+        print(f"[VideoParser {self.stream_id}] queue {self.port.stats()}")
 
-                # 원본용 스트림과 업스케일용 스트림을 각각 생성
-                in_stream_orig = ffmpeg.input(video_file, **{'re': None}, threads=0)
-                in_stream_up = ffmpeg.input(video_file, **{'re': None}, threads=0)
-                
-                # 업스케일 파이프라인 구성 (build_filter_graph 사용)
-                vf, out_w, out_h = build_filter_graph(in_stream_up, width, height, scale_factor=1.25, keep_ar=True, preset='balanced')
-                
-                process_orig = (
-                    in_stream_orig
-                    .output('pipe:', format='rawvideo', pix_fmt='bgr24', vsync='vfr')
-                    .global_args('-nostats', '-loglevel', 'error')
-                    .run_async(pipe_stdout=True, quiet=True)
-                )
-                process_up = (
-                    vf
-                    .output('pipe:', format='rawvideo', pix_fmt='bgr24', vsync='vfr')
-                    .global_args('-nostats', '-loglevel', 'error')
-                    .run_async(pipe_stdout=True, quiet=True)
-                )
-
-                while True:
-                    in_bytes_orig = process_orig.stdout.read(width * height * 3)
-                    in_bytes_up = process_up.stdout.read(out_w * out_h * 3)
-                    if not in_bytes_orig or not in_bytes_up:
-                        break
-                    
-                    frame_orig = np.frombuffer(in_bytes_orig, np.uint8).reshape(height, width, 3)
-                    frame_up = np.frombuffer(in_bytes_up, np.uint8).reshape(out_h, out_w, 3)
-                    try:
-                        self.queue_out.put_nowait((frame_orig, frame_up))
-                    except pyqueue.Full:
-                        # 큐가 가득 찼으면 잠시 기다렸다가 다시 시도
-                        time.sleep(0.01)
-                        try:
-                            self.queue_out.put_nowait((frame_orig, frame_up))
-                        except pyqueue.Full:
-                            pass # 그래도 실패하면 프레임 드롭
-                
-                process_orig.wait()
-                process_up.wait()
+    def play(self, video_file, sid, frame_idx):
+        # 영상 하나를 디코딩해 스트림 sid로 전달, 다음 frame_idx 반환 (드롭된 프레임도 번호는 증가)
+        import ffmpeg # 디코딩 프로세스에서만 필요
+        try:
+            probe = ffmpeg.probe(video_file)
+            video_stream = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
+            if video_stream is None:
+                print(f"No video stream found in {video_file}, skipping.")
+                return frame_idx
+            
+            width = int(video_stream['width'])
+            height = int(video_stream['height'])
 
-            except Exception as e:
-                print(f"Error processing video {video_file}: {e}")
-                continue # 다음 영상으로 넘어감
+            if self.decode_mode == 'dual':
+                frames = self.read_dual(video_file, width, height)
+            elif self.decode_mode == 'resize':
+                frames = self.read_resize(video_file, width, height)
+            else:
+                frames = self.read_split(video_file, width, height)
+
+            t_read = now()
+            for frame_orig, frame_up in frames:
+                # 디코딩 시간 (실시간 모드는 -re 대기 포함) / 이 시점이 프레임 캡처 시각
+                t_capture = now()
+                self.metrics.observe('decode', t_capture - t_read, stream=sid)
+                idx = frame_idx
+                frame_idx += 1
+                # 공유메모리 슬롯에 기록하고 큐에는 ref만 전달 (block 정책이면 빈 슬롯이 날 때까지 대기)
+                ref = self.ring.pack((frame_orig, frame_up), timeout=None if self.port.policy == 'block' else 0.01)
+                if ref is None:
+                    self.port.count_drop('no_slot') # 빈 슬롯이 없으면 프레임 드롭
+                    t_read = now()
+                    continue
+                stamp(ref, 'capture', t_capture)
+                self.metrics.observe('pack', stamp(ref, 'video_out') - t_capture, stream=sid)
+                self.port.put((sid, idx, ref))
+                first_frame(self.profile)
+                self.metrics.count('frames', stream=sid)
+                self.metrics.maybe_dump()
+                t_read = now()
+
+        except Exception as e:
+            print(f"Error processing video {video_file}: {e}")
+            # 다음 영상으로 넘어감
+        return frame_idx
+
+    def open_input(self, video_file):
+        import ffmpeg
+        if self.offline:
+            return ffmpeg.input(video_file, threads=0)
+        return ffmpeg.input(video_file, **{'re': None}, threads=0)
+
+    def run_pipe(self, stream):
+        return (
+            stream
+            .output('pipe:', format='rawvideo', pix_fmt='bgr24', vsync='vfr')
+            .global_args('-nostats', '-loglevel', 'error')
+            .run_async(pipe_stdout=True, quiet=True)
+        )
+
+    @staticmethod
+    def read_exact(pipe, view):
+        # 재사용 버퍼에 한 프레임을 정확히 채움 (EOF면 False)
+        got = 0
+        while got < len(view):
+            n = pipe.readinto(view[got:])
+            if not n:
+                return False
+            got += n
+        return True
+
+    def read_split(self, video_file, width, height):
+        # 한 번 디코딩 → [원본 / 업스케일]이 위아래로 붙은 프레임 하나를 읽어 view로 분리
+        from lib.upscale_new import build_dual_output_graph
+        vf, layout = build_dual_output_graph(self.open_input(video_file), width, height,
+                                             scale_factor=UPSCALE_FACTOR, keep_ar=True, preset='balanced')
+        process = self.run_pipe(vf)
+
+        buf = np.empty((layout['height'], layout['width'], 3), np.uint8)
+        view = memoryview(buf).cast('B')
+        oy, ow, oh = layout['orig']
+        uy, uw, uh = layout['up']
+        try:
+            while self.read_exact(process.stdout, view):
+                yield buf[oy:oy + oh, :ow], buf[uy:uy + uh, :uw]
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    def read_resize(self, video_file, width, height):
+        # 한 번 디코딩 → 업스케일은 cv2.resize (미리 할당한 버퍼에 dst로 출력)
+        out_w = max(2, int(round(width * UPSCALE_FACTOR)) // 2 * 2)
+        out_h = max(2, int(round(height * UPSCALE_FACTOR)) // 2 * 2)
+        process = self.run_pipe(self.open_input(video_file))
+
+        frame_orig = np.empty((height, width, 3), np.uint8)
+        frame_up = np.empty((out_h, out_w, 3), np.uint8)
+        view = memoryview(frame_orig).cast('B')
+        try:
+            while self.read_exact(process.stdout, view):
+                cv2.resize(frame_orig, (out_w, out_h), dst=frame_up, interpolation=cv2.INTER_LANCZOS4)
+                yield frame_orig, frame_up
+        finally:
+            process.stdout.close()
+            process.wait()
+
+    def read_dual(self, video_file, width, height):
+        # 원본용 스트림과 업스케일용 스트림을 각각 생성
+        from lib.upscale_new import build_filter_graph
+        in_stream_orig = self.open_input(video_file)
+        in_stream_up = self.open_input(video_file)
+        
+        # 업스케일 파이프라인 구성 (build_filter_graph 사용)
+        vf, out_w, out_h = build_filter_graph(in_stream_up, width, height, scale_factor=UPSCALE_FACTOR, keep_ar=True, preset='balanced')
+        
+        process_orig = self.run_pipe(in_stream_orig)
+        process_up = self.run_pipe(vf)
+        try:
+            while True:
+                in_bytes_orig = process_orig.stdout.read(width * height * 3)
+                in_bytes_up = process_up.stdout.read(out_w * out_h * 3)
+                if not in_bytes_orig or not in_bytes_up:
+                    break
                 
-        self.queue_out.put(None)
+                frame_orig = np.frombuffer(in_bytes_orig, np.uint8).reshape(height, width, 3)
+                frame_up = np.frombuffer(in_bytes_up, np.uint8).reshape(out_h, out_w, 3)
+                yield frame_orig, frame_up
+        finally:
+            # 한쪽이 먼저 끝나거나 중간에 멈춰도 남은 ffmpeg는 파이프가 닫혀 종료됨 (wait에서 멈추지 않음)
+            for process in (process_orig, process_up):
+                process.stdout.close()
+                process.wait()
+
+
+def new_tracker():
+    return ByteTrackLite(fps=30, 
+                         track_thresh=0.45, 
+                         low_thresh=0.1, 
+                         match_thresh=0.6,
+                         max_age=30, 
+                         min_hits=3,
+                         history_len=TRACK_HISTORY_LEN)
+
+
+class InputLane:
+    """DetectParser 입력 큐 하나 (VideoParser 하나와 1:1, 여러 파일 스트림이 순서대로 지나갈 수 있음)"""
+    def __init__(self, idx, queue_in):
+        self.idx = idx
+        self.queue_in = queue_in
+        self.done = False
+
+    def queue_depth(self):
+        try:
+            return self.queue_in.qsize()
+        except NotImplementedError: # macOS
+            return 0
+
+
+class StreamContext:
+    """DetectParser가 스트림(카메라/파일)마다 따로 유지하는 상태 (트래커, 검출 주기, 쓰러짐 상태)"""
+    def __init__(self, sid, lane, scheduler_cfg=FRAME_SCHEDULER_CFG):
+        self.sid = sid
+        self.lane = lane
+        self.tracker_orig = new_tracker()
+        self.tracker_up = new_tracker()
+        # 검출 주기 자동 조절 + 건너뛴 프레임에 이어 붙일 직전 쓰러짐 상태
+        self.scheduler = AdaptiveStride(**scheduler_cfg)
+        self.last_falldown = {}
+        # 아직 하위 프로세스로 전달하지 못한 트랙 삭제 이벤트
+        self.pending_removed = {'orig': [], 'up': []}
+        self.frame_cnt = 0
+
+    def queue_depth(self):
+        return self.lane.queue_depth()
 
 
 class DetectParser(multiprocessing.Process):
-    def __init__(self, queue_in, queue_out, gpu_id=0):
+    """
+    검출 + 추적 단계. 모델은 프로세스당 한 벌만 로드하고 여러 스트림이 공유
+    - queues_in: VideoParser별 입력 큐 목록 (큐 하나만 넘기면 단일 입력)
+    - 입력 메시지: (stream_id, frame_idx, ref), 스트림 끝은 ref가 None, 입력 큐 끝은 None
+    - 스트림마다 ByteTrackLite(원본/업스케일), AdaptiveStride를 따로 유지 (StreamContext, 스트림 끝에 정리)
+    - 라운드로빈으로 입력 큐당 최대 1프레임씩 모아 검출이 필요한 프레임을 한 배치로 추론
+    - 쓰러짐 검출은 추적 후 확정된 사람 트랙 주변 crop만 모아 한 배치로 추론 (FALLDOWN_ROI_CFG)
+    - 스트림의 프레임은 항상 같은 큐를 거치므로 스트림 안에서는 frame_idx 순서 유지
+    - offline: 검출 주기는 init_stride로 고정 (결과가 장비 속도와 무관)
+    - queue_policy: 출력 큐 정책 (QueuePort, 기본 QUEUE_POLICY_CFG['detect']), 버린 프레임의 삭제 이벤트는 다음 메시지로
+    """
+    # 2차 검출이 매칭되지 않은 트랙의 상태
+    SECONDARY_DEFAULTS = {'falldown_status': {'label': 'standing', 'score': 0.0}}
+
+    def __init__(self, queues_in, queue_out, ring, gpu_id=0, offline=False, queue_policy=None, backend=None):
         multiprocessing.Process.__init__(self)
-        self.queue_in = queue_in
+        if not isinstance(queues_in, (list, tuple)):
+            queues_in = [queues_in]
+        self.queues_in = list(queues_in)
         self.queue_out = queue_out
-        self.frame_cnt = 0
-        self.model_cfgs = {
-            k: {'cfg': v['cfg'], 'weights': v['weights'], 'names': v['names']}
-            for k, v in model_cfgs.items()
-        }
+        self.ring = ring
+        # 헬멧 분류는 HelmetParser에서 담당
+        self.model_keys = [k for k in model_cfgs if k != HELMET_MODEL]
         self.gpu_id = gpu_id
+        self.backend = backend # 검출 백엔드 (None이면 DETECTOR_BACKEND)
+        self.batch_streams = max(1, min(len(self.queues_in), MULTI_STREAM_CFG['max_batch_streams']))
+        self.offline = offline
+        self.queue_policy = queue_policy or QUEUE_POLICY_CFG['detect']
+        self.scheduler_cfg = dict(FRAME_SCHEDULER_CFG)
+        if offline:
+            stride = self.scheduler_cfg['init_stride']
+            self.scheduler_cfg.update(min_stride=stride, max_stride=stride)
 
         
     def __init__runtime(self):
+        self.profile = StartupProfile('detect')
         os.environ["CUDA_VISIBLE_DEVICES"] = str(self.gpu_id)
         os.environ.setdefault("CUDA_DEVICE_ORDER", "PCI_BUS_ID")
 
-        # 모델 로드 (필요한 것만)
-        for key, v in self.model_cfgs.items():
-            self.model_cfgs[key] = Yolo(v['cfg'], v['weights'], v['names'])
-
-        self.tracker_orig = ByteTrackLite(fps=30, 
-                                    track_thresh=0.45, 
-                                    low_thresh=0.1, 
-                                    match_thresh=0.6,
-                                    max_age=30, 
-                                    min_hits=3)
+        # 모델 로드 (필요한 것만, 프로세스당 한 번) - 여러 스트림의 원본/업스케일 프레임을 한 배치로 추론
+        self.models = {key: get_model(key, batch_size=DETECT_BATCH_SIZE * self.batch_streams, backend=self.backend)
+                       for key in self.model_keys}
+        self.profile.mark('models')
 
-        self.tracker_up = ByteTrackLite(fps=30, 
-                                    track_thresh=0.45, 
-                                    low_thresh=0.1, 
-                                    match_thresh=0.6,
-                                    max_age=30, 
-                                    min_hits=3)
+        self.lanes = [InputLane(i, q) for i, q in enumerate(self.queues_in)]
+        self.streams = {}
+        self.next_lane = 0
+        self.port = QueuePort(self.queue_out, on_drop=self.on_drop, is_control=is_control, **self.queue_policy)
+        self.metrics = new_metrics('detect', queue=self.port.stats,
+                                   scheduler=lambda: {sid: ctx.scheduler.metrics() for sid, ctx in self.streams.items()},
+                                   startup=self.profile.report, models=model_load_times)
 
     def run(self):
         self.__init__runtime()
-        while True:
-            frame_pair = self.queue_in.get()
-            if frame_pair is None:
-                self.queue_out.put(None)
+        while not all(lane.done for lane in self.lanes):
+            batch = self.gather()
+            if batch:
+                self.process(batch)
+            self.metrics.maybe_dump()
+        self.port.put(None)
+        self.metrics.maybe_dump(force=True)
+        print(f"[DetectParser] queue {self.port.stats()}")
+
+    def receive(self, lane, msg, batch):
+        # 입력 메시지 하나 처리: 프레임이면 batch에 추가, 스트림/입력 끝이면 정리
+        if msg is None:
+            lane.done = True
+            return
+        sid, frame_idx, ref = msg
+        ctx = self.streams.get(sid)
+        if ref is None:
+            # 스트림 끝: 상태를 버리고 하위 단계에도 알림 (유실되면 안 되므로 블로킹 put)
+            self.streams.pop(sid, None)
+            self.port.put((sid, frame_idx, None, None, None, None))
+            self.metrics.drop_stream(sid)
+            return
+        if ctx is None:
+            ctx = self.streams[sid] = StreamContext(sid, lane, self.scheduler_cfg)
+        ts = ref.setdefault('ts', {})
+        stamp(ref, 'detect_in')
+        self.metrics.observe_span(ts, 'video_out', 'detect_in', 'wait.video', stream=sid)
+        batch.append((ctx, frame_idx, ref))
+
+    def gather(self):
+        """
+        라운드로빈으로 준비된 프레임을 입력 큐당 1개씩, 최대 batch_streams개 수집
+        - 매번 직전에 마지막으로 처리한 큐 다음부터 확인 → 한 스트림이 배치를 독점하지 않음
+        - 준비된 프레임이 없으면 다음 큐에서 잠깐 대기
+        """
+        n = len(self.lanes)
+        start = self.next_lane
+        batch = []
+        for k in range(n):
+            lane = self.lanes[(start + k) % n]
+            if lane.done:
+                continue
+            try:
+                msg = lane.queue_in.get_nowait()
+            except pyqueue.Empty:
+                continue
+            self.next_lane = (lane.idx + 1) % n
+            self.receive(lane, msg, batch)
+            if len(batch) >= self.batch_streams:
                 break
-            
-            orig_frame, up_frame = frame_pair
-            self.frame_cnt += 1
-            if self.frame_cnt % 3 == 0:
-                # 1. 사람 검출 및 추적
-                det_o = self.model_cfgs.get(DETECT_MODEL).detect(orig_frame, 0.4, 0.5) if DETECT_MODEL in self.model_cfgs else []
-                tracks_o, _ = self.tracker_orig.update(det_o or [], orig_frame)
-
-                # 2. 쓰러짐 검출
-                falldown_dets_o = []
-                if 'falldown_v3' in self.model_cfgs:
-                    falldown_dets_o = self.model_cfgs['falldown_v3'].detect(orig_frame, 0.4, 0.5)
-                
-                # 3. 사람 트랙에 쓰러짐 상태 매칭
-                self.match_falldown_to_tracks(tracks_o, falldown_dets_o)
 
-                # --- 업스케일 프레임도 동일하게 처리 ---
-                det_u = self.model_cfgs.get(DETECT_MODEL).detect(up_frame, 0.4, 0.5) if DETECT_MODEL in self.model_cfgs else []
-                tracks_u, _ = self.tracker_up.update(det_u or [], up_frame)
-                
-                falldown_dets_u = []
-                if 'falldown_v3' in self.model_cfgs:
-                    falldown_dets_u = self.model_cfgs['falldown_v3'].detect(up_frame, 0.4, 0.5)
+        if not batch:
+            lane = next((self.lanes[(start + k) % n] for k in range(n)
+                         if not self.lanes[(start + k) % n].done), None)
+            if lane is None:
+                return batch
+            self.next_lane = (lane.idx + 1) % n
+            try:
+                msg = lane.queue_in.get(timeout=0.005)
+            except pyqueue.Empty:
+                return batch
+            self.receive(lane, msg, batch)
+        return batch
 
-                self.match_falldown_to_tracks(tracks_u, falldown_dets_u)
-                
-                # 디스플레이로 두 프레임과 트랙 전달
-                try:
-                    self.queue_out.put_nowait(((orig_frame, tracks_o), (up_frame, tracks_u)))
-                except pyqueue.Full:
-                    pass
-
-    def match_falldown_to_tracks(self, tracks, falldown_dets, iou_threshold=0.3):
-        if not falldown_dets:
-            for track in tracks:
-                track['falldown_status'] = {'label': 'standing', 'score': 0.0}
+    def process(self, batch):
+        jobs = []
+        for ctx, frame_idx, ref in batch:
+            frames = self.ring.unpack(ref)
+            if frames is None:
+                continue # 이미 재사용된 슬롯
+            orig_frame, up_frame = frames
+            ctx.frame_cnt += 1
+            if ctx.scheduler.should_detect():
+                jobs.append((ctx, frame_idx, ref, orig_frame, up_frame))
+                continue
+            # 건너뛴 프레임: 칼만 예측만 (박스는 매 프레임 이동)
+            t0 = now()
+            tracks_o, _ = ctx.tracker_orig.predict(orig_frame, as_array=TRACK_ARRAY_OUTPUT)
+            tracks_u, _ = ctx.tracker_up.predict(up_frame, as_array=TRACK_ARRAY_OUTPUT)
+            self.carry_falldown(ctx, 'orig', tracks_o)
+            self.carry_falldown(ctx, 'up', tracks_u)
+            self.metrics.observe('predict', now() - t0, stream=ctx.sid)
+            self.emit(ctx, frame_idx, ref, tracks_o, tracks_u)
+
+        if not jobs:
             return
 
-        # xywh_c to xyxy 변환
-        det_boxes = [xywh_c_to_xyxy(det[2]) for det in falldown_dets]
-        
-        for track in tracks:
-            track['falldown_status'] = {'label': 'standing', 'score': 0.0} # 기본값
-            track_box = track['bbox']
-            
-            best_iou = 0
-            best_det = None
-            for i, det_box in enumerate(det_boxes):
-                iou = self.calculate_iou(track_box, det_box)
-                if iou > best_iou:
-                    best_iou = iou
-                    best_det = falldown_dets[i]
-            
-            if best_iou > iou_threshold and best_det:
-                track['falldown_status'] = {'label': best_det[0], 'score': best_det[1]}
-    
-    def calculate_iou(self, boxA, boxB):
-        # ... (IoU 계산 함수, bytracker에서 가져오거나 간단히 구현) ...
-        xA = max(boxA[0], boxB[0])
-        yA = max(boxA[1], boxB[1])
-        xB = min(boxA[2], boxB[2])
-        yB = min(boxA[3], boxB[3])
+        t0 = time.perf_counter()
+        # 1. 사람 검출 (모든 스트림의 원본 + 업스케일을 한 번에)
+        images = [img for _, _, _, orig_frame, up_frame in jobs for img in (orig_frame, up_frame)]
+        keys = [frame_idx for _, frame_idx, _, _, _ in jobs for _ in range(2)]
+        person_dets = self.detect_images(DETECT_MODEL, images, keys)
 
-        interArea = max(0, xB - xA) * max(0, yB - yA)
+        # 2. 스트림별 추적
+        tracked = []
+        for k, (ctx, frame_idx, ref, orig_frame, up_frame) in enumerate(jobs):
+            t_track = now()
+            det_o, det_u = person_dets[2 * k], person_dets[2 * k + 1]
+            tracks_o, removed_o = ctx.tracker_orig.update(det_o or [], orig_frame, as_array=TRACK_ARRAY_OUTPUT)
+            # --- 업스케일 프레임도 동일하게 처리 ---
+            tracks_u, removed_u = ctx.tracker_up.update(det_u or [], up_frame, as_array=TRACK_ARRAY_OUTPUT)
+            self.metrics.observe('track', now() - t_track, stream=ctx.sid)
+            tracked.append((tracks_o, removed_o, tracks_u, removed_u))
 
-        boxAArea = (boxA[2] - boxA[0]) * (boxA[3] - boxA[1])
-        boxBArea = (boxB[2] - boxB[0]) * (boxB[3] - boxB[1])
+        # 3. 쓰러짐 검출 (사람 트랙 주변 ROI만, 또는 프레임 전체) → 사람 트랙에 쓰러짐 상태 매칭
+        if FALLDOWN_ROI_CFG['enabled']:
+            falldown_dets = self.detect_rois('falldown_v3', images,
+                                             [tracks for t in tracked for tracks in (t[0], t[2])], keys)
+        else:
+            falldown_dets = self.detect_images('falldown_v3', images, keys)
+        outputs = []
+        for k, (ctx, frame_idx, ref, orig_frame, up_frame) in enumerate(jobs):
+            tracks_o, removed_o, tracks_u, removed_u = tracked[k]
+            self.attach_secondary_dets(tracks_o, {'falldown_status': falldown_dets[2 * k]})
+            self.keep_falldown(ctx, 'orig', tracks_o, removed_o)
+            self.attach_secondary_dets(tracks_u, {'falldown_status': falldown_dets[2 * k + 1]})
+            self.keep_falldown(ctx, 'up', tracks_u, removed_u)
+            merge_removed(ctx.pending_removed, {'orig': removed_o, 'up': removed_u})
+            outputs.append((ctx, frame_idx, ref, tracks_o, tracks_u))
 
-        iou = interArea / float(boxAArea + boxBArea - interArea)
-        return iou
+        # 배치 한 번의 지연은 묶인 모든 스트림이 같이 겪음
+        latency = time.perf_counter() - t0
+        for ctx, frame_idx, ref, tracks_o, tracks_u in outputs:
+            changed = ctx.scheduler.report(latency, ctx.queue_depth())
+            if changed:
+                m = ctx.scheduler.metrics()
+                print(f"[DetectParser] stream {ctx.sid} stride {changed[0]} -> {changed[1]} "
+                      f"(latency {m['latency_ms']:.1f}ms, queue {m['queue_depth']})")
+            self.emit(ctx, frame_idx, ref, tracks_o, tracks_u)
 
+    def detect_images(self, key, images, keys=None):
+        # keys: 이미지별 프레임 번호 (SyntheticYolo가 위치 계산에 사용)
+        if key not in self.models:
+            return [[] for _ in images]
+        t0 = now()
+        results = self.models[key].detect_batch(images, 0.4, 0.5, keys=keys)
+        self.metrics.observe(f'model.{key}', now() - t0)
+        self.metrics.count(f'model.{key}.images', len(images))
+        return results
 
-class DispEvent(multiprocessing.Process):
-    def __init__(self, queue):
+    def detect_rois(self, key, images, tracks_per_image, keys=None):
+        """
+        2차 검출을 확정된 사람 트랙 주변 crop에서만 수행 (top-down, FALLDOWN_ROI_CFG)
+        - 프레임마다 plan_crops로 crop 영역 결정 (여백 추가, 겹치는 트랙은 합침), 모든 프레임의 crop을 한 배치로
+        - 결과 박스는 프레임 좌표로 되돌려 detect_images와 같은 형식 (이미지별 목록)으로 반환
+        """
+        crops, owners = [], []
+        for i, (image, tracks) in enumerate(zip(images, tracks_per_image)):
+            boxes = [track['bbox'] for track in iter_tracks(tracks) if track['confirmed']]
+            for x1, y1, x2, y2 in plan_crops(boxes, image.shape, FALLDOWN_ROI_CFG['pad'],
+                                             FALLDOWN_ROI_CFG['min_size'], FALLDOWN_ROI_CFG['full_frame_ratio']):
+                crops.append(image[y1:y2, x1:x2])
+                owners.append((i, x1, y1))
+
+        results = [[] for _ in images]
+        self.metrics.count(f'model.{key}.crops', len(crops))
+        if not crops:
+            return results # 사람이 없으면 추론 생략
+        crop_keys = None if keys is None else [keys[i] for i, _, _ in owners]
+        for (i, x1, y1), dets in zip(owners, self.detect_images(key, crops, crop_keys)):
+            results[i].extend((label, score, (cx + x1, cy + y1, w, h)) for label, score, (cx, cy, w, h) in dets)
+        return results
+
+    def emit(self, ctx, frame_idx, ref, tracks_o, tracks_u):
+        # 다음 단계로 스트림 ID, 프레임 번호/ref와 트랙, 삭제된 트랙 ID 전달 (프레임은 공유메모리에 그대로)
+        removed, ctx.pending_removed = ctx.pending_removed, {'orig': [], 'up': []}
+        ts = ref.get('ts', {})
+        stamp(ref, 'detect_out')
+        self.metrics.observe_span(ts, 'detect_in', 'detect_out', 'detect_stage', stream=ctx.sid)
+        self.metrics.count('frames', stream=ctx.sid)
+        self.port.put((ctx.sid, frame_idx, ref, tracks_o, tracks_u, removed))
+        first_frame(self.profile)
+
+    def on_drop(self, msg):
+        # 버린 프레임: 슬롯 반환, 실려 있던 삭제 이벤트는 다음 메시지로 다시 전달
+        sid, _, ref, _, _, removed = msg
+        self.ring.release(ref)
+        ctx = self.streams.get(sid)
+        if ctx is not None:
+            merge_removed(ctx.pending_removed, removed)
+
+    def keep_falldown(self, ctx, view, tracks, removed_ids):
+        for track in iter_tracks(tracks):
+            ctx.last_falldown[(view, track['id'])] = track['falldown_status']
+        for tid in removed_ids:
+            ctx.last_falldown.pop((view, tid), None)
+
+    def carry_falldown(self, ctx, view, tracks):
+        for track in iter_tracks(tracks):
+            track['falldown_status'] = ctx.last_falldown.get((view, track['id']), dict(self.SECONDARY_DEFAULTS['falldown_status']))
+
+    def attach_secondary_dets(self, tracks, det_groups):
+        """
+        2차 검출 결과를 사람 트랙에 한 번에 연결 (IoU 행렬 1회 계산)
+        det_groups: {트랙 상태 키: yolo 결과} 예) {'falldown_status': falldown_dets}
+        """
+        boxes = {key: [xywh_c_to_xyxy(det[2]) for det in dets] for key, dets in det_groups.items()}
+        matched = attach_secondary(track_boxes(tracks), boxes,
+                                   SECONDARY_MATCH_CFG['iou_thresh'], SECONDARY_MATCH_CFG['method'])
+        for i, track in enumerate(iter_tracks(tracks)):
+            for key, dets in det_groups.items():
+                j = matched[key][i]
+                if j >= 0:
+                    track[key] = {'label': dets[j][0], 'score': dets[j][1]}
+                else:
+                    track[key] = dict(self.SECONDARY_DEFAULTS[key]) # 기본값
+
+
+class HelmetParser(multiprocessing.Process):
+    """
+    헬멧 분류 단계 (DetectParser → HelmetParser → DispEvent)
+    - 한 프레임(원본 + 업스케일)의 매칭된 트랙 ROI(roi_box)를 모두 모아 detect_batch 한 번으로 분류
+    - 결과는 track['helmet_results']로 붙여서 전달
+    - UID별 캐시로 새 트랙/불확실한 트랙만 재분류 (HelmetCache)
+    """
+    def __init__(self, queue_in, queue_out, ring, gpu_id=0, queue_policy=None, backend=None):
         multiprocessing.Process.__init__(self)
-        self.queue = queue
-        self.enable_crop_view = False
-        self.color_cfgs = color_cfgs
+        self.queue_in = queue_in
+        self.queue_out = queue_out
+        self.ring = ring
+        self.gpu_id = gpu_id
+        self.backend = backend
+        self.queue_policy = queue_policy or QUEUE_POLICY_CFG['helmet'] # 출력 큐 정책 (QueuePort)
         self.helmet_model = None
-        self.falldown_model = None
-        self.scores = {}
-        self.label_hits = {} # UID별 라벨 카운트를 저장할 딕셔너리
+        # 스트림별 캐시/미전달 삭제 이벤트 (캐시의 프레임 간격은 스트림 기준)
+        self.caches = {}
+        self.pending_removed = {}
 
     def run(self):
+        self.profile = StartupProfile('helmet')
+        os.environ["CUDA_VISIBLE_DEVICES"] = str(self.gpu_id)
+        os.environ.setdefault("CUDA_DEVICE_ORDER", "PCI_BUS_ID")
+
         # 헬멧 모델 로드
-        helmet_cfg = model_cfgs.get('helmet_resort_v2')
-        if helmet_cfg:
-            self.helmet_model = Yolo(helmet_cfg['cfg'], helmet_cfg['weights'], helmet_cfg['names'])
+        if HELMET_MODEL in model_cfgs:
+            self.helmet_model = get_model(HELMET_MODEL, batch_size=HELMET_BATCH_SIZE, backend=self.backend)
+        self.profile.mark('models')
 
-        falldown_cfg = model_cfgs.get('falldown_v3')
-        if falldown_cfg:
-            self.falldown_model = Yolo(falldown_cfg['cfg'], falldown_cfg['weights'], falldown_cfg['names'])
+        self.port = QueuePort(self.queue_out, on_drop=self.on_drop, is_control=is_control, **self.queue_policy)
+        self.metrics = new_metrics('helmet', queue=self.port.stats,
+                                   cache=lambda: {sid: c.stats() for sid, c in self.caches.items()},
+                                   startup=self.profile.report, models=model_load_times)
+        while True:
+            self.metrics.maybe_dump()
+            data = self.queue_in.get()
+            if data is None:
+                self.port.put(None)
+                self.metrics.maybe_dump(force=True)
+                print(f"[HelmetParser] queue {self.port.stats()}")
+                break
+
+            sid, frame_idx, ref, tracks_o, tracks_u, removed = data
+            if ref is None:
+                # 스트림 끝: 스트림 상태 정리 후 그대로 전달
+                self.caches.pop(sid, None)
+                self.pending_removed.pop(sid, None)
+                self.port.put(data)
+                self.metrics.drop_stream(sid)
+                continue
+            cache = self.caches.get(sid)
+            if cache is None:
+                cache = self.caches[sid] = HelmetCache(**HELMET_CACHE_CFG)
+            # 삭제된 트랙 캐시 정리 (프레임이 무효여도 이벤트는 다음으로 전달)
+            cache.evict([(view, tid) for view, ids in removed.items() for tid in ids])
+            merge_removed(self.pending_removed.setdefault(sid, {}), removed)
+            frames = self.ring.unpack(ref)
+            if frames is None:
+                continue
+            frame_orig, frame_up = frames
+            ts = ref.setdefault('ts', {})
+            stamp(ref, 'helmet_in')
+            self.metrics.observe_span(ts, 'detect_out', 'helmet_in', 'wait.detect', stream=sid)
+
+            # 원본/업스케일 트래커는 ID 공간이 따로라 키를 구분
+            cache.tick()
+            self.check_helmets(cache, [(('orig', t['id']), t, frame_orig) for t in iter_tracks(tracks_o)] +
+                               [(('up', t['id']), t, frame_up) for t in iter_tracks(tracks_u)], frame_idx)
+
+            stamp(ref, 'helmet_out')
+            self.metrics.observe_span(ts, 'helmet_in', 'helmet_out', 'helmet_stage', stream=sid)
+            self.metrics.count('frames', stream=sid)
+            self.port.put((sid, frame_idx, ref, tracks_o, tracks_u, self.pending_removed.pop(sid)))
+            first_frame(self.profile)
+
+    def on_drop(self, msg):
+        # 버린 프레임: 슬롯 반환, 실려 있던 삭제 이벤트는 다음 메시지로 다시 전달
+        sid, _, ref, _, _, removed = msg
+        self.ring.release(ref)
+        if sid in self.caches:
+            merge_removed(self.pending_removed.setdefault(sid, {}), removed)
+
+    def check_helmets(self, cache, keyed_tracks, frame_idx=None):
+        rois, owners = [], []
+        for key, track, frame in keyed_tracks:
+            track['helmet_results'] = []
+            if not track.get('matched', True):
+                continue # 표시하지 않는 트랙은 분류 생략
+            if not cache.needs_check(key, track):
+                track['helmet_results'] = cache.get(key)
+                continue
+            # 분류가 필요한 트랙만 공유메모리 프레임에서 바로 잘라냄 (view)
+            roi_frame = crop_roi(frame, track)
+            if roi_frame is None or roi_frame.size == 0:
+                continue
+            rois.append(roi_frame)
+            owners.append((key, track))
+
+        if not rois or self.helmet_model is None:
+            return
+        t0 = now()
+        keys = None if frame_idx is None else [frame_idx] * len(rois)
+        batch_results = self.helmet_model.detect_batch(rois, 0.5, 0.5, keys=keys)
+        self.metrics.observe(f'model.{HELMET_MODEL}', now() - t0)
+        self.metrics.count(f'model.{HELMET_MODEL}.images', len(rois))
+        for (key, track), results in zip(owners, batch_results):
+            track['helmet_results'] = results
+            cache.update(key, track, results)
+
+
+class DispEvent(multiprocessing.Process):
+    def __init__(self, queue, ring):
+        multiprocessing.Process.__init__(self)
+        self.queue = queue
+        self.ring = ring
+        self.enable_crop_view = False
+        self.color_cfgs = color_cfgs
+        self.helmet_scores = {} # 스트림별 업스케일 트랙 UID 헬멧 점수 (HelmetScore)
+        self.windows = {}
 
-        cv2.namedWindow('frame', cv2.WINDOW_NORMAL)
+    def run(self):
+        self.profile = StartupProfile('display')
+        self.metrics = new_metrics('display', startup=self.profile.report)
         while True:
+            self.metrics.maybe_dump()
             data = self.queue.get()
             if data is None:
                 break
 
-            (frame_orig, results_orig), (frame_up, results_up) = data
+            sid, frame_idx, ref, results_orig, results_up, removed = data
+            if ref is None:
+                # 스트림 끝: 점수/창 정리
+                self.helmet_scores.pop(sid, None)
+                name = self.windows.pop(sid, None)
+                if name is not None:
+                    cv2.destroyWindow(name)
+                self.metrics.drop_stream(sid)
+                continue
+            helmet_score = self.helmet_scores.get(sid)
+            if helmet_score is None:
+                helmet_score = self.helmet_scores[sid] = HelmetScore()
+            helmet_score.evict(removed.get('up', ()))
+            frames = self.ring.unpack(ref)
+            if frames is None:
+                continue
+            frame_orig, frame_up = frames
+            ts = ref.setdefault('ts', {})
+            t_in = stamp(ref, 'display_in')
+            self.metrics.observe_span(ts, 'sink_in', 'display_in', 'wait.sink', stream=sid)
 
             if frame_orig is not None:
-                for track in results_orig or []:
+                for track in iter_tracks(results_orig):
                     uid = track['id']
                     class_id = track['label']
-                    roi_frame = track['roi_frame']
                     ori_p_color = self.color_cfgs.get('person5l')
                     
                     if track.get('matched', True):
@@ -237,7 +699,7 @@ class DispEvent(multiprocessing.Process):
                     else:
                         continue
 
-                    helmet_results = self.check_helmet(roi_frame)
+                    helmet_results = track.get('helmet_results') or []
                     current_label, highest_score = 'detecting_helmet', 0
                     if helmet_results:
                         current_label, highest_score, _ = max(helmet_results, key=lambda x: x[1])
@@ -262,10 +724,9 @@ class DispEvent(multiprocessing.Process):
                 cv2.putText(frame_orig, 'ORIGINAL', (30, 80), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 255), 4)
 
             if frame_up is not None:
-                for track in results_up or []:
+                for track in iter_tracks(results_up):
                     uid = track['id']
                     class_id = track['label']
-                    roi_frame = track['roi_frame']
                     up_p_color = self.color_cfgs.get('person5l')
 
                     if track.get('matched', True):
@@ -274,12 +735,9 @@ class DispEvent(multiprocessing.Process):
                         continue
                     
                     # 헬멧 판단 수행
-                    helmet_results = self.check_helmet(roi_frame)
-                    dominant_label, hit_count = self.update_and_get_dominant_label(uid, helmet_results)
-
-                    
+                    helmet_results = track.get('helmet_results') or []
                     # 스코어링 시스템 업데이트
-                    helmet_status, score = self.calc_score(uid, dominant_label, hit_count)
+                    helmet_status, score = helmet_score.update(uid, helmet_results)
 
                     cv2.rectangle(frame_up, (xmin, ymin), (xmax, ymax), up_p_color, 2)
                     txt = '{} / {}'.format(str(class_id), str(uid))
@@ -308,9 +766,18 @@ class DispEvent(multiprocessing.Process):
             disp_up = self.pad_to_height(frame_up, target_h)
 
             stacked = np.hstack((disp_orig, disp_up))
-            cv2.imshow('frame', stacked)
+            t_draw = now()
+            self.metrics.observe('render', t_draw - t_in, stream=sid)
+            cv2.imshow(self.window(sid), stacked)
+            self.ring.release(ref) # 표시가 끝난 슬롯 반환
+            first_frame(self.profile)
             
             key = cv2.waitKey(1) & 0xFF
+            t_out = now()
+            self.metrics.observe('imshow', t_out - t_draw, stream=sid)
+            if 'capture' in ts:
+                self.metrics.observe('e2e', t_out - ts['capture'], stream=sid) # 캡처 → 화면 표시
+            self.metrics.count('frames', stream=sid)
             if key == ord('q'):
                 break
             elif key == ord('c'):
@@ -318,8 +785,17 @@ class DispEvent(multiprocessing.Process):
 
             time.sleep(0.001)
         
+        self.metrics.maybe_dump(force=True)
         cv2.destroyAllWindows()
 
+    def window(self, sid):
+        # 스트림마다 창 하나 (첫 프레임에 생성)
+        name = self.windows.get(sid)
+        if name is None:
+            name = self.windows[sid] = 'frame' if sid == 0 else f'frame {sid}'
+            cv2.namedWindow(name, cv2.WINDOW_NORMAL)
+        return name
+
     def pad_to_height(self, img, target_h):
         dh = target_h - img.shape[0]
         if dh <= 0:
@@ -328,89 +804,216 @@ class DispEvent(multiprocessing.Process):
         bottom = dh - top
         return cv2.copyMakeBorder(img, top, bottom, 0, 0, cv2.BORDER_CONSTANT, value=(0, 0, 0))
 
-    def check_helmet(self, roi_frame):
-        if roi_frame is None or roi_frame.size == 0:
-            return []
-        if self.helmet_model:
-            return self.helmet_model.detect(roi_frame, 0.5, 0.5)
-        return []
-
-   
-    def update_and_get_dominant_label(self, uid, results):
-        if uid not in self.label_hits:
-            self.label_hits[uid] = {}
-
-        # 1. 현재 프레임의 최고 점수 라벨 찾기
-        current_label = 'nohelmet'
-        highest_score = 0
-        if results:
-            try:
-                # 가장 높은 신뢰도의 검출 결과를 찾음
-                current_label, highest_score, _ = max(results, key=lambda x: x[1])
-            except (TypeError, ValueError):
-                pass
-        
-        # 2. 라벨 카운트 업데이트
-        self.label_hits[uid][current_label] = self.label_hits[uid].get(current_label, 0) + 1
 
-        # 3. 지배적인 라벨 찾기
-        if not self.label_hits[uid]:
-            return 'nohelmet', 0
-            
-        dominant_label = max(self.label_hits[uid], key=self.label_hits[uid].get)
-        hit_count = self.label_hits[uid][dominant_label]
-
-        return dominant_label, hit_count
-
-    def calc_score(self, uid, dominant_label, hit_count):
-        if uid not in self.scores:
-            self.scores[uid] = 0
-
-        # 점수 산정 로직 수정: 지배적인 라벨과 그 카운트를 기반으로 점수 조정
-        if dominant_label == 'helmet':
-            # 헬멧으로 판단된 횟수가 많을수록 점수를 더 많이 올림
-            self.scores[uid] = min(100, self.scores[uid] + 5 + int(hit_count / 5)) 
-        else: # nohelmet 또는 다른 라벨
-            self.scores[uid] = max(-100, self.scores[uid] - 10)
-
-        score = self.scores[uid]
-        if score >= 80:
-             return 'wearing helmet', score
-        elif -80 < score < 80:
-             return 'detecting helmet', score
-        else:
-             return 'nohelmet', score
+class ResultSink(multiprocessing.Process):
+    """
+    헤드리스 결과 출력 (화면 없이 동작, 표시는 선택)
+    - 프레임 기록: 스트림마다 <out_dir>/<스트림 이름>.jsonl 또는 .bin (FrameWriter), fmt='none'이면 생략
+    - 상태 변화 이벤트: <out_dir>/events.jsonl (트랙 등장/소실, 헬멧 착용 판정 변화, 쓰러짐)
+    - queue_render가 있으면 프레임을 DispEvent로 넘김 (QUEUE_POLICY_CFG['render'], 기본 latest
+      → 표시가 느려도 기록은 밀리지 않음), 없으면 슬롯을 바로 반환
+    """
+    def __init__(self, queue, ring, out_dir, stream_names=None, fmt='jsonl', queue_render=None):
+        multiprocessing.Process.__init__(self)
+        self.queue = queue
+        self.ring = ring
+        self.out_dir = out_dir
+        self.stream_names = stream_names or {}
+        self.fmt = fmt
+        self.queue_render = queue_render
+
+    def run(self):
+        # terminate()로 끝나도 파일을 닫고 나가도록
+        signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+        os.makedirs(self.out_dir, exist_ok=True)
+        self.profile = StartupProfile('sink')
+        self.metrics = new_metrics('sink', startup=self.profile.report)
+        self.render = None
+        # 표시 단계로 보내지 못한 삭제 이벤트 (DispEvent의 UID별 점수 정리용, 다음 메시지에 이어서 전달)
+        self.pending_removed = {}
+        if self.queue_render is not None:
+            self.render = QueuePort(self.queue_render, on_drop=self.on_drop,
+                                    is_control=is_control, **QUEUE_POLICY_CFG['render'])
+        writers = {}
+        self.states = states = {} # 진행 중인 스트림의 이벤트 추출 상태
+        events = EventLog(os.path.join(self.out_dir, 'events.jsonl'))
+        n_frames = 0
+        t0 = time.perf_counter()
+        try:
+            while True:
+                self.metrics.maybe_dump()
+                data = self.queue.get()
+                if data is None:
+                    break
+
+                sid, frame_idx, ref, results_orig, results_up, removed = data
+                if ref is None:
+                    # 스트림 끝: 남은 트랙은 소실 처리, 파일 닫기
+                    state = states.pop(sid, None)
+                    if state is not None:
+                        events.write(state.update(frame_idx, None, list(state.seen)))
+                    writer = writers.pop(sid, None)
+                    if writer is not None:
+                        writer.close()
+                    self.metrics.drop_stream(sid)
+                    self.forward(data)
+                    continue
+                ts = ref.setdefault('ts', {})
+                t_in = stamp(ref, 'sink_in')
+                self.metrics.observe_span(ts, 'helmet_out', 'sink_in', 'wait.helmet', stream=sid)
+
+                name = self.stream_names.get(sid, f'stream_{sid:03d}')
+                if self.fmt != 'none':
+                    writer = writers.get(sid)
+                    if writer is None:
+                        writer = writers[sid] = FrameWriter(os.path.join(self.out_dir, name), self.fmt)
+                    writer.write(frame_idx, results_orig, results_up)
+
+                state = states.get(sid)
+                if state is None:
+                    state = states[sid] = StateEvents(sid, SINK_CFG['falldown_hold'])
+                events.write(state.update(frame_idx, results_up, removed.get('up', ())))
+
+                n_frames += 1
+                t_out = now()
+                self.metrics.observe('write', t_out - t_in, stream=sid)
+                if 'capture' in ts:
+                    self.metrics.observe('e2e', t_out - ts['capture'], stream=sid) # 캡처 → 결과 기록
+                self.metrics.count('frames', stream=sid)
+                first_frame(self.profile) # 실행 → 첫 결과 기록까지
+                self.forward(data)
+        finally:
+            for writer in writers.values():
+                writer.close()
+            events.close()
+            if self.render is not None:
+                self.render.put(None)
+            self.metrics.maybe_dump(force=True)
+            elapsed = time.perf_counter() - t0
+            print(f"[ResultSink] {n_frames} frames, {events.count} events -> {self.out_dir} "
+                  f"({elapsed:.1f}s, {n_frames / max(elapsed, 1e-6):.1f} fps)")
+
+    def forward(self, data):
+        # 표시 단계로 전달 (없으면 슬롯 반환)
+        if self.render is None:
+            if data[2] is not None:
+                self.ring.release(data[2])
+            return
+        sid, frame_idx, ref, results_orig, results_up, removed = data
+        if ref is None:
+            self.pending_removed.pop(sid, None) # 스트림 끝이면 DispEvent가 스트림 상태를 통째로 정리
+            self.render.put(data)
+            return
+        pending = merge_removed(self.pending_removed.pop(sid, {}), removed)
+        self.render.put((sid, frame_idx, ref, results_orig, results_up, pending))
+
+    def on_drop(self, msg):
+        # 표시 단계에서 버린 프레임: 슬롯 반환, 실려 있던 삭제 이벤트는 다음 메시지로 다시 전달
+        sid, _, ref, _, _, removed = msg
+        self.ring.release(ref)
+        if sid in self.states: # 이미 끝난 스트림이면 버림
+            merge_removed(self.pending_removed.setdefault(sid, {}), removed)
 
 
 if __name__ == '__main__':
+    os.environ.setdefault(LAUNCH_ENV, repr(T_LAUNCH)) # 자식 프로세스 기동 시간의 기준
     multiprocessing.set_start_method('spawn', force=True)
-    # 멀티프로세싱 큐 생성
-    q_video = multiprocessing.Queue(maxsize=10) # 큐 사이즈 약간 늘림
+    parser = argparse.ArgumentParser()
+    parser.add_argument('sources', nargs='*', help='영상 파일/카메라 주소 (없으면 ./videos/ 폴더의 영상)')
+    parser.add_argument('--multi-stream', action='store_true',
+                        help='소스마다 별도 스트림으로 동시 처리 (기본: 한 스트림에서 순서대로 재생)')
+    parser.add_argument('--decode-workers', type=int, default=0,
+                        help='N>0이면 디코딩 워커 N개가 파일을 나눠 동시에 디코딩 (파일마다 별도 스트림, 아카이브 재분석용)')
+    parser.add_argument('--offline', action='store_true',
+                        help='오프라인 처리: 실시간 속도 제한/화면 표시 없이 최대 속도로 처리, 프레임 드롭 없음')
+    parser.add_argument('--backend', default=DETECTOR_BACKEND, choices=BACKENDS,
+                        help='검출 백엔드: darknet(GPU) | opencv(cv2.dnn CPU) | synthetic(모델 없이 가짜 검출, 처리량 측정용)')
+    parser.add_argument('--headless', action='store_true', help='화면 표시 없이 결과/이벤트 기록만')
+    parser.add_argument('--out-dir', default=SINK_CFG['out_dir'], help='결과/이벤트 저장 폴더')
+    parser.add_argument('--sink-format', default=SINK_CFG['format'], choices=('jsonl', 'binary', 'none'),
+                        help='프레임별 트랙 기록 형식 (none이면 이벤트만)')
+    args = parser.parse_args()
+    # auto는 프로세스를 띄우기 전에 실제 백엔드로 확정 (쓸 수 있는 백엔드가 없으면 여기서 종료)
+    try:
+        args.backend = resolve_backend(args.backend)
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    # 1. 영상 소스 목록
+    video_files = list(args.sources)
+    if not video_files:
+        video_folder = './videos/'
+        supported_formats = ('.mp4', '.avi', '.mov', '.mkv')
+        video_files = [os.path.join(video_folder, f) for f in os.listdir(video_folder) if f.lower().endswith(supported_formats)]
+        video_files.sort() # 파일 이름 순으로 정렬
+    # 단계 사이 큐 정책 (오프라인은 모두 block → 프레임 드롭 없음)
+    queue_policies = {k: ({'policy': 'block'} if args.offline else v) for k, v in QUEUE_POLICY_CFG.items()}
+
+    # VideoParser별 소스 목록 (멀티 스트림이면 소스 하나가 스트림 하나)
+    jobs = None
+    if args.decode_workers > 0:
+        # 디코딩 풀: 파일 = 스트림, 워커가 끝나는 대로 다음 파일을 가져감
+        jobs = multiprocessing.Queue()
+        for sid, f in enumerate(video_files):
+            jobs.put((sid, f))
+        n_workers = max(1, min(args.decode_workers, len(video_files)))
+        for _ in range(n_workers):
+            jobs.put(None)
+        streams = [None] * n_workers
+    else:
+        streams = [[f] for f in video_files] if args.multi_stream else [video_files]
+
+    # 멀티프로세싱 큐 생성 (입력은 VideoParser별 큐)
+    q_videos = [multiprocessing.Queue(maxsize=10) for _ in streams] # 큐 사이즈 약간 늘림
     q_detect = multiprocessing.Queue(maxsize=10)
+    q_helmet = multiprocessing.Queue(maxsize=10)
+    render = not (args.offline or args.headless)
+    q_render = multiprocessing.Queue(maxsize=2) if render else None # 표시는 최신 프레임 위주
 
-    # 1. 영상 로드 프로세스
-    video_folder = './videos/'
-    supported_formats = ('.mp4', '.avi', '.mov', '.mkv')
-    video_files = [os.path.join(video_folder, f) for f in os.listdir(video_folder) if f.lower().endswith(supported_formats)]
-    video_files.sort() # 파일 이름 순으로 정렬
+    # 프레임 공유메모리 링버퍼 (원본 + 업스케일을 한 슬롯에, 모든 스트림 공용)
+    max_w, max_h = FRAME_RING_MAX_SIZE
+    up_w, up_h = int(round(max_w * UPSCALE_FACTOR)), int(round(max_h * UPSCALE_FACTOR))
+    n_slots = max(FRAME_RING_SLOTS, MULTI_STREAM_CFG['slots_per_stream'] * len(streams))
+    ring = FrameRing(n_slots, FrameRing.slot_bytes_for([(max_h, max_w, 3), (up_h, up_w, 3)]))
 
     if not video_files:
         print(f"No video files found in '{video_folder}'")
     else:
-        video_loader = VideoParser(video_files, q_video)
-        video_loader.start()
+        # 영상 로드 프로세스 (스트림 또는 디코딩 워커마다 하나)
+        video_loaders = [VideoParser(files, q, ring, decode_mode=VIDEO_DECODE_MODE, stream_id=i, jobs=jobs,
+                                     offline=args.offline, queue_policy=queue_policies['video'])
+                         for i, (files, q) in enumerate(zip(streams, q_videos))]
+        for video_loader in video_loaders:
+            video_loader.start()
         
-        # 2. 객체 탐지 프로세스
-        detector = DetectParser(q_video, q_detect, gpu_id=0)
+        # 2. 객체 탐지 프로세스 (모델 한 벌로 모든 스트림 처리)
+        detector = DetectParser(q_videos, q_detect, ring, gpu_id=0, offline=args.offline,
+                                queue_policy=queue_policies['detect'], backend=args.backend)
         detector.start()
 
-        # 3. 결과 표시를 위한 프로세스 생성 및 시작
-        displayer = DispEvent(q_detect)
-        displayer.start()
+        # 3. 헬멧 분류 프로세스 (트랙 ROI 배치 추론)
+        helmet_checker = HelmetParser(q_detect, q_helmet, ring, gpu_id=0, queue_policy=queue_policies['helmet'],
+                                      backend=args.backend)
+        helmet_checker.start()
+
+        # 4. 결과/이벤트 기록 프로세스 (항상) + 결과 표시 프로세스 (선택)
+        if jobs is not None or args.multi_stream:
+            stream_names = {sid: f"{sid:03d}_{os.path.splitext(os.path.basename(f))[0]}"
+                            for sid, f in enumerate(video_files)}
+        else:
+            stream_names = {0: 'stream_000'}
+        sink = ResultSink(q_helmet, ring, args.out_dir, stream_names, fmt=args.sink_format, queue_render=q_render)
+        sink.start()
+        if render:
+            displayer = DispEvent(q_render, ring)
+            displayer.start()
 
         try:
-            # 표시 프로세스가 종료될 때까지 대기
-            displayer.join()
+            # 기록이 끝나거나 표시 창이 닫힐 때까지 대기
+            while sink.is_alive():
+                sink.join(timeout=0.5)
+                if render and not displayer.is_alive():
+                    break
         except KeyboardInterrupt:
             print("\n프로그램을 종료합니다...")
         finally:
@@ -419,11 +1022,23 @@ if __name__ == '__main__':
                 detector.terminate()
                 detector.join(timeout=2)
 
-            if 'video_loader' in locals() and video_loader.is_alive():
-                video_loader.terminate()
-                video_loader.join(timeout=2)
+            if 'helmet_checker' in locals() and helmet_checker.is_alive():
+                helmet_checker.terminate()
+                helmet_checker.join(timeout=2)
+
+            for video_loader in video_loaders:
+                if video_loader.is_alive():
+                    video_loader.terminate()
+                    video_loader.join(timeout=2)
             
-            # DispEvent는 join으로 이미 기다렸거나, 여기서 확실히 종료
+            if 'sink' in locals() and sink.is_alive():
+                sink.terminate()
+                sink.join(timeout=2)
+
+            # DispEvent는 파이프라인 끝에서 None을 받고 끝났거나, 여기서 확실히 종료
             if 'displayer' in locals() and displayer.is_alive():
                 displayer.terminate()
-                displayer.join(timeout=2)
\ No newline at end of file
+                displayer.join(timeout=2)
+
+    ring.close()
+    ring.unlink()
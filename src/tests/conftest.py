@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# main.py와 같이 src를 기준으로 `from lib.x import ...`
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+TINY_CFG = """[net]
+width=32
+height=32
+channels=3
+
+[convolutional]
+filters=18
+size=1
+stride=1
+pad=0
+activation=linear
+
+[yolo]
+mask=0,1,2
+anchors=10,13, 16,30, 33,23
+classes=1
+num=3
+"""
+
+
+@pytest.fixture
+def tiny_model(tmp_path):
+    # 1x1 conv + yolo 한 층짜리 darknet 모델 (weights: 헤더 + bias 18 + weight 18x3) → (cfg, weights, names) 경로
+    cfg, weights, names = tmp_path / 'tiny.cfg', tmp_path / 'tiny.weights', tmp_path / 'tiny.names'
+    cfg.write_text(TINY_CFG)
+    names.write_text('person\n')
+    with open(weights, 'wb') as f:
+        np.array([0, 2, 0], np.int32).tofile(f)
+        np.array([0], np.int64).tofile(f)
+        np.random.default_rng(0).normal(0, 1, 18 + 18 * 3).astype(np.float32).tofile(f)
+    return str(cfg), str(weights), str(names)
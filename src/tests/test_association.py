@@ -0,0 +1,119 @@
+import numpy as np
+import pytest
+
+from lib.association import Associator, attach_secondary, dense_pairs, gated_pairs, greedy_assign, hungarian_assign, plan_crops
+from lib.bytracker import greedy_match_from_iou, iou_matrix_xyxy, iou_xyxy
+
+
+def random_boxes(rng, n, size=640):
+    xy = rng.uniform(0, size, (n, 2))
+    return np.column_stack([xy, xy + rng.uniform(10, 120, (n, 2))]).astype(np.float32)
+
+
+def jitter(rng, boxes):
+    return boxes + rng.normal(0, 8, boxes.shape).astype(np.float32)
+
+
+def test_gated_pairs_match_dense_pairs():
+    rng = np.random.default_rng(1)
+    for _ in range(20):
+        trk = random_boxes(rng, rng.integers(0, 15))
+        det = random_boxes(rng, rng.integers(0, 15))
+        dense = dense_pairs(trk, det)
+        gated = gated_pairs(trk, det)
+        assert dense[3:] == gated[3:]
+        a = sorted(zip(dense[0].tolist(), dense[1].tolist()))
+        b = sorted(zip(gated[0].tolist(), gated[1].tolist()))
+        assert a == b
+        iou = iou_matrix_xyxy(trk, det)
+        if len(gated[0]):
+            np.testing.assert_allclose(gated[2], iou[gated[0], gated[1]], rtol=1e-5)
+
+
+def test_greedy_assign_matches_legacy_matcher():
+    rng = np.random.default_rng(2)
+    for _ in range(50):
+        trk = random_boxes(rng, rng.integers(0, 12))
+        det = np.concatenate([jitter(rng, trk), random_boxes(rng, rng.integers(0, 4))])
+        iou = iou_matrix_xyxy(trk, det)
+        expected = greedy_match_from_iou(iou, 0.3)
+        matches, u_t, u_d = greedy_assign(dense_pairs(trk, det), 0.3)
+        assert sorted(matches) == sorted(expected[0])
+        assert u_t == expected[1] and u_d == expected[2]
+
+
+def test_hungarian_maximizes_total_iou():
+    # 그리디는 (0,0)을 먼저 잡아 합이 작아지는 경우
+    iou = np.array([[0.9, 0.8], [0.85, 0.0]], np.float32)
+    ti, di = np.nonzero(iou > 0)
+    pairs = (ti, di, iou[ti, di], 2, 2)
+    assert greedy_assign(pairs, 0.5)[0] == [(0, 0)]
+    matches, u_t, u_d = hungarian_assign(pairs, 0.5)
+    assert sorted(matches) == [(0, 1), (1, 0)] and u_t == [] and u_d == []
+
+
+def test_associator_rows_subset():
+    trk = np.array([[0, 0, 10, 10], [100, 100, 110, 110], [200, 200, 210, 210]], np.float32)
+    det = np.array([[201, 201, 211, 211], [1, 1, 11, 11]], np.float32)
+    assoc = Associator('greedy', gate=True)
+    pairs = assoc.cost(trk, det)
+    # 트랙 1, 2만 매칭 → 결과 인덱스는 부분 목록 기준
+    matches, u_t, u_d = assoc.assign(pairs, 0.5, rows=[1, 2])
+    assert matches == [(1, 0)] and u_t == [0] and u_d == [1]
+    with pytest.raises(ValueError):
+        Associator('auction')
+
+
+def legacy_best_match(trk_boxes, det_boxes, thresh):
+    # 기존 match_falldown_to_tracks: 트랙마다 IoU가 가장 큰 검출 (IoU > thresh)
+    out = []
+    for t in trk_boxes:
+        best_iou, best = 0, -1
+        for j, d in enumerate(det_boxes):
+            iou = iou_xyxy(t, d)
+            if iou > best_iou:
+                best_iou, best = iou, j
+        out.append(best if best_iou > thresh else -1)
+    return out
+
+
+def test_attach_secondary_best_matches_legacy_loop():
+    rng = np.random.default_rng(3)
+    for _ in range(30):
+        trk = random_boxes(rng, rng.integers(0, 10))
+        fall = jitter(rng, trk[: len(trk) // 2])
+        ppe = random_boxes(rng, rng.integers(0, 5))
+        out = attach_secondary(trk, {'falldown': fall, 'ppe': ppe}, 0.3)
+        assert out['falldown'].tolist() == legacy_best_match(trk, fall, 0.3)
+        assert out['ppe'].tolist() == legacy_best_match(trk, ppe, 0.3)
+
+
+def test_attach_secondary_one_to_one_and_degenerate_boxes():
+    trk = np.array([[0, 0, 10, 10], [1, 1, 11, 11]], np.float32)
+    det = np.array([[0, 0, 10, 10], [np.nan, 0, 5, 5], [5, 5, 5, 5]], np.float32)
+    best = attach_secondary(trk, {'d': det}, 0.3)['d']
+    assert best.tolist() == [0, 0] # 같은 검출을 공유
+    greedy = attach_secondary(trk, {'d': det}, 0.3, method='greedy')['d']
+    assert greedy.tolist() == [0, -1]
+    assert attach_secondary(np.zeros((0, 4)), {'d': det})['d'].shape == (0,)
+    with pytest.raises(ValueError):
+        attach_secondary(trk, {'d': det}, method='auction')
+
+
+def test_plan_crops_pad_clip_and_merge():
+    shape = (720, 1280, 3)
+    # 여백 25% + 프레임 안으로 자름
+    assert plan_crops([[100, 100, 200, 300]], shape) == [[75, 50, 225, 350]]
+    assert plan_crops([[0, 600, 40, 720]], shape, min_size=64) == [[0, 570, 52, 720]]
+    # 겹치는 crop은 하나로
+    crops = plan_crops([[100, 100, 200, 300], [210, 100, 300, 300], [900, 100, 1000, 300]], shape)
+    assert crops == [[75, 50, 322, 350], [875, 50, 1025, 350]]
+    assert plan_crops([], shape) == []
+
+
+def test_plan_crops_full_frame_when_large():
+    shape = (720, 1280, 3)
+    assert plan_crops([[100, 100, 1200, 700]], shape) == [[0, 0, 1280, 720]]
+    # crop 넓이 725x600 = 프레임의 47%
+    assert plan_crops([[100, 100, 600, 500]], shape, full_frame_ratio=0.45) == [[0, 0, 1280, 720]]
+    assert plan_crops([[100, 100, 600, 500]], shape, full_frame_ratio=0.5) == [[0, 0, 725, 600]]
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+from lib.bytracker import ByteTrackLite, KalmanBatch, KalmanBox, check_labels, xyxy_to_z, xyxy_to_z_batch
+
+
+def test_kalman_batch_matches_kalman_box():
+    rng = np.random.default_rng(0)
+    n = 5
+    start = rng.uniform(0, 500, (n, 2))
+    boxes = np.column_stack([start, start + rng.uniform(20, 120, (n, 2))])
+    singles = []
+    batch = KalmanBatch(capacity=2) # 용량 증가 경로도 함께
+    for b in boxes:
+        kf = KalmanBox()
+        kf.initiate(xyxy_to_z(b))
+        singles.append(kf)
+        batch.add(xyxy_to_z(b))
+
+    for step in range(20):
+        pred = batch.predict()
+        assert pred.tolist() == [kf.predict() for kf in singles]
+        # 일부 트랙만 관측으로 보정
+        idx = [i for i in range(n) if (i + step) % 3]
+        boxes[idx] += rng.normal(3, 2, (len(idx), 4))
+        batch.update(idx, xyxy_to_z_batch(boxes[idx]))
+        for i in idx:
+            singles[i].update(xyxy_to_z(boxes[i]))
+        np.testing.assert_allclose(batch.x[:n], np.hstack([kf.x for kf in singles]).T, rtol=1e-4, atol=1e-3)
+        np.testing.assert_allclose(batch.P[:n], np.stack([kf.P for kf in singles]), rtol=1e-4, atol=1e-3)
+
+
+def test_kalman_batch_compact():
+    batch = KalmanBatch()
+    for k in range(4):
+        batch.add(xyxy_to_z([k * 100, 0, k * 100 + 50, 80]))
+    x = batch.x[:4].copy()
+    batch.compact([1, 3])
+    assert len(batch) == 2
+    np.testing.assert_array_equal(batch.x[:2], x[[1, 3]])
+    assert batch.update([], np.zeros((0, 4))).shape == (0, 4)
+
+
+def test_skipped_frames_do_not_age_tracks():
+    # max_age는 검출 프레임 기준: stride 3이면 predict() 두 번은 미검출로 세지 않음
+    tracker = ByteTrackLite(max_age=5, min_hits=1)
+    tracker.update([['person', 0.9, [100, 100, 50, 80]]])
+    for _ in range(5):
+        tracker.update([])
+        tracker.predict()
+        tracker.predict()
+    assert len(tracker.tracks) == 1 and tracker.tracks[0].time_since_update == 5
+    _, removed = tracker.update([])
+    assert removed == [0]
+
+
+def test_check_labels():
+    check_labels(['person', 'x' * 16])
+    for names in (['x' * 17], ['사람']):
+        with pytest.raises(ValueError):
+            check_labels(names, 'model')
@@ -0,0 +1,96 @@
+import cv2
+import numpy as np
+import pytest
+
+from lib import detector
+from lib.detector import DET_DTYPE, OpenCvYolo, SyntheticYolo, create_detector, decode_arrays, get_model, resolve_backend
+
+
+def test_decode_arrays():
+    bbox = np.array([[208, 208, 104, 52], [104, 104, 52, 52]], np.float32)
+    prob = np.array([[0.6, 0.0], [0.0, 0.9]], np.float32)
+    res = decode_arrays(bbox, prob, (720, 1280), (416, 416), ['person', 'head'])
+    assert [(r[0], round(r[1], 3)) for r in res] == [('head', 0.9), ('person', 0.6)]
+    np.testing.assert_allclose(res[1][2], (640, 360, 320, 90))
+
+    arr = decode_arrays(bbox, prob, (720, 1280), (416, 416), ['person', 'head'], as_array=True)
+    assert arr.dtype == DET_DTYPE and arr['class_id'].tolist() == [1, 0]
+    assert decode_arrays(np.zeros((0, 4), np.float32), np.zeros((0, 2), np.float32),
+                         (720, 1280), (416, 416), ['a', 'b'], as_array=True).shape == (0,)
+
+
+def test_synthetic_is_deterministic():
+    frames = [np.zeros((720, 1280, 3), np.uint8)] * 4
+    a = SyntheticYolo('none.cfg', 'none.weights', 'none.names', objects=3, seed=1)
+    b = SyntheticYolo('none.cfg', 'none.weights', 'none.names', objects=3, seed=1, batch_size=2)
+    ra, rb = a.detect_batch(frames, 0.5), b.detect_batch(frames, 0.5)
+    assert ra == rb
+    for dets in ra:
+        assert all(label == 'person' and score > 0.5 for label, score, _ in dets)
+        for _, _, (cx, cy, w, h) in dets:
+            assert 0 <= cx - w / 2 and cx + w / 2 <= 1280 and 0 <= cy - h / 2 and cy + h / 2 <= 720
+    assert a.detect(frames[0], is_dummy=True, as_array=True).shape == (0,)
+
+
+def test_synthetic_follows_frame_key():
+    det = SyntheticYolo('none.cfg', 'none.weights', 'none.names', objects=3, seed=1, batch_size=3)
+    orig, up = np.zeros((360, 640, 3), np.uint8), np.zeros((720, 1280, 3), np.uint8)
+    # 같은 프레임 번호면 배치 구성/순서/이미지 크기와 무관하게 같은 위치 (이미지 비율 좌표)
+    batch = det.detect_batch([orig, up, orig, up], 0.5, keys=[10, 10, 16, 16], as_array=True)
+    single = det.detect(up, 0.5, key=10, as_array=True)
+    assert np.array_equal(batch[1], single)
+    np.testing.assert_allclose(batch[0]['bbox'] * 2, batch[1]['bbox'], atol=2)
+    assert np.array_equal(det.detect_batch([orig], 0.5, keys=[16], as_array=True)[0], batch[2])
+
+    # 검출 간격 6프레임에서도 박스가 거의 그대로 (트래커 match_thresh 이상)
+    for a, b in zip(batch[1]['bbox'], batch[3]['bbox']):
+        a1, b1 = a[:2] - a[2:] / 2, b[:2] - b[2:] / 2
+        inter = np.prod(np.clip(np.minimum(a1 + a[2:], b1 + b[2:]) - np.maximum(a1, b1), 0, None))
+        assert inter / (np.prod(a[2:]) + np.prod(b[2:]) - inter) > 0.8
+
+
+def test_create_detector(tiny_model):
+    with pytest.raises(ValueError):
+        create_detector(*tiny_model, backend='tensorrt')
+    det = create_detector(*tiny_model, backend='synthetic', objects=2)
+    assert isinstance(det, SyntheticYolo) and det.objects == 2 and det.net_width == 32
+
+
+def test_get_model_checks_labels(tiny_model, monkeypatch):
+    # 트랙 배열 라벨 필드(S16)에 들어가지 않는 이름은 로드할 때 중단
+    cfg, weights, names = tiny_model
+    monkeypatch.setattr(detector, '_models', {})
+    monkeypatch.setitem(detector.model_cfgs, 'tiny', {'cfg': cfg, 'weights': weights, 'names': names})
+    assert get_model('tiny', backend='synthetic').meta_names == ['person']
+
+    with open(names, 'w') as f:
+        f.write('person_with_a_long_name\n')
+    monkeypatch.setattr(detector, '_models', {})
+    with pytest.raises(ValueError, match='person_with_a_long_name'):
+        get_model('tiny', backend='synthetic')
+
+
+@pytest.mark.skipif(not hasattr(cv2.dnn, 'readNetFromDarknet'), reason="opencv 5.x: darknet 로더 없음")
+def test_opencv_backend(tiny_model):
+    det = OpenCvYolo(*tiny_model, batch_size=2)
+    frames = [np.random.default_rng(i).integers(0, 255, (48, 64, 3), dtype=np.uint8) for i in range(3)]
+    batch = det.detect_batch(frames, thresh=0.0, nms=0.45, as_array=True)
+    single = [det.detect(f, thresh=0.0, nms=0.45, as_array=True) for f in frames]
+    assert len(batch) == 3
+    for a, b in zip(batch, single):
+        assert a.dtype == DET_DTYPE
+        np.testing.assert_allclose(a['score'], b['score'], rtol=1e-4)
+        np.testing.assert_allclose(a['bbox'], b['bbox'], rtol=1e-3, atol=1e-2)
+
+
+def test_resolve_backend(monkeypatch):
+    from lib import yolov4
+    assert resolve_backend('synthetic') == 'synthetic'
+    monkeypatch.setattr(yolov4, 'library_path', lambda: __file__) # libdarknet.so 있음
+    assert resolve_backend('auto') == 'darknet'
+    monkeypatch.setattr(yolov4, 'library_path', lambda: '/nonexistent/libdarknet.so')
+    if hasattr(cv2.dnn, 'readNetFromDarknet'):
+        assert resolve_backend('auto') == 'opencv'
+    monkeypatch.delattr(cv2.dnn, 'readNetFromDarknet', raising=False)
+    with pytest.raises(RuntimeError, match='synthetic'):
+        resolve_backend('auto')
@@ -0,0 +1,74 @@
+import numpy as np
+
+from lib.events import StateEvents
+from lib.sink import FrameWriter, load_records, records_array
+
+
+def track(uid=1, helmet=None, falldown=None, confirmed=True, matched=True):
+    t = {'id': uid, 'label': 'person', 'score': 0.9, 'bbox': [10, 20, 110, 220],
+         'confirmed': confirmed, 'matched': matched}
+    if helmet is not None:
+        t['helmet_results'] = [(helmet, 0.9, None)]
+    if falldown is not None:
+        t['falldown_status'] = {'label': falldown, 'score': 0.8}
+    return t
+
+
+def kinds(events):
+    return [(e['event'], e['track']) for e in events]
+
+
+def test_appear_and_lost():
+    se = StateEvents(sid=0)
+    assert se.update(0, [track(confirmed=False)], []) == []
+    ev = se.update(1, [track()], [])
+    assert kinds(ev) == [('appear', 1)] and ev[0]['bbox'] == [10, 20, 110, 220]
+    assert se.update(2, [track()], []) == []
+    assert kinds(se.update(3, [], [1])) == [('lost', 1)]
+    assert se.update(4, [], [1]) == [] # 이미 정리됨
+    assert len(se.helmet_score) == 0
+
+
+def test_helmet_change_only_once():
+    se = StateEvents(sid=0)
+    events = []
+    for i in range(20):
+        events += se.update(i, [track(helmet='nohelmet')], [])
+    helmet = [e for e in events if e['event'] == 'helmet']
+    assert len(helmet) == 1
+    assert helmet[0]['prev'] is None and helmet[0]['state'] == 'nohelmet'
+
+
+def test_falldown_debounce():
+    se = StateEvents(sid=0, falldown_hold=3)
+    labels = ['standing', 'falldown', 'standing', 'falldown', 'falldown', 'falldown', 'falldown']
+    events = []
+    for i, label in enumerate(labels):
+        events += [e for e in se.update(i, [track(falldown=label)], []) if e['event'] == 'falldown']
+    assert [(e['frame'], e['prev'], e['state']) for e in events] == [(5, 'standing', 'falldown')]
+
+
+def test_frame_writer_binary_roundtrip(tmp_path):
+    base = str(tmp_path / 'stream')
+    w = FrameWriter(base, fmt='binary')
+    w.write(0, [track(helmet='helmet', falldown='falldown')], [])
+    w.write(1, [], [track(uid=2), track(uid=3)])
+    w.close()
+    rec = load_records(base)
+    assert rec['frame'].tolist() == [0, 1, 1] and rec['view'].tolist() == [0, 1, 1]
+    assert rec['id'].tolist() == [1, 2, 3]
+    assert rec[0]['helmet'] == b'helmet' and rec[0]['falldown'] == b'falldown'
+    np.testing.assert_array_equal(rec['bbox'], [[10, 20, 110, 220]] * 3)
+    assert records_array(5, 0, None).shape == (0,)
+
+
+def test_frame_writer_jsonl(tmp_path):
+    import json
+    base = str(tmp_path / 'stream')
+    w = FrameWriter(base)
+    w.write(7, [track()], [])
+    w.close()
+    with open(base + '.jsonl') as f:
+        row = json.loads(f.readline())
+    assert row['frame'] == 7 and row['up'] == []
+    assert row['orig'][0]['id'] == 1 and row['orig'][0]['helmet'] is None
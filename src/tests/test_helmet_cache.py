@@ -0,0 +1,69 @@
+from lib.helmet_cache import HelmetCache
+
+
+def track(bbox=(0, 0, 100, 200)):
+    return {'bbox': list(bbox)}
+
+
+def verdict(label='helmet', score=0.9):
+    return [(label, score, (0, 0, 1, 1))]
+
+
+def run_frames(cache, key, n, t, results):
+    # n 프레임 동안 캐시 정책대로 처리하고 재분류 횟수 반환
+    checks = 0
+    for _ in range(n):
+        cache.tick()
+        if cache.needs_check(key, t):
+            cache.update(key, t, results)
+            checks += 1
+        else:
+            assert cache.get(key) == results
+    return checks
+
+
+def test_new_track_needs_check():
+    cache = HelmetCache()
+    assert cache.needs_check(1, track())
+    cache.update(1, track(), verdict())
+    assert not cache.needs_check(1, track())
+
+
+def test_recheck_interval_then_stable_interval():
+    cache = HelmetCache(recheck_interval=5, stable_interval=20, stable_hits=3, max_idle=1000)
+    # 처음 3번은 5프레임마다, 같은 판정이 3번 이어진 뒤에는 20프레임마다
+    assert run_frames(cache, 1, 11, track(), verdict()) == 3
+    assert cache.entries[1]['streak'] == 3
+    assert run_frames(cache, 1, 40, track(), verdict()) == 2
+    assert cache.stats()['hits'] == 51 - 5
+
+
+def test_early_invalidation():
+    cache = HelmetCache(recheck_interval=100, conf_thresh=0.6, iou_thresh=0.5)
+    cache.tick()
+    cache.update(1, track(), verdict(score=0.4))
+    cache.tick()
+    assert cache.needs_check(1, track()) # 낮은 신뢰도
+
+    cache.update(1, track(), verdict())
+    cache.tick()
+    assert not cache.needs_check(1, track())
+    assert cache.needs_check(1, track((150, 0, 250, 200))) # 박스가 크게 이동
+
+    cache.get(1)
+    cache.tick()
+    cache.tick()
+    assert cache.needs_check(1, track()) # 한 프레임 이상 안 보였다가 다시 매칭
+
+
+def test_idle_eviction():
+    cache = HelmetCache(max_idle=10)
+    cache.tick()
+    cache.update(1, track(), verdict())
+    cache.update(2, track(), verdict())
+    for _ in range(25):
+        cache.tick()
+        cache.get(2)
+    assert 1 not in cache.entries and 2 in cache.entries
+    cache.evict([2])
+    assert cache.stats()['entries'] == 0
@@ -0,0 +1,76 @@
+import json
+import os
+
+import numpy as np
+
+from lib.metrics import LatencyHistogram, StageMetrics, stamp
+
+
+def test_histogram_percentiles():
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(np.log(0.02), 0.5, 5000)
+    h = LatencyHistogram()
+    for v in values:
+        h.add(v)
+    for p in (50, 95, 99):
+        assert abs(h.percentile(p) / np.percentile(values, p) - 1) < 0.05
+    s = h.summary()
+    assert s['count'] == 5000
+    assert s['max_ms'] == round(values.max() * 1000, 3)
+    assert abs(s['mean_ms'] - values.mean() * 1000) < 1e-3
+    assert LatencyHistogram().summary()['p99_ms'] == 0.0
+
+
+def test_histogram_range_is_fixed():
+    h = LatencyHistogram()
+    n = len(h.counts)
+    for v in (0.0, 1e-9, 1e3, -1.0):
+        h.add(v)
+    assert len(h.counts) == n and h.count == 4
+    assert h.percentile(100) <= h.max
+
+
+def test_stage_metrics_dump(tmp_path):
+    m = StageMetrics('detect', out_dir=str(tmp_path), extra={'queue': lambda: {'drops': 1}})
+    ref = {}
+    stamp(ref, 'a', 1.0)
+    stamp(ref, 'b', 1.25)
+    m.observe_span(ref['ts'], 'a', 'b', 'wait', stream=0)
+    m.observe_span(ref['ts'], 'a', 'missing', 'never')
+    m.count('frames', 3, stream=0)
+    assert m.maybe_dump() is None # interval 전
+    snap = m.maybe_dump(force=True)
+    with open(os.path.join(tmp_path, 'detect.json')) as f:
+        assert json.load(f) == json.loads(json.dumps(snap))
+    assert set(snap['stages']) == {'wait', 'wait@0'}
+    assert snap['stages']['wait']['p50_ms'] == snap['stages']['wait@0']['p50_ms']
+    assert snap['counters'] == {'frames': 3, 'frames@0': 3}
+    assert snap['queue'] == {'drops': 1}
+
+
+def test_histogram_lowest_bucket_clamped_to_max():
+    h = LatencyHistogram()
+    h.add(5e-6) # lo(10us)보다 작은 값
+    assert h.percentile(50) == h.max == 5e-6
+
+
+def test_finished_stream_stays_in_dump(tmp_path):
+    m = StageMetrics('detect', out_dir=str(tmp_path), finished_limit=2)
+    for sid in (0, 1):
+        m.observe('track', 0.01 * (sid + 1), stream=sid)
+        m.count('frames', 5, stream=sid)
+    m.drop_stream(0)
+    assert 'track@0' not in m.hists # 히스토그램은 해제
+
+    m.maybe_dump(force=True)
+    with open(os.path.join(tmp_path, 'detect.json')) as f:
+        snap = json.load(f)
+    assert {'track@0', 'track@1'} <= set(snap['stages'])
+    assert snap['stages']['track@0']['count'] == 1 and snap['stages']['track@0']['max_ms'] == 10.0
+    assert snap['counters']['frames@0'] == 5 and 'frames@0' not in snap['fps']
+    assert snap['finished_streams'] == [0]
+
+    for sid in (1, 2):
+        m.drop_stream(sid)
+    snap = m.snapshot()
+    assert snap['finished_streams'] == [1, 2] and 'track@0' not in snap['stages'] # 최근 finished_limit개만
@@ -0,0 +1,91 @@
+import queue as pyqueue
+
+import pytest
+
+from lib.queue_policy import QueuePort
+
+
+def drain(q):
+    out = []
+    while True:
+        try:
+            out.append(q.get_nowait())
+        except pyqueue.Empty:
+            return out
+
+
+def make_port(policy, maxsize=2):
+    q = pyqueue.Queue(maxsize=maxsize)
+    dropped = []
+    port = QueuePort(q, policy=policy, on_drop=dropped.append)
+    return q, port, dropped
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        QueuePort(pyqueue.Queue(), policy='fifo')
+
+
+def test_block_never_drops():
+    q, port, dropped = make_port('block', maxsize=5)
+    for i in range(5):
+        assert port.put(i)
+    assert drain(q) == [0, 1, 2, 3, 4]
+    assert dropped == []
+    assert port.stats()['dropped'] == 0 and port.puts == 5
+
+
+def test_drop_newest():
+    q, port, dropped = make_port('drop_newest')
+    results = [port.put(i) for i in range(5)]
+    assert results == [True, True, False, False, False]
+    assert drain(q) == [0, 1]
+    assert dropped == [2, 3, 4]
+    assert port.drops['newest'] == 3 and port.stats()['dropped'] == 3
+
+
+def test_drop_oldest():
+    q, port, dropped = make_port('drop_oldest')
+    assert all(port.put(i) for i in range(5))
+    assert drain(q) == [3, 4]
+    assert dropped == [0, 1, 2]
+    assert port.drops['oldest'] == 3 and port.drops['newest'] == 0
+
+
+def test_latest():
+    q, port, dropped = make_port('latest', maxsize=4)
+    port.put(0)
+    port.put(1)
+    assert port.put(2)
+    assert drain(q) == [2]
+    assert dropped == [0, 1]
+    assert port.drops['latest'] == 2
+
+
+@pytest.mark.parametrize('policy', ['drop_oldest', 'latest'])
+def test_control_messages_survive(policy):
+    q, port, dropped = make_port(policy, maxsize=3)
+    port.put(0)
+    port.put(None) # 제어 메시지 (입력 끝)
+    for i in range(1, 6):
+        assert port.put(i)
+    out = drain(q)
+    assert None in out
+    assert None not in dropped
+    assert out[-1] == 5
+    # 데이터 메시지는 전달되거나 on_drop으로 한 번씩만
+    assert sorted(dropped + [m for m in out if m is not None]) == list(range(6))
+    assert port.stats()['dropped'] == len(dropped)
+
+
+def test_custom_control_message():
+    # 스트림 끝 (ref=None) 같은 제어 메시지는 is_control로 지정
+    q = pyqueue.Queue(maxsize=2)
+    dropped = []
+    port = QueuePort(q, policy='latest', on_drop=dropped.append,
+                     is_control=lambda msg: msg is None or msg[1] is None)
+    port.put((0, 'frame0'))
+    port.put((0, None))
+    port.put((0, 'frame1'))
+    assert drain(q) == [(0, None), (0, 'frame1')]
+    assert dropped == [(0, 'frame0')]
@@ -0,0 +1,34 @@
+from lib.scheduler import AdaptiveStride
+
+
+def test_fixed_stride_pattern():
+    s = AdaptiveStride(init_stride=3)
+    pattern = [s.should_detect() for _ in range(9)]
+    assert pattern == [False, False, True] * 3
+    assert s.metrics()['detected'] == 3 and s.metrics()['skipped'] == 6
+
+
+def test_slow_inference_raises_stride():
+    s = AdaptiveStride(fps=30, init_stride=1, max_stride=6)
+    # 100ms 추론 = 3프레임 → stride가 한 단계씩 3까지
+    changes = [s.report(0.1) for _ in range(5)]
+    assert changes[:2] == [(1, 2), (2, 3)]
+    assert s.stride == 3 and changes[2:] == [None] * 3
+
+
+def test_queue_backlog_raises_then_recovers():
+    s = AdaptiveStride(fps=30, init_stride=2, max_stride=4, queue_high=6, queue_low=1)
+    for _ in range(5):
+        s.report(0.01, queue_depth=8)
+    assert s.stride == 4 # max_stride에서 멈춤
+    for _ in range(5):
+        s.report(0.01, queue_depth=0)
+    assert s.stride == 1
+    assert s.metrics()['decisions']['up'] == 2 and s.metrics()['decisions']['down'] == 3
+
+
+def test_latency_ema():
+    s = AdaptiveStride(ema=0.5)
+    s.report(0.1)
+    s.report(0.2)
+    assert abs(s.latency - 0.15) < 1e-9
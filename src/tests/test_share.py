@@ -0,0 +1,86 @@
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from lib.share import FrameRing
+
+
+@pytest.fixture
+def ring():
+    r = FrameRing(2, FrameRing.slot_bytes_for([(4, 4, 3), (8, 8, 3)]))
+    yield r
+    r.close()
+    r.unlink()
+
+
+def frames(v):
+    return np.full((4, 4, 3), v, np.uint8), np.full((8, 8, 3), v, np.uint8)
+
+
+def test_pack_unpack(ring):
+    ref = ring.pack(frames(7))
+    orig, up = ring.unpack(ref)
+    assert orig.shape == (4, 4, 3) and up.shape == (8, 8, 3)
+    assert (orig == 7).all() and (up == 7).all()
+
+
+def test_back_pressure(ring):
+    refs = [ring.pack(frames(i), timeout=1) for i in range(2)]
+    assert all(r is not None for r in refs)
+    assert ring.pack(frames(9), timeout=0.05) is None
+    ring.release(refs[0])
+    ref = ring.pack(frames(9), timeout=1)
+    assert ref is not None and ref['slot'] == refs[0]['slot']
+
+
+def test_stale_ref_after_reuse(ring):
+    a = ring.pack(frames(1), timeout=1)
+    b = ring.pack(frames(2), timeout=1)
+    ring.release(a)
+    c = ring.pack(frames(3), timeout=1)
+    assert c['slot'] == a['slot'] and c['seq'] > b['seq'] > a['seq']
+    assert ring.unpack(a) is None
+    assert (ring.unpack(c)[0] == 3).all()
+    assert (ring.unpack(b)[0] == 2).all()
+
+
+def test_release_inline_and_none(ring):
+    big = (np.ones((64, 64, 3), np.uint8),)
+    ref = ring.pack(big)
+    assert ref['slot'] is None
+    assert (ring.unpack(ref)[0] == 1).all()
+    ring.release(ref)
+    ring.release(None)
+    # 슬롯은 하나도 쓰지 않았음
+    assert ring.pack(frames(1), timeout=1) is not None
+    assert ring.pack(frames(2), timeout=1) is not None
+
+
+def test_inline_frames_are_copied(ring):
+    # 디코딩 버퍼를 재사용해도 이미 보낸 inline 프레임은 그대로
+    src = np.ones((64, 64, 3), np.uint8)
+    ref = ring.pack((src,))
+    src[:] = 0
+    assert (ring.unpack(ref)[0] == 1).all()
+
+
+def produce(ring, n, out):
+    seqs = []
+    for _ in range(n):
+        ref = ring.pack(frames(0), timeout=5)
+        seqs.append(ref['seq'])
+        ring.release(ref)
+    out.put(seqs)
+
+
+def test_seq_unique_across_producers(ring):
+    # VideoParser 여러 개가 같은 링을 쓸 때도 시퀀스 번호가 겹치지 않아야 오래된 ref를 검출할 수 있음
+    out = multiprocessing.Queue()
+    procs = [multiprocessing.Process(target=produce, args=(ring, 10, out)) for _ in range(3)]
+    for p in procs:
+        p.start()
+    seqs = [s for _ in procs for s in out.get(timeout=30)]
+    for p in procs:
+        p.join()
+    assert sorted(seqs) == list(range(30))
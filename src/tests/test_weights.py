@@ -0,0 +1,40 @@
+import cv2
+import numpy as np
+import pytest
+
+from lib import detector
+from lib.weights import check_weights, map_weights, read_header
+
+
+def test_check_weights(tiny_model, tmp_path):
+    _, weights, _ = tiny_model
+    assert read_header(weights) == (0, 2, 0, 0, 20)
+    assert check_weights(weights)[-1] == 20
+    cut = tmp_path / 'cut.weights'
+    cut.write_bytes(open(weights, 'rb').read()[:-2])
+    with pytest.raises(ValueError):
+        check_weights(str(cut))
+    with pytest.raises(ValueError):
+        map_weights(str(cut))
+
+
+def test_map_weights_is_read_only_view(tiny_model):
+    _, weights, _ = tiny_model
+    arr = map_weights(weights)
+    assert arr.tobytes() == open(weights, 'rb').read()
+    assert not arr.flags.writeable
+    with pytest.raises(ValueError):
+        arr[0] = 1
+
+
+@pytest.mark.skipif(not hasattr(cv2.dnn, 'readNetFromDarknet'), reason="opencv 5.x: darknet 로더 없음")
+@pytest.mark.parametrize('use_mmap', [True, False])
+def test_opencv_loads_from_mapping(tiny_model, monkeypatch, use_mmap):
+    cfg, weights, _ = tiny_model
+    monkeypatch.setattr(detector, 'WEIGHTS_MMAP', use_mmap)
+    model = detector.OpenCvYolo(*tiny_model)
+    ref = cv2.dnn.readNetFromDarknet(cfg, weights)
+    blob = cv2.dnn.blobFromImage(np.full((32, 32, 3), 128, np.uint8), 1 / 255.0, (32, 32))
+    model.net.setInput(blob)
+    ref.setInput(blob)
+    np.testing.assert_array_equal(model.net.forward(), ref.forward())
@@ -0,0 +1,108 @@
+from ctypes import POINTER, addressof, c_float, cast
+from types import SimpleNamespace
+
+import numpy as np
+
+from lib import yolov4 # libdarknet.so는 Yolo 생성 시에만 로드
+
+
+def make_dets(boxes, probs):
+    """파이썬에서 만든 DETECTION 배열 (prob 버퍼는 반환값이 살아 있는 동안 유효)"""
+    n, classes = len(probs), len(probs[0])
+    dets = (yolov4.DETECTION * n)()
+    bufs = []
+    for d, box, p in zip(dets, boxes, probs):
+        buf = (c_float * classes)(*p)
+        bufs.append(buf)
+        d.bbox = yolov4.BOX(*box)
+        d.classes = classes
+        d.prob = cast(buf, POINTER(c_float))
+    return cast(dets, POINTER(yolov4.DETECTION)), (dets, bufs)
+
+
+def test_detections_as_arrays():
+    boxes = [(10, 20, 4, 6), (30, 40, 8, 2)]
+    probs = [[0.0, 0.9, 0.0], [0.7, 0.0, 0.6]]
+    dets, keep = make_dets(boxes, probs)
+    bbox, prob = yolov4.detections_as_arrays(dets, 2, 3)
+    np.testing.assert_array_equal(bbox, np.float32(boxes))
+    np.testing.assert_array_equal(prob, np.float32(probs))
+
+    bbox, prob = yolov4.detections_as_arrays(dets, 0, 3)
+    assert bbox.shape == (0, 4) and prob.shape == (0, 3)
+
+
+def test_detections_as_arrays_strided():
+    # prob 행이 한 버퍼에 같은 간격으로 있으면 한 번에, 아니면 행 단위로 읽음 (결과는 같음)
+    boxes = [(1, 2, 3, 4)] * 3
+    probs = np.float32([[0.1, 0.2, 0.3, 0.0], [0.4, 0.5, 0.6, 0.0], [0.7, 0.8, 0.9, 0.0]])
+    block = (c_float * probs.size)(*probs.ravel())
+    dets = (yolov4.DETECTION * 3)()
+    for j, d in enumerate(dets):
+        d.bbox = yolov4.BOX(*boxes[j])
+        d.classes = 3
+        d.prob = cast(addressof(block) + j * 16, POINTER(c_float))
+    bbox, prob = yolov4.detections_as_arrays(cast(dets, POINTER(yolov4.DETECTION)), 3, 3)
+    np.testing.assert_array_equal(prob, probs[:, :3])
+
+    for j, row in enumerate((0, 2, 1)):
+        dets[j].prob = cast(addressof(block) + row * 16, POINTER(c_float))
+    bbox, prob = yolov4.detections_as_arrays(cast(dets, POINTER(yolov4.DETECTION)), 3, 3)
+    np.testing.assert_array_equal(prob, probs[[0, 2, 1], :3])
+
+
+def test_decode_matches_loop():
+    # 기존 클래스별 루프와 같은 결과 (점수 내림차순, 원본 좌표)
+    boxes = [(100, 50, 20, 10), (200, 150, 40, 30)]
+    probs = [[0.5, 0.0], [0.8, 0.3]]
+    dets, keep = make_dets(boxes, probs)
+    fake = SimpleNamespace(meta_classes=2, meta_names=['person', 'head'])
+    bf, af = (720, 1280), (416, 416)
+    res = yolov4.Yolo.decode(fake, dets, 2, bf, af)
+
+    expected = []
+    for (x, y, w, h), p in zip(boxes, probs):
+        for i, s in enumerate(p):
+            if s > 0:
+                expected.append((fake.meta_names[i], s,
+                                 (bf[1] * x / af[1], bf[0] * y / af[0], bf[1] * w / af[1], bf[0] * h / af[0])))
+    expected.sort(key=lambda r: -r[1])
+    assert [r[0] for r in res] == [r[0] for r in expected]
+    np.testing.assert_allclose([r[1] for r in res], [r[1] for r in expected], rtol=1e-6)
+    np.testing.assert_allclose([r[2] for r in res], [r[2] for r in expected], rtol=1e-5)
+
+    arr = yolov4.Yolo.decode(fake, dets, 2, bf, af, as_array=True)
+    assert arr.dtype == yolov4.DET_DTYPE
+    assert arr['class_id'].tolist() == [0, 0, 1]
+    np.testing.assert_allclose(arr['bbox'], [r[2] for r in expected], rtol=1e-5)
+
+
+def test_letterbox_maps_back():
+    # detect_batch letterbox: 비율 유지 + 가운데 배치 → 박스를 원본 좌표로 복원
+    assert yolov4.letterbox_params((720, 1280), (416, 416)) == (416, 234, 0, 91)
+    assert yolov4.letterbox_params((600, 300), (416, 416)) == (208, 416, 104, 0)
+
+    fake = SimpleNamespace(net_width=416, net_height=416, prep_bufs={}, prep_cache_size=8)
+    fake.prepare = lambda frame, size=None: yolov4.Yolo.prepare(fake, frame, size)
+    fake.prep_buffer = lambda key, shape: yolov4.Yolo.prep_buffer(fake, key, shape)
+    frame = np.zeros((720, 1280, 3), np.uint8)
+    frame[200:400, 300:700] = 255
+    out = np.empty((3, 416, 416), np.float32)
+    yolov4.Yolo.prepare_letterbox(fake, frame, out)
+    assert out[:, :91].max() == out[:, 91 + 234:].min() == 0.5 # 위/아래 여백
+
+    ys, xs = np.nonzero(out[0] > 0.9)
+    net_box = np.float32([[(xs.min() + xs.max() + 1) / 2, (ys.min() + ys.max() + 1) / 2,
+                           xs.max() + 1 - xs.min(), ys.max() + 1 - ys.min()]])
+    box = yolov4.unletterbox(net_box, (720, 1280), (416, 416))
+    np.testing.assert_allclose(box[0], (500, 300, 400, 200), atol=4)
+
+
+def test_prep_buffer_is_bounded():
+    # ROI 크기가 매번 달라도 전처리 버퍼는 prep_cache_size개까지만 (최근에 쓴 것 유지)
+    fake = SimpleNamespace(prep_bufs={}, prep_cache_size=3)
+    first = yolov4.Yolo.prep_buffer(fake, ('rgb', 1, 1), (1, 1, 3))
+    for n in range(2, 10):
+        yolov4.Yolo.prep_buffer(fake, ('rgb', n, n), (n, n, 3))
+        assert yolov4.Yolo.prep_buffer(fake, ('rgb', 1, 1), (1, 1, 3)) is first
+    assert len(fake.prep_bufs) == 3 and list(fake.prep_bufs)[-1] == ('rgb', 1, 1)